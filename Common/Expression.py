@@ -10,12 +10,13 @@ import re
 import sys
 from random import sample
 import string
+from collections import ChainMap
+from functools import lru_cache
 from Common.GlobalData import (
-    gPlatformPcds,
-    gConditionalPcds,
     gGuidPattern,
     gHexPattern
 )
+from Common.ParseContext import GetContext
 from Common.DataType import (
     TAB_VOID,
     TAB_STAR,
@@ -28,8 +29,9 @@ from Common.DataType import (
 )
 from .Misc import (
     GuidStringToGuidStructureString,
+    ParseByteArray,
     ParseFieldValue,
-    CopyDict
+    PlainNumberPattern
 )
 from CommonDataClass.Exceptions import BadExpression
 from CommonDataClass.Exceptions import WrnExpression
@@ -59,12 +61,17 @@ __ValidString = re.compile(r'[_a-zA-Z][_0-9a-zA-Z]*$')
 _ReLabel = re.compile('LABEL\((\w+)\)')
 _ReOffset = re.compile('OFFSET_OF\((\w+)\)')
 PcdPattern = re.compile(r'^[_a-zA-Z][0-9A-Za-z_]*\.[_a-zA-Z][0-9A-Za-z_]*$')
+# the characters SplitPcdValueString() has to look at
+_PcdValueSplitPattern = re.compile(r'[(),"\']')
 
 ## SplitString
 #  Split string to list according double quote
 #  For example: abc"de\"f"ghi"jkl"mn will be: ['abc', '"de\"f"', 'ghi', '"jkl"', 'mn']
 #
 def SplitString(String):
+    if '"' not in String and "'" not in String:
+        String = String.strip()
+        return [String] if String else []
     # There might be escaped quote: "abc\"def\\\"ghi", 'abc\'def\\\'ghi'
     RanStr = ''.join(sample(string.ascii_letters + string.digits, 8))
     String = String.replace('\\\\', RanStr).strip()
@@ -114,30 +121,29 @@ def SplitPcdValueString(String):
     InParenthesis = 0
     InSingleQuote = False
     InDoubleQuote = False
-    Item = ''
-    for i, ch in enumerate(String):
+    # the item is String[Start:], only the quotes, parentheses and commas are visited
+    Start = 0
+    for Match in _PcdValueSplitPattern.finditer(String):
+        ch = Match.group()
+        i = Match.start()
         if ch == '(':
             InParenthesis += 1
         elif ch == ')':
             if InParenthesis:
                 InParenthesis -= 1
             else:
-                raise BadExpression(ERR_STRING_TOKEN % Item)
-        elif ch == '"' and not InSingleQuote:
-            if String[i-1] != '\\':
+                raise BadExpression(ERR_STRING_TOKEN % String[Start:i])
+        elif ch == '"':
+            if not InSingleQuote and String[i-1] != '\\':
                 InDoubleQuote = not InDoubleQuote
-        elif ch == "'" and not InDoubleQuote:
-            if String[i-1] != '\\':
+        elif ch == "'":
+            if not InDoubleQuote and String[i-1] != '\\':
                 InSingleQuote = not InSingleQuote
-        elif ch == ',':
-            if InParenthesis or InSingleQuote or InDoubleQuote:
-                Item += String[i]
-                continue
-            elif Item:
-                RetList.append(Item)
-                Item = ''
-            continue
-        Item += String[i]
+        elif not (InParenthesis or InSingleQuote or InDoubleQuote):
+            if i > Start:
+                RetList.append(String[Start:i])
+            Start = i + 1
+    Item = String[Start:]
     if InSingleQuote or InDoubleQuote or InParenthesis:
         raise BadExpression(ERR_STRING_TOKEN % Item)
     if Item:
@@ -150,7 +156,7 @@ def SplitPcdValueString(String):
 def IsValidCName(Str):
     return True if __ValidString.match(Str) else False
 
-def BuildOptionValue(PcdValue, GuidDict):
+def BuildOptionValue(PcdValue, GuidDict, Context=None):
     if PcdValue.startswith('H'):
         InputValue = PcdValue[1:]
     elif PcdValue.startswith("L'") or PcdValue.startswith("'"):
@@ -160,7 +166,7 @@ def BuildOptionValue(PcdValue, GuidDict):
     else:
         InputValue = PcdValue
     try:
-        PcdValue = ValueExpressionEx(InputValue, TAB_VOID, GuidDict)(True)
+        PcdValue = ValueExpressionEx(InputValue, TAB_VOID, GuidDict, Context)(True)
     except:
         pass
 
@@ -168,7 +174,13 @@ def BuildOptionValue(PcdValue, GuidDict):
 
 ## ReplaceExprMacro
 #
-def ReplaceExprMacro(String, Macros, ExceptionList = None):
+#   The PCDs of platform found in the strings without macro are added to
+#   the conditional PCDs of the context.
+#
+#   @param  Context:    The ParseContext giving PCDs, None for the default one
+#
+def ReplaceExprMacro(String, Macros, ExceptionList = None, Context=None):
+    Context = GetContext(Context)
     StrList = SplitString(String)
     for i, String in enumerate(StrList):
         InQuote = False
@@ -176,10 +188,10 @@ def ReplaceExprMacro(String, Macros, ExceptionList = None):
             InQuote = True
         MacroStartPos = String.find('$(')
         if MacroStartPos < 0:
-            for Pcd in gPlatformPcds:
+            for Pcd in Context.PlatformPcds:
                 if Pcd in String:
-                    if Pcd not in gConditionalPcds:
-                        gConditionalPcds.append(Pcd)
+                    if Pcd not in Context.ConditionalPcds:
+                        Context.ConditionalPcds.append(Pcd)
             continue
         RetStr = ''
         while MacroStartPos >= 0:
@@ -346,8 +358,9 @@ class ValueExpression(BaseExpression):
             raise WrnExp
         return Val
 
-    def __init__(self, Expression, SymbolTable={}):
+    def __init__(self, Expression, SymbolTable={}, Context=None):
         super(ValueExpression, self).__init__(self, Expression, SymbolTable)
+        self._Context = Context
         self._NoProcess = False
         if not isinstance(Expression, type('')):
             self._Expr = Expression
@@ -356,16 +369,17 @@ class ValueExpression(BaseExpression):
 
         self._Expr = ReplaceExprMacro(Expression.strip(),
                                   SymbolTable,
-                                  SupportedInMacroList)
+                                  SupportedInMacroList,
+                                  Context)
 
         if not self._Expr.strip():
             raise BadExpression(ERR_EMPTY_EXPR)
 
         #
-        # The symbol table including PCD and macro mapping
+        # The symbol table including PCD and macro mapping, looked up through
+        # the given table instead of a copy of it
         #
-        self._Symb = CopyDict(SymbolTable)
-        self._Symb.update(self.LogicalOperators)
+        self._Symb = ChainMap(self.LogicalOperators, SymbolTable)
         self._Idx = 0
         self._Len = len(self._Expr)
         self._Token = ''
@@ -403,7 +417,12 @@ class ValueExpression(BaseExpression):
             self._Idx = 0
             self._Token = ''
 
-        Val = self._ConExpr()
+        Evaluate = _CompileExpression(self._Expr)
+        if Evaluate is None:
+            Val = self._ConExpr()
+        else:
+            Val = Evaluate(self)
+            self._Idx = self._Len
         RealVal = Val
         if isinstance(Val, type('')):
             if Val == 'L""':
@@ -666,15 +685,26 @@ class ValueExpression(BaseExpression):
 
         # PCD token
         if PcdPattern.match(self._Token):
-            if self._Token not in self._Symb:
-                Ex = BadExpression(ERR_PCD_RESOLVE % self._Token)
-                Ex.Pcd = self._Token
-                raise Ex
-            self._Token = ValueExpression(self._Symb[self._Token], self._Symb)(True, self._Depth+1)
-            if not isinstance(self._Token, type('')):
-                self._LiteralToken = hex(self._Token)
-                return
+            self._ResolvePcd(self._Token)
+            return
+        self.__ConvertToken()
+
+    # Resolve PCD token to the value of PCD in symbol table
+    # @param Name: The PCD name, TokenSpaceGuidCName.PcdCName
+    def _ResolvePcd(self, Name):
+        if Name not in self._Symb:
+            Ex = BadExpression(ERR_PCD_RESOLVE % Name)
+            Ex.Pcd = Name
+            raise Ex
+        self._Token = ValueExpression(self._Symb[Name], self._Symb, self._Context)(True, self._Depth+1)
+        if not isinstance(self._Token, type('')):
+            self._LiteralToken = hex(self._Token)
+            return self._Token
+        self.__ConvertToken()
+        return self._Token
 
+    # Convert string token to the value it stands for
+    def __ConvertToken(self):
         if self._Token.startswith('"'):
             self._Token = self._Token[1:-1]
         elif self._Token in {"FALSE", "false", "False"}:
@@ -765,7 +795,7 @@ class ValueExpression(BaseExpression):
                     Idx = self._Idx
                 if Ch == ')':
                     TmpValue = self._Expr[Idx :self._Idx - 1]
-                    TmpValue = ValueExpression(TmpValue)(True)
+                    TmpValue = ValueExpression(TmpValue, Context=self._Context)(True)
                     TmpValue = '0x%x' % int(TmpValue) if not isinstance(TmpValue, type('')) else TmpValue
                     break
             self._Token, Size = ParseFieldValue(Prefix + '(' + TmpValue + ')')
@@ -778,7 +808,8 @@ class ValueExpression(BaseExpression):
             if Match and not Expr[Match.end():Match.end()+1].isalnum() \
                 and Expr[Match.end():Match.end()+1] != '_':
                 self._Idx += Match.end()
-                self._Token = ValueExpression(GuidStringToGuidStructureString(Expr[0:Match.end()]))(True, self._Depth+1)
+                self._Token = ValueExpression(GuidStringToGuidStructureString(Expr[0:Match.end()]),
+                                              Context=self._Context)(True, self._Depth+1)
                 return self._Token
             elif self.__IsIdChar(Ch):
                 return self.__GetIdToken()
@@ -828,15 +859,193 @@ class ValueExpression(BaseExpression):
         self._Token = OpToken
         return OpToken
 
+# The number of compiled expressions kept in cache
+EXPRESSION_CACHE_SIZE = 4096
+
+## Raised when compiling an expression which can't be compiled the same way as it's evaluated
+class _NotCompilable(Exception):
+    pass
+
+## Raised when a PCD operand is met while compiling an expression
+class _PcdOperand(Exception):
+    def __init__(self, Name):
+        Exception.__init__(self, Name)
+        self.Name = Name
+
+## Compile expression into a tree of closures
+#
+# The expression is parsed by the parsing methods of ValueExpression, and the
+# operands are evaluated at compile time except PCDs, which are resolved when
+# the compiled expression is evaluated. Evaluating the closures does the same
+# operations in the same order as ValueExpression._ConExpr() does, so values,
+# warnings and exceptions are the same.
+#
+# Expressions using "? :", or using PCD as element of NList or array, are not
+# compiled, because how they are parsed depends on values of operands.
+#
+class _ExpressionCompiler(ValueExpression):
+    def __init__(self, Expression):
+        BaseExpression.__init__(self)
+        self._Context = None
+        self._Expr = Expression
+        self._Symb = {}
+        self._Idx = 0
+        self._Len = len(Expression)
+        self._Token = ''
+        self._WarnExcept = None
+        self._LiteralToken = ''
+        self._Depth = 0
+
+    ## Compile the expression
+    #
+    #   @retval: A function evaluating the expression against a ValueExpression
+    #            object, or None if the expression can't be compiled
+    #
+    def Compile(self):
+        try:
+            Evaluate = self._ConExpr()
+        except Exception:
+            return None
+        if self._Idx != self._Len:
+            return None
+        return Evaluate
+
+    def _ResolvePcd(self, Name):
+        raise _PcdOperand(Name)
+
+    def _ExprFuncTemplate(self, EvalFunc, OpSet):
+        Operand = EvalFunc()
+        Operations = []
+        while self._IsOperator(OpSet):
+            Op = self._Token
+            if Op in {'?', ':'}:
+                raise _NotCompilable(Op)
+            if Op == '/':
+                Op = '//'
+            Operations.append((Op, EvalFunc()))
+        if not Operations:
+            return Operand
+        return _BinaryOperation(Operand, Operations)
+
+    def _EqExpr(self):
+        Operand = self._RelExpr()
+        Operations = []
+        while self._IsOperator({"==", "!=", "EQ", "NE", "IN", "in", "!", "NOT", "not"}):
+            Op = self._Token
+            if Op in {"!", "NOT", "not"}:
+                if not self._IsOperator({"IN", "in"}):
+                    raise BadExpression(ERR_REL_NOT_IN)
+                Op += ' ' + self._Token
+            Operations.append((Op, self._RelExpr()))
+        if not Operations:
+            return Operand
+        return _BinaryOperation(Operand, Operations)
+
+    def _UnaryExpr(self):
+        if self._IsOperator({"!", "NOT", "not"}):
+            return _UnaryOperation('not', self._UnaryExpr())
+        if self._IsOperator({"~"}):
+            return _UnaryOperation('~', self._UnaryExpr())
+        return self._IdenExpr()
+
+    def _IdenExpr(self):
+        Start = self._Idx
+        try:
+            Tk = self._GetToken()
+        except _PcdOperand as Pcd:
+            # the PCD must be the whole operand, and not start a NList
+            if self._Expr[Start:self._Idx].strip() != Pcd.Name or \
+                    self._Expr[self._Idx:].lstrip().startswith(','):
+                raise _NotCompilable(Pcd.Name)
+            Name = Pcd.Name
+            return lambda Expr: Expr._ResolvePcd(Name)
+        if Tk == '(':
+            Evaluate = self._ConExpr()
+            if self._GetToken() != ')':
+                raise BadExpression(ERR_MATCH)
+            return Evaluate
+        return lambda Expr: Tk
+
+## Get the closure applying a unary operator
+def _UnaryOperation(Op, Operand):
+    def Evaluate(Expr):
+        Val = Operand(Expr)
+        try:
+            return Expr.Eval(Op, Val)
+        except WrnExpression as Warn:
+            Expr._WarnExcept = Warn
+            return Warn.result
+    return Evaluate
+
+## Get the closure applying binary operators of same precedence from left to right
+def _BinaryOperation(Operand, Operations):
+    def Evaluate(Expr):
+        Val = Operand(Expr)
+        for Op, Right in Operations:
+            try:
+                Val = Expr.Eval(Op, Val, Right(Expr))
+            except WrnExpression as Warn:
+                Expr._WarnExcept = Warn
+                Val = Warn.result
+        return Val
+    return Evaluate
+
+## Compile expression, the result is cached by expression text
+#
+#   @param  Expression:     The expression whose macros have been replaced
+#
+#   @retval: The function evaluating the expression, or None if the expression
+#            can't be compiled
+#
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def _CompileExpression(Expression):
+    return _ExpressionCompiler(Expression).Compile()
+
+## Get the statistics of the compiled expression cache, as functools.lru_cache's cache_info()
+def GetExpressionCacheInfo():
+    return _CompileExpression.cache_info()
+
 class ValueExpressionEx(ValueExpression):
-    def __init__(self, PcdValue, PcdType, SymbolTable={}):
-        ValueExpression.__init__(self, PcdValue, SymbolTable)
+    # the size in bytes of the numeric types
+    _NumericSize = {TAB_UINT8: 1, TAB_UINT16: 2, TAB_UINT32: 4, TAB_UINT64: 8}
+
+    def __init__(self, PcdValue, PcdType, SymbolTable={}, Context=None):
+        ValueExpression.__init__(self, PcdValue, SymbolTable, Context)
         self.PcdValue = PcdValue
         self.PcdType = PcdType
 
+    ## Convert a byte array of plain numbers, e.g. {0x01, 2, 0xFF}
+    #
+    #  The whole array is converted at once instead of evaluating its elements
+    #  one by one, and the result is the same as the general evaluator's.
+    #
+    #   @param  PcdValue:   The PCD value
+    #
+    #   @retval: The converted value, None if the value is not such an array or
+    #            it is too large for the PCD type, which the general evaluator
+    #            handles and reports.
+    #
+    def _ConvertByteArray(self, PcdValue):
+        Data = ParseByteArray(PcdValue)
+        if Data is None:
+            return None
+        if self.PcdType in TAB_PCD_NUMERIC_TYPES:
+            Size = len(Data)
+            if Size > self._NumericSize.get(self.PcdType, Size):
+                return None
+            return '0x%0{}X'.format(Size) % int.from_bytes(Data, 'little')
+        PcdValue = PcdValue.strip()
+        # an array of hex numbers of at most two digits is kept as it is
+        if all(Item.strip()[:2] in ('0x', '0X') and len(Item.strip()) <= 4 for Item in PcdValue[1:-1].split(',')):
+            return PcdValue
+        return '{' + ','.join(['0x%02X' % Byte for Byte in Data]) + '}'
+
     def __call__(self, RealValue=False, Depth=0):
         PcdValue = self.PcdValue
         if "{CODE(" not in PcdValue:
+            ByteArrayValue = self._ConvertByteArray(PcdValue)
+            if ByteArrayValue is not None:
+                return ByteArrayValue if RealValue else None
             try:
                 PcdValue = ValueExpression.__call__(self, RealValue, Depth)
                 if self.PcdType == TAB_VOID and (PcdValue.startswith("'") or PcdValue.startswith("L'")):
@@ -880,7 +1089,7 @@ class ValueExpressionEx(ValueExpression):
                             else:
                                 ItemSize = 0
                                 ValueType = TAB_UINT8
-                            Item = ValueExpressionEx(Item, ValueType, self._Symb)(True)
+                            Item = ValueExpressionEx(Item, ValueType, self._Symb, self._Context)(True)
                             if ItemSize == 0:
                                 try:
                                     tmpValue = int(Item, 0)
@@ -948,7 +1157,9 @@ class ValueExpressionEx(ValueExpression):
                                             raise BadExpression('%s is not a valid c variable name' % Label)
                                         if Label not in LabelDict:
                                             LabelDict[Label] = str(LabelOffset)
-                                if Item.startswith(TAB_UINT8):
+                                if PlainNumberPattern.fullmatch(Item) and int(Item, 0) <= 0xFF:
+                                    LabelOffset = LabelOffset + 1
+                                elif Item.startswith(TAB_UINT8):
                                     LabelOffset = LabelOffset + 1
                                 elif Item.startswith(TAB_UINT16):
                                     LabelOffset = LabelOffset + 2
@@ -988,6 +1199,10 @@ class ValueExpressionEx(ValueExpression):
                                 Size = 0
                                 ValueStr = ''
                                 TokenSpaceGuidName = ''
+                                if PlainNumberPattern.fullmatch(Item) and int(Item, 0) <= 0xFF:
+                                    AllPcdValueList.append('0x%02X' % int(Item, 0))
+                                    Size = 1
+                                    continue
                                 if Item.startswith(TAB_GUID) and Item.endswith(')'):
                                     try:
                                         TokenSpaceGuidName = re.search('GUID\((\w+)\)', Item).group(1)
@@ -1024,9 +1239,9 @@ class ValueExpressionEx(ValueExpression):
                                     else:
                                         ItemSize = 0
                                     if ValueType:
-                                        TmpValue = ValueExpressionEx(Item, ValueType, self._Symb)(True)
+                                        TmpValue = ValueExpressionEx(Item, ValueType, self._Symb, self._Context)(True)
                                     else:
-                                        TmpValue = ValueExpressionEx(Item, self.PcdType, self._Symb)(True)
+                                        TmpValue = ValueExpressionEx(Item, self.PcdType, self._Symb, self._Context)(True)
                                     Item = '0x%x' % TmpValue if not isinstance(TmpValue, type('')) else TmpValue
                                     if ItemSize == 0:
                                         ItemValue, ItemSize = ParseFieldValue(Item)
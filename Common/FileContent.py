@@ -0,0 +1,132 @@
+## @file
+# This file is used to read meta files once and share their content
+#
+# SPDX-License-Identifier: BSD-2-Clause-Patent
+#
+
+##
+# Import Modules
+#
+import io
+from array import array
+from hashlib import md5
+
+import Common.DataType as DT
+
+## The content of one file
+#
+# The file is read once as bytes. The digest is computed from the bytes, and
+# the lines are decoded on first use the same way open(File, 'r') does. The
+# section boundary index is built on first use too, in one pass over lines.
+#
+class FileContent(object):
+    ## Constructor
+    #
+    #   @param  Data:   The bytes of the file
+    #
+    def __init__(self, Data):
+        self.Digest = md5(Data).hexdigest()
+        self._Data = Data
+        self._Lines = None
+        # header line number and text of each section
+        self._Sections = None
+        # index in _Sections of the section each line belongs to, -1 if none
+        self._SectionOfLine = None
+
+    ## The lines of the file, as got by readlines()
+    @property
+    def Lines(self):
+        if self._Lines is None:
+            self._Lines = io.TextIOWrapper(io.BytesIO(self._Data)).readlines()
+            self._Data = None
+        return self._Lines
+
+    ## Record the line number and text of every section header line
+    def _IndexSections(self):
+        self._Sections = []
+        self._SectionOfLine = array('l')
+        Current = -1
+        for LineNo, Line in enumerate(self.Lines, 1):
+            if Line.lstrip().startswith(DT.TAB_SECTION_START):
+                Current = len(self._Sections)
+                self._Sections.append((LineNo, Line))
+            self._SectionOfLine.append(Current)
+
+    ## Get the line number and text of every line starting a section
+    #
+    #   Lines are checked without removing comments, so a comment line or a
+    #   line in block comment might be in the list too.
+    #
+    def GetSectionHeaders(self):
+        if self._Sections is None:
+            self._IndexSections()
+        return self._Sections
+
+    ## Get the header of the section a line belongs to
+    #
+    #   A line starting with '[' is the header of its own section.
+    #
+    #   @param  LineNo:     The line number, starting from 1
+    #
+    #   @retval: (line number, text) of the header line, or (0, '') if the
+    #            line is not in any section
+    #
+    def GetSectionHeader(self, LineNo):
+        if self._SectionOfLine is None:
+            self._IndexSections()
+        if not 0 < LineNo <= len(self._SectionOfLine):
+            return 0, ''
+        Section = self._SectionOfLine[LineNo - 1]
+        if Section < 0:
+            return 0, ''
+        return self._Sections[Section]
+
+## Read files once and share their content among the parsers of one context
+#
+# Contents are kept until invalidated, so a file is read from disk only once
+# however many times it is parsed, hashed or looked up.
+#
+#   @var Reads:     The number of times a file is read from disk
+#
+class FileContentService(object):
+    def __init__(self):
+        self._Contents = {}
+        self.Reads = 0
+
+    ## Get the content of a file
+    #
+    #   @param  FilePath:   The path of the file
+    #
+    #   @retval: The FileContent object. IOError or OSError is raised if the
+    #            file cannot be read.
+    #
+    def Get(self, FilePath):
+        Key = str(FilePath)
+        Content = self._Contents.get(Key)
+        if Content is None:
+            with open(Key, 'rb') as File:
+                Content = FileContent(File.read())
+            self.Reads += 1
+            self._Contents[Key] = Content
+        return Content
+
+    ## Get the lines of a file, as got by readlines()
+    def GetLines(self, FilePath):
+        return self.Get(FilePath).Lines
+
+    ## Get the md5 hex digest of a file, or None if the file cannot be read
+    def GetDigest(self, FilePath):
+        try:
+            return self.Get(FilePath).Digest
+        except (IOError, OSError):
+            return None
+
+    ## Forget the content of a file, or all files, so it'll be read again
+    #
+    #   @param  FilePath:   The path of the file, None for all files
+    #
+    def Invalidate(self, FilePath=None):
+        if FilePath is None:
+            self._Contents.clear()
+        else:
+            self._Contents.pop(str(FilePath), None)
@@ -5,6 +5,7 @@
 # SPDX-License-Identifier: BSD-2-Clause-Patent
 
 import re
+from Common.VersionedDict import VersionedDict
 
 gIsWindows = None
 gWorkspace = "."
@@ -13,13 +14,13 @@ gCaseInsensitive = False
 gAllFiles = None
 
 gGlobalDefines = {}
-gPlatformDefines = {}
+gPlatformDefines = VersionedDict()
 # PCD name and value pair for fixed at build and feature flag
 gPlatformPcds = {}
 # PCDs with type that are not fixed at build and feature flag
 gPlatformOtherPcds = {}
-gCommandLineDefines = {}
-gEdkGlobal = {}
+gCommandLineDefines = VersionedDict()
+gEdkGlobal = VersionedDict()
 
 # definition for a MACRO name.  used to create regular expressions below.
 _MacroNamePattern = "[A-Z][A-Z0-9_]*"
@@ -61,3 +62,6 @@ BuildOptionPcd = []
 
 # Pcd name for the Pcd which used in the Conditional directives
 gConditionalPcds = []
+
+# Cache of parsed meta file tables on disk (parsers.MetaFileCache.MetaFileCache), None to disable
+gMetaFileCache = None
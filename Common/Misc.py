@@ -18,6 +18,7 @@ from collections import OrderedDict
 import Common.LongFilePathOs as os
 from Common import EdkLogger as EdkLogger
 from Common import GlobalData as GlobalData
+from Common.ParseContext import GetContext
 from Common.DataType import (
     TAB_UINT8,
     TAB_UINT16,
@@ -53,6 +54,16 @@ from CommonDataClass.Exceptions import BadExpression
 import struct
 
 StructPattern = re.compile(r'[_a-zA-Z][0-9A-Za-z_]*$')
+PtrValuePattern = re.compile(r'^\s*L?\".*\|.*\"')
+StringValuePattern = re.compile(r'\s*L?\".*\"\s*$')
+# the characters allowed in a string value of VOID* PCD
+PrintableChars = (set(string.printable) - {TAB_PRINTCHAR_VT}) | {TAB_PRINTCHAR_BS, TAB_PRINTCHAR_NUL}
+# the characters which could make '|' not split the fields of a PCD setting
+_PcdQuoteChars = frozenset('"\'(\\')
+# a byte array of plain hex and decimal numbers, e.g. {0x01, 2, 0xFF}
+_ByteArrayItem = r'(?:0[xX][0-9a-fA-F]+|[1-9][0-9]*|0)'
+PlainNumberPattern = re.compile(_ByteArrayItem)
+_PlainByteArrayPattern = re.compile(r'\{\s*(?:%s\s*,\s*)*%s\s*\}' % (_ByteArrayItem, _ByteArrayItem))
 
 ## Convert GUID string in xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx style to C structure style
 #
@@ -162,6 +173,9 @@ def GuidStructureStringToGuidValueName(GuidValue):
             )
 
 def AnalyzePcdExpression(Setting):
+    # no string or parentheses, every '|' splits fields
+    if _PcdQuoteChars.isdisjoint(Setting):
+        return [Field.strip() for Field in Setting.strip().split(TAB_VALUE_SPLIT)]
     RanStr = ''.join(sample(string.ascii_letters + string.digits, 8))
     Setting = Setting.replace('\\\\', RanStr).strip()
     # There might be escaped quote in a string: \", \\\" , \', \\\'
@@ -201,6 +215,25 @@ def AnalyzePcdExpression(Setting):
             FieldList[i] = ch.replace(RanStr,'\\\\')
     return FieldList
 
+## ParseByteArray
+#
+#  Convert a byte array of plain numbers to bytes without evaluating its
+#  elements one by one, e.g. "{0x01, 2, 0xFF}" is b'\x01\x02\xff'.
+#
+#  @param Value: The byte array string
+#
+#  @retval: A bytearray, None if the array has other elements than hex and
+#           decimal numbers or a number larger than 0xFF
+#
+def ParseByteArray(Value):
+    Value = Value.strip()
+    if not _PlainByteArrayPattern.fullmatch(Value):
+        return None
+    try:
+        return bytearray(int(Item, 0) for Item in Value[1:-1].split(','))
+    except ValueError:
+        return None
+
 def ParseFieldValue (Value):
     def ParseDevPathValue (Value):
         if '\\' in Value:
@@ -327,17 +360,15 @@ def ParseFieldValue (Value):
         return Value, len(List)
     if Value.startswith('{') and Value.endswith('}'):
         # Byte array
-        Value = Value[1:-1]
-        List = [Item.strip() for Item in Value.split(',')]
-        List.reverse()
-        Value = 0
-        RetSize = 0
-        for Item in List:
-            ItemValue, Size = ParseFieldValue(Item)
-            RetSize += Size
-            for I in range(Size):
-                Value = (Value << 8) | ((ItemValue >> 8 * I) & 0xff)
-        return Value, RetSize
+        Data = ParseByteArray(Value)
+        if Data is not None:
+            return int.from_bytes(Data, 'little'), len(Data)
+        # the bytes are collected from the most significant one
+        Data = bytearray()
+        for Item in reversed(Value[1:-1].split(',')):
+            ItemValue, Size = ParseFieldValue(Item.strip())
+            Data.extend((ItemValue >> 8 * I) & 0xff for I in range(Size))
+        return int.from_bytes(Data, 'big'), len(Data)
     if Value.startswith('DEVICE_PATH(') and Value.endswith(')'):
         Value = Value.replace("DEVICE_PATH(", '').rstrip(')')
         Value = Value.strip().strip('"')
@@ -466,13 +497,12 @@ def AnalyzeDscPcd(Setting, PcdType, DataType=''):
 def AnalyzePcdData(Setting):
     ValueList = ['', '', '']
 
-    ValueRe = re.compile(r'^\s*L?\".*\|.*\"')
-    PtrValue = ValueRe.findall(Setting)
+    PtrValue = PtrValuePattern.findall(Setting)
 
     ValueUpdateFlag = False
 
     if len(PtrValue) >= 1:
-        Setting = re.sub(ValueRe, '', Setting)
+        Setting = PtrValuePattern.sub('', Setting)
         ValueUpdateFlag = True
 
     TokenList = Setting.split(TAB_VALUE_SPLIT)
@@ -489,24 +519,19 @@ def AnalyzePcdData(Setting):
 #
 def CheckPcdDatum(Type, Value):
     if Type == TAB_VOID:
-        ValueRe = re.compile(r'\s*L?\".*\"\s*$')
         if not (((Value.startswith('L"') or Value.startswith('"')) and Value.endswith('"'))
                 or (Value.startswith('{') and Value.endswith('}')) or (Value.startswith("L'") or Value.startswith("'") and Value.endswith("'"))
                ):
             return False, "Invalid value [%s] of type [%s]; must be in the form of {...} for array"\
                           ", \"...\" or \'...\' for string, L\"...\" or L\'...\' for unicode string" % (Value, Type)
-        elif ValueRe.match(Value):
+        elif StringValuePattern.match(Value):
             # Check the chars in UnicodeString or CString is printable
             if Value.startswith("L"):
                 Value = Value[2:-1]
             else:
                 Value = Value[1:-1]
-            Printset = set(string.printable)
-            Printset.remove(TAB_PRINTCHAR_VT)
-            Printset.add(TAB_PRINTCHAR_BS)
-            Printset.add(TAB_PRINTCHAR_NUL)
-            if not set(Value).issubset(Printset):
-                PrintList = sorted(Printset)
+            if not PrintableChars.issuperset(Value):
+                PrintList = sorted(PrintableChars)
                 return False, "Invalid PCD string value of type [%s]; must be printable chars %s." % (Type, PrintList)
     elif Type == 'BOOLEAN':
         if Value not in ['TRUE', 'True', 'true', '0x1', '0x01', '1', 'FALSE', 'False', 'false', '0x0', '0x00', '0']:
@@ -642,21 +667,22 @@ class PathClass(object):
     def TimeStamp(self):
         return os.stat(self.Path)[8]
 
-    def Validate(self, Type='', CaseSensitive=True):
+    def Validate(self, Type='', CaseSensitive=True, Context=None):
+        Context = GetContext(Context)
         def RealPath2(File, Dir='', OverrideDir=''):
             NewFile = None
             if OverrideDir:
-                NewFile = GlobalData.gAllFiles[os.path.normpath(os.path.join(OverrideDir, File))]
+                NewFile = Context.AllFiles[os.path.normpath(os.path.join(OverrideDir, File))]
                 if NewFile:
                     if OverrideDir[-1] == os.path.sep:
                         return NewFile[len(OverrideDir):], NewFile[0:len(OverrideDir)]
                     else:
                         return NewFile[len(OverrideDir) + 1:], NewFile[0:len(OverrideDir)]
-            if GlobalData.gAllFiles:
-                NewFile = GlobalData.gAllFiles[os.path.normpath(os.path.join(Dir, File))]
+            if Context.AllFiles:
+                NewFile = Context.AllFiles[os.path.normpath(os.path.join(Dir, File))]
             if not NewFile:
                 NewFile = os.path.normpath(os.path.join(Dir, File))
-                if not os.path.exists(NewFile):
+                if not mws.exists(NewFile):
                     return None, None
             if NewFile:
                 if Dir:
@@ -669,7 +695,7 @@ class PathClass(object):
 
             return None, None
 
-        if GlobalData.gCaseInsensitive:
+        if Context.CaseInsensitive:
             CaseSensitive = False
         if Type and Type.lower() != self.Type:
             return FILE_TYPE_MISMATCH, '%s (expect %s but got %s)' % (self.File, Type, self.Type)
@@ -9,6 +9,8 @@
 #
 
 import Common.LongFilePathOs as os
+import threading
+from collections import OrderedDict
 from Common.DataType import TAB_WORKSPACE
 
 ## MultipleWorkspace
@@ -19,10 +21,24 @@ from Common.DataType import TAB_WORKSPACE
 #
 # @var WORKSPACE:      defined the current WORKSPACE
 # @var PACKAGES_PATH:  defined the other WORKSPACE, if current WORKSPACE is invalid, search valid WORKSPACE from PACKAGES_PATH
+# @var FileIndex:      the WorkspaceFileIndex checking file existence, or None to check file system directly
+# @var CACHE_SIZE:     the max number of results kept by the resolution cache
+# @var CacheHits:      the number of join/getWs/relpath calls answered by the resolution cache
+# @var CacheMisses:    the number of join/getWs/relpath calls resolved again
 #
 class MultipleWorkspace(object):
     WORKSPACE = ''
     PACKAGES_PATH = None
+    FileIndex = None
+    CACHE_SIZE = 16384
+    CacheHits = 0
+    CacheMisses = 0
+    # {(kind, Ws, path tuple, generation): (result, path found)}, least recently used first
+    _Cache = OrderedDict()
+    # guards _Cache, which is shared by the threads of a process
+    _CacheLock = threading.Lock()
+    # changed whenever WORKSPACE or PACKAGES_PATH is set, or the cache is invalidated
+    _Generation = 0
 
     ## convertPackagePath()
     #
@@ -49,10 +65,138 @@ class MultipleWorkspace(object):
     @classmethod
     def setWs(cls, Ws, PackagesPath=None):
         cls.WORKSPACE = Ws
+        cls.FileIndex = None
         if PackagesPath:
             cls.PACKAGES_PATH = [cls.convertPackagePath (Ws, os.path.normpath(Path.strip())) for Path in PackagesPath.split(os.pathsep)]
         else:
             cls.PACKAGES_PATH = []
+        cls.invalidate()
+
+    ## invalidate()
+    #
+    #   forget the results of join/getWs/relpath, which must be called when
+    #   PACKAGES_PATH is changed other than by setWs, or files are created or
+    #   removed during a run
+    #
+    #   @param  cls       The class pointer
+    #   @param  Path      the file or directory created or removed, or None to
+    #                     forget all results. For a path, a result is forgotten
+    #                     if Path is or contains the path it was found as, or
+    #                     the path it is looked up as under a workspace searched
+    #                     before, so a created file shadowing a PACKAGES_PATH
+    #                     copy is found.
+    #
+    @classmethod
+    def invalidate(cls, Path=None):
+        with cls._CacheLock:
+            if Path is None:
+                cls._Generation += 1
+                cls._Cache.clear()
+                return
+            Path = os.path.normpath(Path)
+            for Key, (Result, Found) in list(cls._Cache.items()):
+                Kind, Ws, p, _ = Key
+                if Kind != 'relpath' and cls._isAffected(Path, Ws, p, Result if Found is not None else None):
+                    del cls._Cache[Key]
+        if cls.FileIndex is not None:
+            cls.FileIndex.Invalidate(Path)
+
+    ## _isAffected()
+    #
+    #   check whether creating or removing a path could change a 'find' result
+    #
+    #   @param  cls       The class pointer
+    #   @param  Path      the normalized path created or removed
+    #   @param  Ws        the WORKSPACE of the result
+    #   @param  p         the tuple of paths of the result
+    #   @param  Root      the workspace the paths were found in, None if not found
+    #   @retval True      the result must be forgotten
+    #
+    @classmethod
+    def _isAffected(cls, Path, Ws, p, Root):
+        for Candidate in [Ws] + list(cls.PACKAGES_PATH or []):
+            Joined = os.path.normpath(os.path.join(Candidate, *p))
+            if Joined == Path or Joined.startswith(Path + os.sep):
+                return True
+            if Candidate == Root:
+                break
+        return False
+
+    ## getCacheInfo()
+    #
+    #   get the statistics of the resolution cache
+    #
+    #   @param  cls       The class pointer
+    #   @retval tuple     (hits, misses, number of results cached)
+    #
+    @classmethod
+    def getCacheInfo(cls):
+        return cls.CacheHits, cls.CacheMisses, len(cls._Cache)
+
+    ## _cached()
+    #
+    #   get a result from the resolution cache, or compute and cache it. The
+    #   result is computed out of the lock, so two threads could compute it
+    #   at the same time, but the cache is always consistent.
+    #
+    #   @param  cls       The class pointer
+    #   @param  Kind      the kind of result
+    #   @param  Ws        the current WORKSPACE
+    #   @param  p         the tuple of paths to be resolved
+    #   @param  Resolve   the function computing (result, path found or None) from Ws and p
+    #   @retval Result    the result
+    #
+    @classmethod
+    def _cached(cls, Kind, Ws, p, Resolve):
+        Key = (Kind, Ws, p, cls._Generation)
+        Cache = cls._Cache
+        with cls._CacheLock:
+            Value = Cache.get(Key)
+            if Value is not None:
+                Cache.move_to_end(Key)
+                cls.CacheHits += 1
+                return Value[0]
+            cls.CacheMisses += 1
+        Value = Resolve(Ws, p)
+        with cls._CacheLock:
+            Cache[Key] = Value
+            if len(Cache) > cls.CACHE_SIZE:
+                Cache.popitem(last=False)
+        return Value[0]
+
+    ## _find()
+    #
+    #   find the workspace having the path
+    #
+    #   @param  cls       The class pointer
+    #   @param  Ws        the current WORKSPACE
+    #   @param  p         the tuple of paths to be joined
+    #   @retval tuple     (the workspace, the path found), or (Ws, None) if not found
+    #
+    @classmethod
+    def _find(cls, Ws, p):
+        Path = os.path.join(Ws, *p)
+        if cls.exists(Path):
+            return Ws, Path
+        for Pkg in cls.PACKAGES_PATH:
+            Path = os.path.join(Pkg, *p)
+            if cls.exists(Path):
+                return Pkg, Path
+        return Ws, None
+
+    ## exists()
+    #
+    #   check whether a path exists, through the workspace file index if there is one
+    #
+    #   @param  cls       The class pointer
+    #   @param  Path      path of the file or directory
+    #   @retval True      the path exists
+    #
+    @classmethod
+    def exists(cls, Path):
+        if cls.FileIndex is not None:
+            return cls.FileIndex.Exists(Path)
+        return os.path.exists(Path)
 
     ## join()
     #
@@ -65,14 +209,8 @@ class MultipleWorkspace(object):
     #
     @classmethod
     def join(cls, Ws, *p):
-        Path = os.path.join(Ws, *p)
-        if not os.path.exists(Path):
-            for Pkg in cls.PACKAGES_PATH:
-                Path = os.path.join(Pkg, *p)
-                if os.path.exists(Path):
-                    return Path
-            Path = os.path.join(Ws, *p)
-        return Path
+        Root = cls._cached('find', Ws, p, cls._find)
+        return os.path.join(Root, *p)
 
     ## relpath()
     #
@@ -85,13 +223,18 @@ class MultipleWorkspace(object):
     #
     @classmethod
     def relpath(cls, Path, Ws):
+        return cls._cached('relpath', Ws, (Path,), cls._relpath)
+
+    @classmethod
+    def _relpath(cls, Ws, p):
+        Path, = p
         for Pkg in cls.PACKAGES_PATH:
             if Path.lower().startswith(Pkg.lower()):
                 Path = os.path.relpath(Path, Pkg)
-                return Path
+                return Path, Path
         if Path.lower().startswith(Ws.lower()):
             Path = os.path.relpath(Path, Ws)
-        return Path
+        return Path, Path
 
     ## getWs()
     #
@@ -104,13 +247,7 @@ class MultipleWorkspace(object):
     #
     @classmethod
     def getWs(cls, Ws, Path):
-        absPath = os.path.join(Ws, Path)
-        if not os.path.exists(absPath):
-            for Pkg in cls.PACKAGES_PATH:
-                absPath = os.path.join(Pkg, Path)
-                if os.path.exists(absPath):
-                    return Pkg
-        return Ws
+        return cls._cached('find', Ws, (Path,), cls._find)
 
     ## handleWsMacro()
     #
@@ -129,10 +266,10 @@ class MultipleWorkspace(object):
                     if MacroStartPos != -1:
                         Substr = str[MacroStartPos:]
                         Path = Substr.replace(TAB_WORKSPACE, cls.WORKSPACE).strip()
-                        if not os.path.exists(Path):
+                        if not cls.exists(Path):
                             for Pkg in cls.PACKAGES_PATH:
                                 Path = Substr.replace(TAB_WORKSPACE, Pkg).strip()
-                                if os.path.exists(Path):
+                                if cls.exists(Path):
                                     break
                         PathList[i] = str[0:MacroStartPos] + Path
             PathStr = ' '.join(PathList)
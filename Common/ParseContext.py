@@ -0,0 +1,124 @@
+## @file
+# This file is used to define the context of meta file parsing
+#
+# SPDX-License-Identifier: BSD-2-Clause-Patent
+#
+
+##
+# Import Modules
+#
+from Common import GlobalData as GlobalData
+from Common.FileContent import FileContentService
+from Common.VersionedDict import VersionedDict
+
+## The state shared by the parsers of one platform
+#
+# A ParseContext owns the macro and PCD maps which are filled or used while
+# parsing, the registry of parser objects, the storage objects, the included
+# DSC files and the contents of the files read.
+#
+# Parsers given different contexts share none of them, so several platforms
+# could be parsed in one process at the same time, each in its own context.
+#
+#   @var Workspace:             The WORKSPACE directory
+#   @var GlobalDefines:         Global macros, e.g. WORKSPACE
+#   @var CommandLineDefines:    Macros given in command line
+#   @var EdkGlobal:             Macros defined by EDK_GLOBAL
+#   @var PlatformDefines:       Macros defined in DSC file
+#   @var PlatformPcds:          Values of PCDs set in DSC file
+#   @var PlatformOtherPcds:     PCDs of DSC file used in error report
+#   @var ConditionalPcds:       PCDs of DSC file used in expressions
+#   @var BuildOptionPcd:        PCDs given in command line
+#   @var AllFiles:              Cache of file names in workspace, e.g. a
+#                               WorkspaceFileIndex, or None
+#   @var CaseInsensitive:       Whether file names are case insensitive
+#   @var BuildDirectory:        The build output directory
+#   @var Options:               The command line options
+#   @var MetaFileCache:         Cache of parsed tables on disk, or None
+#   @var MetaFiles:             The parser objects, {file path: parser}
+#   @var IncludedFiles:         The DSC files included by !include
+#   @var StorageCache:          The storage objects of MetaFileStorage
+#   @var FileContents:          The FileContentService reading meta files
+#   @var IncludeRecords:        The records !include files are parsed into,
+#                               to be reused at every site including them
+#   @var IncludeParsesAvoided:  The number of !include files not parsed again
+#
+class ParseContext(object):
+    # attributes mapped to the module level variables of GlobalData by the
+    # default context
+    _GLOBAL_DATA_ = {
+        'Workspace'             :   'gWorkspace',
+        'GlobalDefines'         :   'gGlobalDefines',
+        'CommandLineDefines'    :   'gCommandLineDefines',
+        'EdkGlobal'             :   'gEdkGlobal',
+        'PlatformDefines'       :   'gPlatformDefines',
+        'PlatformPcds'          :   'gPlatformPcds',
+        'PlatformOtherPcds'     :   'gPlatformOtherPcds',
+        'ConditionalPcds'       :   'gConditionalPcds',
+        'BuildOptionPcd'        :   'BuildOptionPcd',
+        'AllFiles'              :   'gAllFiles',
+        'CaseInsensitive'       :   'gCaseInsensitive',
+        'BuildDirectory'        :   'gBuildDirectory',
+        'Options'               :   'gOptions',
+        'MetaFileCache'         :   'gMetaFileCache',
+    }
+
+    ## Constructor
+    #
+    #   @param  Workspace:          The WORKSPACE directory
+    #   @param  GlobalDefines:      Global macros, WORKSPACE is added if missing
+    #   @param  CommandLineDefines: Macros given in command line
+    #   @param  MetaFileCache:      Cache of parsed tables on disk
+    #
+    def __init__(self, Workspace='.', GlobalDefines=None, CommandLineDefines=None, MetaFileCache=None):
+        self.Workspace = Workspace
+        self.GlobalDefines = dict(GlobalDefines or {})
+        self.GlobalDefines.setdefault('WORKSPACE', Workspace)
+        self.CommandLineDefines = VersionedDict(CommandLineDefines or {})
+        self.EdkGlobal = VersionedDict()
+        self.PlatformDefines = VersionedDict()
+        self.PlatformPcds = {}
+        self.PlatformOtherPcds = {}
+        self.ConditionalPcds = []
+        self.BuildOptionPcd = []
+        self.AllFiles = None
+        self.CaseInsensitive = False
+        self.BuildDirectory = ''
+        self.Options = None
+        self.MetaFileCache = MetaFileCache
+        self._InitRegistry()
+
+    def _InitRegistry(self):
+        self.MetaFiles = {}
+        self.IncludedFiles = set()
+        self.StorageCache = {}
+        self.FileContents = FileContentService()
+        self.IncludeRecords = {}
+        self.IncludeParsesAvoided = 0
+
+## The context used when no context is given
+#
+# Its maps are the module level variables of GlobalData, so the code setting
+# GlobalData.gGlobalDefines, GlobalData.gWorkspace, etc. keeps working.
+#
+class _GlobalDataContext(ParseContext):
+    def __init__(self):
+        self._InitRegistry()
+
+def _GlobalDataProperty(GlobalName):
+    return property(lambda self: getattr(GlobalData, GlobalName),
+                    lambda self, Value: setattr(GlobalData, GlobalName, Value))
+
+for _Name, _GlobalName in ParseContext._GLOBAL_DATA_.items():
+    setattr(_GlobalDataContext, _Name, _GlobalDataProperty(_GlobalName))
+
+DefaultContext = _GlobalDataContext()
+
+## Get the context to use
+#
+#   @param  Context:    A ParseContext, or None for the default context
+#
+def GetContext(Context=None):
+    if Context is None:
+        return DefaultContext
+    return Context
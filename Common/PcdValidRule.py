@@ -0,0 +1,306 @@
+## @file
+# This file is used to check PCD values against the @ValidRange, @ValidList
+# and @Expression comments of DEC file
+#
+# SPDX-License-Identifier: BSD-2-Clause-Patent
+#
+
+##
+# Import Modules
+#
+import re
+from bisect import bisect_right
+
+from Common.Expression import ValueExpression
+from CommonDataClass.Exceptions import BadExpression, WrnExpression
+
+TAB_VALID_RANGE = '@ValidRange'
+TAB_VALID_LIST = '@ValidList'
+TAB_EXPRESSION = '@Expression'
+VALID_RULE_TYPES = (TAB_VALID_RANGE, TAB_VALID_LIST, TAB_EXPRESSION)
+
+# the values of a range are unsigned numbers of at most 64 bits
+_MAX_VALUE_ = 0xFFFFFFFFFFFFFFFF
+
+_RangeTokenPattern = re.compile(r'\s*(0[xX][0-9a-fA-F]+|\d+|<=|>=|==|!=|&&|\|\||[-()<>!]|[A-Za-z_]\w*)')
+
+## Split a validation comment of DEC file
+#
+#   @param  Comment:    The comment, e.g. "## @ValidRange 0x80000001 | 0 - 10"
+#
+#   @retval: (rule type, error code, rule text), None if the comment is not a
+#            validation rule. BadExpression is raised if it has no error code.
+#
+def SplitValidComment(Comment):
+    Comment = Comment.strip('#').strip()
+    for RuleType in VALID_RULE_TYPES:
+        if Comment.startswith(RuleType):
+            break
+    else:
+        return None
+    Fields = Comment[len(RuleType):].split('|', 1)
+    if len(Fields) != 2:
+        raise BadExpression('No error code in %s' % Comment)
+    return RuleType, Fields[0].strip(), Fields[1].strip()
+
+## Get the number a PCD value stands for
+#
+#   @param  Value:  The value, a number, a boolean or a string like '0x10',
+#                   '16' or 'TRUE'
+#
+#   @retval: The number, None if the value is not a number
+#
+def _ToNumber(Value):
+    if isinstance(Value, int):
+        return int(Value)
+    Value = str(Value).strip()
+    Upper = Value.upper()
+    if Upper in ('TRUE', 'FALSE'):
+        return int(Upper == 'TRUE')
+    try:
+        if Upper.startswith('0X'):
+            return int(Value, 16)
+        return int(Value, 10)
+    except ValueError:
+        return None
+
+## Operations on sets of numbers, each one a sorted list of disjoint (first, last) intervals
+def _Complement(Intervals):
+    Result = []
+    Next = 0
+    for First, Last in Intervals:
+        if First > Next:
+            Result.append((Next, First - 1))
+        Next = Last + 1
+    if Next <= _MAX_VALUE_:
+        Result.append((Next, _MAX_VALUE_))
+    return Result
+
+def _Union(Left, Right):
+    Result = []
+    for First, Last in sorted(Left + Right):
+        if Result and First <= Result[-1][1] + 1:
+            if Last > Result[-1][1]:
+                Result[-1] = (Result[-1][0], Last)
+        else:
+            Result.append((First, Last))
+    return Result
+
+def _Intersect(Left, Right):
+    return _Complement(_Union(_Complement(Left), _Complement(Right)))
+
+## Parse the range expression of @ValidRange into intervals
+#
+# A range is made of "<first> - <last>" and comparisons like "LT 10" or
+# "<= 0x20", combined by NOT, AND, XOR, OR and parentheses, e.g.
+# "0 - 10 OR GE 0x100". The operators are also written as !, &&, ||.
+#
+class _RangeParser(object):
+    _Comparisons = {
+        'LT': '<', 'GT': '>', 'LE': '<=', 'GE': '>=', 'EQ': '==', 'NE': '!=',
+        '<' : '<', '>' : '>', '<=': '<=', '>=': '>=', '==': '==', '!=': '!=',
+    }
+
+    def __init__(self, Range):
+        self._Range = Range
+        self._Tokens = []
+        Position = 0
+        Range = Range.rstrip()
+        while Position < len(Range):
+            Match = _RangeTokenPattern.match(Range, Position)
+            if Match is None:
+                raise BadExpression('Invalid range: [%s]' % self._Range)
+            self._Tokens.append(Match.group(1))
+            Position = Match.end()
+        self._Index = 0
+
+    def Parse(self):
+        Intervals = self._Or()
+        if self._Index != len(self._Tokens):
+            raise BadExpression('Invalid range: [%s]' % self._Range)
+        return Intervals
+
+    def _Peek(self):
+        if self._Index < len(self._Tokens):
+            return self._Tokens[self._Index].upper()
+        return None
+
+    def _Next(self):
+        Token = self._Peek()
+        if Token is None:
+            raise BadExpression('Incomplete range: [%s]' % self._Range)
+        self._Index += 1
+        return Token
+
+    def _Number(self):
+        Number = _ToNumber(self._Next())
+        if Number is None or Number > _MAX_VALUE_:
+            raise BadExpression('Invalid number in range: [%s]' % self._Range)
+        return Number
+
+    def _Or(self):
+        Intervals = self._Xor()
+        while self._Peek() in ('OR', '||'):
+            self._Next()
+            Intervals = _Union(Intervals, self._Xor())
+        return Intervals
+
+    def _Xor(self):
+        Intervals = self._And()
+        while self._Peek() == 'XOR':
+            self._Next()
+            Right = self._And()
+            Intervals = _Union(_Intersect(Intervals, _Complement(Right)), _Intersect(_Complement(Intervals), Right))
+        return Intervals
+
+    def _And(self):
+        Intervals = self._Unary()
+        while self._Peek() in ('AND', '&&'):
+            self._Next()
+            Intervals = _Intersect(Intervals, self._Unary())
+        return Intervals
+
+    def _Unary(self):
+        Token = self._Peek()
+        if Token in ('NOT', '!'):
+            self._Next()
+            return _Complement(self._Unary())
+        if Token == '(':
+            self._Next()
+            Intervals = self._Or()
+            if self._Next() != ')':
+                raise BadExpression('No matching right parenthesis in range: [%s]' % self._Range)
+            return Intervals
+        if Token in self._Comparisons:
+            Operator = self._Comparisons[self._Next()]
+            Number = self._Number()
+            if Operator == '<':
+                return [(0, Number - 1)] if Number > 0 else []
+            if Operator == '>':
+                return [(Number + 1, _MAX_VALUE_)] if Number < _MAX_VALUE_ else []
+            if Operator == '<=':
+                return [(0, Number)]
+            if Operator == '>=':
+                return [(Number, _MAX_VALUE_)]
+            if Operator == '==':
+                return [(Number, Number)]
+            return _Complement([(Number, Number)])
+        First = self._Number()
+        if self._Peek() != '-':
+            return [(First, First)]
+        self._Next()
+        Last = self._Number()
+        if Last < First:
+            raise BadExpression('Invalid range: [%s]' % self._Range)
+        return [(First, Last)]
+
+## The base class of the rules checking PCD values
+#
+#   @var ErrorCode: The error code of the rule
+#   @var Text:      The rule text after the error code
+#
+class PcdValidRule(object):
+    __slots__ = ('ErrorCode', 'Text')
+    RuleType = None
+
+    def __init__(self, ErrorCode, Text):
+        self.ErrorCode = ErrorCode
+        self.Text = Text
+
+    ## Check whether a value is allowed by the rule
+    def Check(self, Value, SymbolTable=None):
+        raise NotImplementedError
+
+    ## Check many values
+    #
+    #   @param  Values:         The list of values
+    #   @param  SymbolTable:    The values of other PCDs used by the rule,
+    #                           {token space GUID.PCD name: value}
+    #
+    #   @retval: A list of booleans, True for each value allowed
+    #
+    def CheckValues(self, Values, SymbolTable=None):
+        return [self.Check(Value, SymbolTable) for Value in Values]
+
+    def __repr__(self):
+        return '%s(%r, %r)' % (type(self).__name__, self.ErrorCode, self.Text)
+
+## The rule of @ValidRange, the value must be a number in the range
+class ValidRangeRule(PcdValidRule):
+    __slots__ = ('_Firsts', '_Lasts')
+    RuleType = TAB_VALID_RANGE
+
+    def __init__(self, ErrorCode, Text):
+        PcdValidRule.__init__(self, ErrorCode, Text)
+        Intervals = _RangeParser(Text).Parse()
+        self._Firsts = [First for First, _ in Intervals]
+        self._Lasts = [Last for _, Last in Intervals]
+
+    def Check(self, Value, SymbolTable=None):
+        Number = _ToNumber(Value)
+        if Number is None:
+            return False
+        Index = bisect_right(self._Firsts, Number) - 1
+        return Index >= 0 and Number <= self._Lasts[Index]
+
+## The rule of @ValidList, the value must be one of the comma separated values
+class ValidListRule(PcdValidRule):
+    __slots__ = ('_Numbers', '_Strings')
+    RuleType = TAB_VALID_LIST
+
+    def __init__(self, ErrorCode, Text):
+        PcdValidRule.__init__(self, ErrorCode, Text)
+        Items = [Item.strip() for Item in Text.split(',')]
+        if '' in Items:
+            raise BadExpression('Empty value in list: [%s]' % Text)
+        Numbers = [_ToNumber(Item) for Item in Items]
+        self._Numbers = frozenset(Number for Number in Numbers if Number is not None)
+        self._Strings = frozenset(Item for Item, Number in zip(Items, Numbers) if Number is None)
+
+    def Check(self, Value, SymbolTable=None):
+        Number = _ToNumber(Value)
+        if Number is not None:
+            return Number in self._Numbers
+        return str(Value).strip() in self._Strings
+
+## The rule of @Expression, the expression using the PCD must be true
+#
+#   @var PcdName:   The token space GUID.PCD name the expression is for
+#
+class ExpressionRule(PcdValidRule):
+    __slots__ = ('PcdName',)
+    RuleType = TAB_EXPRESSION
+
+    def __init__(self, ErrorCode, Text, PcdName):
+        PcdValidRule.__init__(self, ErrorCode, Text)
+        if not Text:
+            raise BadExpression('Empty expression is not allowed.')
+        self.PcdName = PcdName
+
+    def Check(self, Value, SymbolTable=None):
+        Symbols = dict(SymbolTable or {})
+        Symbols[self.PcdName] = Value
+        try:
+            Result = ValueExpression(self.Text, Symbols)(True)
+        except WrnExpression as Warn:
+            Result = Warn.result
+        except BadExpression:
+            return False
+        # the result could be a string, e.g. 'False'
+        return bool(_ToNumber(Result))
+
+## Compile a rule got by SplitValidComment()
+#
+#   @param  RuleType:   TAB_VALID_RANGE, TAB_VALID_LIST or TAB_EXPRESSION
+#   @param  ErrorCode:  The error code of the rule
+#   @param  Text:       The rule text
+#   @param  PcdName:    The token space GUID.PCD name the rule is for
+#
+#   @retval: A PcdValidRule. BadExpression is raised if the rule is invalid.
+#
+def CompileValidRule(RuleType, ErrorCode, Text, PcdName):
+    if RuleType == TAB_VALID_RANGE:
+        return ValidRangeRule(ErrorCode, Text)
+    if RuleType == TAB_VALID_LIST:
+        return ValidListRule(ErrorCode, Text)
+    return ExpressionRule(ErrorCode, Text, PcdName)
@@ -23,6 +23,7 @@ from CommonDataClass.Exceptions import (
 )
 from Common.LongFilePathSupport import OpenLongFilePath as open
 from Common.MultipleWorkspace import MultipleWorkspace as mws
+from Common.ParseContext import GetContext
 
 gHexVerPatt = re.compile('0x[a-f0-9]{4}[a-f0-9]{4}$', re.IGNORECASE)
 gHumanReadableVerPatt = re.compile(r'([1-9][0-9]*|0)\.[0-9]{1,2}$')
@@ -302,10 +303,11 @@ def ReplaceMacro(String, MacroDefinitions=None, SelfReplacement=False, RaiseErro
 #
 # @param Path:     The input value for Path to be converted
 # @param Defines:  A set for DEFINE statement
+# @param Context:  The ParseContext giving workspace, None for the default one
 #
 # @retval Path Formatted path
 #
-def NormPath(Path, Defines=None):
+def NormPath(Path, Defines=None, Context=None):
     IsRelativePath = False
     if Path:
         if Path[0] == '.':
@@ -319,17 +321,65 @@ def NormPath(Path, Defines=None):
         # To local path format
         #
         Path = os.path.normpath(Path)
-        if Path.startswith(GlobalData.gWorkspace) and not Path.startswith(GlobalData.gBuildDirectory) and not os.path.exists(Path):
-            Path = Path[len (GlobalData.gWorkspace):]
+        Context = GetContext(Context)
+        if Path.startswith(Context.Workspace) and not Path.startswith(Context.BuildDirectory) and not mws.exists(Path):
+            Path = Path[len (Context.Workspace):]
             if Path[0] == os.path.sep:
                 Path = Path[1:]
-            Path = mws.join(GlobalData.gWorkspace, Path)
+            Path = mws.join(Context.Workspace, Path)
 
     if IsRelativePath and Path[0] != '.':
         Path = os.path.join('.', Path)
 
     return Path
 
+# Patterns matching the part of line before comment character, by comment character
+_CommentPatterns = {}
+
+## Find the comment character which is not in a quoted string
+#
+# Quotes are not escaped: a quoted string ends at the next same quote, or at
+# the end of line if there's no more same quote, and the other quote in it
+# is plain character. The common case, a line without quote, is done with
+# str.find(), and the other lines with a regular expression. Comment
+# characters which are quotes or not one character are checked one by one
+# character of line.
+#
+# @param Line:              The string to be searched
+# @param CommentCharacter:  Comment char
+#
+# @retval (Index, CommentInString) The index of comment character, -1 if not
+#                                  found, and whether comment character is found
+#                                  in quoted string before it
+#
+def _FindComment(Line, CommentCharacter):
+    if len(CommentCharacter) == 1 and CommentCharacter not in '"\'':
+        if '"' not in Line and "'" not in Line:
+            return Line.find(CommentCharacter), False
+        Pattern = _CommentPatterns.get(CommentCharacter)
+        if Pattern is None:
+            Pattern = re.compile(r'''(?:[^"'%s]+|"[^"]*(?:"|\Z)|'[^']*(?:'|\Z))*''' % re.escape(CommentCharacter))
+            _CommentPatterns[CommentCharacter] = Pattern
+        Index = Pattern.match(Line).end()
+        CommentInString = CommentCharacter in Line[0:Index]
+        if Index == len(Line):
+            return -1, CommentInString
+        return Index, CommentInString
+
+    InDoubleQuoteString = False
+    InSingleQuoteString = False
+    CommentInString = False
+    for Index in range(0, len(Line)):
+        if Line[Index] == '"' and not InSingleQuoteString:
+            InDoubleQuoteString = not InDoubleQuoteString
+        elif Line[Index] == "'" and not InDoubleQuoteString:
+            InSingleQuoteString = not InSingleQuoteString
+        elif Line[Index] == CommentCharacter and (InSingleQuoteString or InDoubleQuoteString):
+            CommentInString = True
+        elif Line[Index] == CommentCharacter and not (InSingleQuoteString or InDoubleQuoteString):
+            return Index, CommentInString
+    return -1, CommentInString
+
 ## CleanString
 #
 # Remove comments in a string
@@ -353,19 +403,9 @@ def CleanString(Line, CommentCharacter=DataType.TAB_COMMENT_SPLIT, AllowCppStyle
     #
     # remove comments, but we should escape comment character in string
     #
-    InDoubleQuoteString = False
-    InSingleQuoteString = False
-    CommentInString = False
-    for Index in range(0, len(Line)):
-        if Line[Index] == '"' and not InSingleQuoteString:
-            InDoubleQuoteString = not InDoubleQuoteString
-        elif Line[Index] == "'" and not InDoubleQuoteString:
-            InSingleQuoteString = not InSingleQuoteString
-        elif Line[Index] == CommentCharacter and (InSingleQuoteString or InDoubleQuoteString):
-            CommentInString = True
-        elif Line[Index] == CommentCharacter and not (InSingleQuoteString or InDoubleQuoteString):
-            Line = Line[0: Index]
-            break
+    Index, CommentInString = _FindComment(Line, CommentCharacter)
+    if Index >= 0:
+        Line = Line[0: Index]
 
     if CommentInString and BuildOption:
         Line = Line.replace('"', '')
@@ -413,21 +453,11 @@ def CleanString2(Line, CommentCharacter=DataType.TAB_COMMENT_SPLIT, AllowCppStyl
     #
     # separate comments and statements, but we should escape comment character in string
     #
-    InDoubleQuoteString = False
-    InSingleQuoteString = False
-    CommentInString = False
     Comment = ''
-    for Index in range(0, len(Line)):
-        if Line[Index] == '"' and not InSingleQuoteString:
-            InDoubleQuoteString = not InDoubleQuoteString
-        elif Line[Index] == "'" and not InDoubleQuoteString:
-            InSingleQuoteString = not InSingleQuoteString
-        elif Line[Index] == CommentCharacter and (InDoubleQuoteString or InSingleQuoteString):
-            CommentInString = True
-        elif Line[Index] == CommentCharacter and not (InDoubleQuoteString or InSingleQuoteString):
-            Comment = Line[Index:].strip()
-            Line = Line[0:Index].strip()
-            break
+    Index = _FindComment(Line, CommentCharacter)[0]
+    if Index >= 0:
+        Comment = Line[Index:].strip()
+        Line = Line[0:Index].strip()
 
     return Line, Comment
 
@@ -0,0 +1,69 @@
+## @file
+# This file is used to define a dict which tells whether it has been changed
+#
+# SPDX-License-Identifier: BSD-2-Clause-Patent
+#
+
+##
+# Import Modules
+#
+from itertools import count
+
+# version numbers are unique among all VersionedDict objects
+_Versions = count(1)
+
+## A dict stamped with a new version number on each change
+#
+# Two VersionedDict objects having the same version have the same content, so
+# a result computed from some of them is still valid as long as their versions
+# are the same. Copies and unpickled objects get new versions.
+#
+#   @var Version:   The version number of current content
+#
+class VersionedDict(dict):
+    __slots__ = ('Version',)
+
+    def __init__(self, *Args, **Kwargs):
+        dict.__init__(self, *Args, **Kwargs)
+        self.Version = next(_Versions)
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+
+    def __setitem__(self, Key, Value):
+        dict.__setitem__(self, Key, Value)
+        self.Version = next(_Versions)
+
+    def __delitem__(self, Key):
+        dict.__delitem__(self, Key)
+        self.Version = next(_Versions)
+
+    def __ior__(self, Other):
+        self.update(Other)
+        return self
+
+    def update(self, *Args, **Kwargs):
+        dict.update(self, *Args, **Kwargs)
+        self.Version = next(_Versions)
+
+    def clear(self):
+        dict.clear(self)
+        self.Version = next(_Versions)
+
+    def pop(self, *Args):
+        Value = dict.pop(self, *Args)
+        self.Version = next(_Versions)
+        return Value
+
+    def popitem(self):
+        Item = dict.popitem(self)
+        self.Version = next(_Versions)
+        return Item
+
+    def setdefault(self, Key, Default=None):
+        if Key not in self:
+            self[Key] = Default
+        return dict.__getitem__(self, Key)
+
+    def copy(self):
+        return type(self)(self)
@@ -0,0 +1,313 @@
+## @file
+# This file is used to index the files in WORKSPACE and PACKAGES_PATH
+#
+# SPDX-License-Identifier: BSD-2-Clause-Patent
+#
+
+##
+# Import Modules
+#
+import os
+import pickle
+import tempfile
+
+from Common.MultipleWorkspace import MultipleWorkspace as mws
+from Common.ParseContext import GetContext
+
+## The index of all files and directories under some root directories
+#
+# The directories are walked once, then the existence of a path under them
+# is checked without accessing the file system. Paths not under the roots
+# are checked by os.path.exists(). The index can be used as GlobalData.gAllFiles:
+# index[Path] gives the path in the case of file system, or None.
+#
+# Each directory is indexed with its modification time, so Revalidate() only
+# rescans the directories whose entries have been added, removed or renamed.
+#
+#   @var Roots:     The root directories
+#
+class WorkspaceFileIndex(object):
+    # version of the data saved by Save()
+    VERSION = 1
+
+    ## Constructor
+    #
+    #   @param  Roots:  The list of root directories. A root in another root
+    #                   is walked only once.
+    #
+    def __init__(self, Roots):
+        Roots = [os.path.normpath(os.path.abspath(Root)) for Root in Roots if Root]
+        self.Roots = []
+        for Root in sorted(set(Roots), key=len):
+            if not self._IsUnder(Root, self.Roots):
+                self.Roots.append(Root)
+        # {directory: (modification time, file names, sub-directory names)}
+        self._Dirs = {}
+        self._Files = set()
+        # {lower case path: path}
+        self._Folded = {}
+        # directories linked to the directories containing them, not walked
+        self._Unwalked = set()
+
+    @staticmethod
+    def _IsUnder(Path, Roots):
+        for Root in Roots:
+            if Path == Root or Path.startswith(Root if Root.endswith(os.sep) else Root + os.sep):
+                return True
+        return False
+
+    ## Walk all root directories
+    def Build(self):
+        self._Dirs.clear()
+        self._Files.clear()
+        self._Folded.clear()
+        self._Unwalked.clear()
+        for Root in self.Roots:
+            self._Walk(Root)
+        return self
+
+    ## Index a directory and all directories in it
+    #
+    #   A directory linked to itself or to a directory containing it is not
+    #   walked again, and the paths in it are checked by os.path.exists().
+    #
+    #   @param  Top:        The directory
+    #   @param  Ancestors:  The real paths of the directories containing Top
+    #
+    def _Walk(self, Top, Ancestors=()):
+        Pending = [(Top, os.path.realpath(Top), Ancestors)]
+        while Pending:
+            Dir, RealDir, Ancestors = Pending.pop()
+            if RealDir in Ancestors:
+                self._Unwalked.add(Dir)
+                continue
+            Ancestors += (RealDir,)
+            for Name in self._ScanDir(Dir):
+                SubDir = os.path.join(Dir, Name)
+                if os.path.islink(SubDir):
+                    RealSubDir = os.path.realpath(SubDir)
+                else:
+                    RealSubDir = os.path.join(RealDir, Name)
+                Pending.append((SubDir, RealSubDir, Ancestors))
+
+    ## Index the entries of one directory
+    #
+    #   @retval: The names of sub-directories
+    #
+    def _ScanDir(self, Dir):
+        try:
+            Mtime = os.stat(Dir).st_mtime_ns
+            Entries = list(os.scandir(Dir))
+        except OSError:
+            return []
+        Files = []
+        SubDirs = []
+        for Entry in Entries:
+            try:
+                if Entry.is_dir():
+                    SubDirs.append(Entry.name)
+                elif Entry.is_file() or os.path.exists(Entry.path):
+                    Files.append(Entry.name)
+            except OSError:
+                pass
+        self._AddDir(Dir, (Mtime, Files, SubDirs))
+        return SubDirs
+
+    def _AddDir(self, Dir, Entry):
+        self._Dirs[Dir] = Entry
+        self._Folded[Dir.lower()] = Dir
+        for Name in Entry[1]:
+            Path = os.path.join(Dir, Name)
+            self._Files.add(Path)
+            self._Folded[Path.lower()] = Path
+
+    def _Forget(self, Path):
+        if self._Folded.get(Path.lower()) == Path:
+            del self._Folded[Path.lower()]
+
+    ## Remove the files of a directory from index
+    def _RemoveFiles(self, Dir, Entry):
+        for Name in Entry[1]:
+            Path = os.path.join(Dir, Name)
+            self._Files.discard(Path)
+            self._Forget(Path)
+
+    ## Remove a directory and all directories in it from index
+    def _RemoveDir(self, Dir):
+        Pending = [Dir]
+        while Pending:
+            Dir = Pending.pop()
+            Entry = self._Dirs.pop(Dir, None)
+            if Entry is None:
+                continue
+            self._Forget(Dir)
+            self._RemoveFiles(Dir, Entry)
+            Pending.extend(os.path.join(Dir, Name) for Name in Entry[2])
+
+    ## Rescan the directories changed since they were indexed
+    #
+    #   The path resolution cache of MultipleWorkspace is cleared if any
+    #   directory is rescanned, as its results could come from the old index.
+    #
+    #   @retval: The number of directories rescanned
+    #
+    def Revalidate(self):
+        Count = 0
+        for Dir in sorted(self._Dirs, key=len):
+            Entry = self._Dirs.get(Dir)
+            # removed together with the directory containing it
+            if Entry is None:
+                continue
+            try:
+                Mtime = os.stat(Dir).st_mtime_ns
+            except OSError:
+                Mtime = None
+            if Mtime == Entry[0]:
+                continue
+            Count += 1
+            if Mtime is None:
+                self._RemoveDir(Dir)
+            else:
+                self._Rescan(Dir, Entry)
+        if Count:
+            mws.invalidate()
+        return Count
+
+    ## Index the entries of a directory again
+    #
+    #   @param  Dir:    The directory
+    #   @param  Entry:  The entry of the directory in index
+    #
+    def _Rescan(self, Dir, Entry):
+        self._RemoveFiles(Dir, Entry)
+        SubDirs = self._ScanDir(Dir)
+        for Name in set(Entry[2]) - set(SubDirs):
+            self._RemoveDir(os.path.join(Dir, Name))
+        NewSubDirs = set(SubDirs) - set(Entry[2])
+        if NewSubDirs:
+            Ancestors = []
+            Parent = os.path.realpath(Dir)
+            while Parent not in Ancestors:
+                Ancestors.append(Parent)
+                Parent = os.path.dirname(Parent)
+            for Name in NewSubDirs:
+                self._Walk(os.path.join(Dir, Name), tuple(Ancestors))
+
+    ## Update the index for a file or directory created or removed
+    #
+    #   The nearest indexed directory containing the path is rescanned,
+    #   whatever its modification time is.
+    #
+    #   @param  Path:   The path of the file or directory
+    #
+    def Invalidate(self, Path):
+        Dir = os.path.dirname(os.path.normpath(os.path.abspath(Path)))
+        while Dir not in self._Dirs:
+            Parent = os.path.dirname(Dir)
+            if Parent == Dir or not self._IsUnder(Parent, self.Roots):
+                return
+            Dir = Parent
+        self._Rescan(Dir, self._Dirs[Dir])
+
+    ## Check whether a file or directory exists
+    def Exists(self, Path):
+        Path = os.path.normpath(os.path.abspath(Path))
+        if Path in self._Files or Path in self._Dirs:
+            return True
+        if self._IsUnder(Path, self.Roots) and not self._IsUnder(Path, self._Unwalked):
+            return False
+        return os.path.exists(Path)
+
+    ## Get the path in the case of file system
+    #
+    #   @param  Path:   The path to be checked, case insensitively
+    #
+    #   @retval: The path of the file or directory found, None if not found
+    #            or not under the roots
+    #
+    def __getitem__(self, Path):
+        Path = os.path.normpath(Path)
+        if Path in self._Files or Path in self._Dirs:
+            return Path
+        return self._Folded.get(Path.lower())
+
+    def __getstate__(self):
+        return (self.VERSION, self.Roots, self._Dirs, self._Unwalked)
+
+    def __setstate__(self, State):
+        Version = State[0]
+        if Version != self.VERSION:
+            raise ValueError('Version %s of workspace file index is not supported' % Version)
+        _, self.Roots, Dirs, self._Unwalked = State
+        self._Dirs = {}
+        self._Files = set()
+        self._Folded = {}
+        for Dir, Entry in Dirs.items():
+            self._AddDir(Dir, Entry)
+
+    ## Store the index in a file
+    #
+    #   It's written to a temporary file in the same directory first and then
+    #   renamed, so a reader never sees a partly written file.
+    #
+    def Save(self, FileName):
+        Handle, TempPath = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(FileName)))
+        try:
+            with os.fdopen(Handle, 'wb') as File:
+                pickle.dump(self, File, pickle.HIGHEST_PROTOCOL)
+            os.replace(TempPath, FileName)
+        except:
+            try:
+                os.remove(TempPath)
+            except OSError:
+                pass
+            raise
+
+    ## Get the index stored by Save()
+    #
+    #   @param  FileName:   The file storing index
+    #   @param  Roots:      The root directories expected
+    #
+    #   @retval: The WorkspaceFileIndex, None if the file can't be read or the
+    #            index is of other roots or version. It's not revalidated.
+    #
+    @classmethod
+    def Load(cls, FileName, Roots):
+        try:
+            with open(FileName, 'rb') as File:
+                Index = pickle.load(File)
+        except Exception:
+            return None
+        if not isinstance(Index, cls) or Index.Roots != cls(Roots).Roots:
+            return None
+        return Index
+
+## Check the file existence through one index of WORKSPACE and PACKAGES_PATH
+#
+#   The index is used by MultipleWorkspace, NormPath() and PathClass, and is
+#   set as the AllFiles of the context.
+#
+#   @param  Context:        The ParseContext, None for the default one
+#   @param  CacheFile:      The file to store index between runs, None not to
+#                           store it. A stored index is revalidated by
+#                           directory modification times.
+#
+#   @retval: The WorkspaceFileIndex
+#
+def UseWorkspaceIndex(Context=None, CacheFile=None):
+    Context = GetContext(Context)
+    Roots = [mws.WORKSPACE or Context.Workspace] + list(mws.PACKAGES_PATH or [])
+    Index = None
+    if CacheFile:
+        Index = WorkspaceFileIndex.Load(CacheFile, Roots)
+    if Index is None:
+        Index = WorkspaceFileIndex(Roots).Build()
+    else:
+        Index.Revalidate()
+    if CacheFile:
+        Index.Save(CacheFile)
+    mws.FileIndex = Index
+    # the cached results were got without the index
+    mws.invalidate()
+    Context.AllFiles = Index
+    return Index
@@ -0,0 +1,520 @@
+## @file
+# This file is used to measure the performance of the meta file parsers
+#
+# Usage: python ParserBenchmark.py [Count]
+#
+# SPDX-License-Identifier: BSD-2-Clause-Patent
+#
+
+##
+# Import Modules
+#
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from dataclasses import make_dataclass
+from sys import intern
+
+from parsers.MetaFileParser2 import DecParser, DscParser
+from parsers.MetaFileStore import DscLine, MetaFileStorage
+from parsers.PackageDatabase import PackageDatabase
+from parsers.PcdValidator import PcdValidator
+from CommonDataClass.DataClass import MODEL_FILE_DEC, MODEL_FILE_DSC, MODEL_PCD_FIXED_AT_BUILD
+from Common import DataType
+from Common.Expression import ValueExpressionEx
+from Common import GlobalData
+from Common.Misc import ParseFieldValue, PathClass
+from Common.MultipleWorkspace import MultipleWorkspace as mws
+from Common.ParseContext import ParseContext
+from Common.StringUtils import CleanString, CleanString2
+
+## Create the arguments of one DSC row the way the parser does
+#
+# Every string is cut from a line of text, so equal strings are distinct
+# objects as they would be when read from a real file.
+#
+def _DscRowArgs(Index):
+    Line = "gTokenSpaceGuid.PcdToken%d|0x%x|COMMON|DEFAULT|X64" % (Index, Index)
+    Fields = Line.split("|")
+    TokenSpace, Token = Fields[0].split(".")
+    return (Index, MODEL_PCD_FIXED_AT_BUILD, TokenSpace, Token, Fields[1],
+            Fields[4] if Index % 2 else Fields[2], Fields[3], Fields[2],
+            -1, -1, Index, -1, Index, -1, "".strip(), "".strip(), "".strip(), True)
+
+## Create a DscLine the way PlatformTable.Insert does, with interned scopes
+def _TableRow(*Args):
+    Args = list(Args)
+    for Index in (5, 6, 7):
+        Args[Index] = intern(Args[Index])
+    return DscLine(*Args)
+
+## Measure the memory retained by Count rows created by RowFactory
+#
+# The strings which are only referenced by the rows are counted as well.
+#
+#   @retval: The number of bytes per row
+#
+def _MeasureRows(RowFactory, Count):
+    tracemalloc.start()
+    Before = tracemalloc.get_traced_memory()[0]
+    Rows = [RowFactory(*_DscRowArgs(Index)) for Index in range(Count)]
+    After = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (After - Before) / len(Rows)
+
+## Compare the memory used by a DscLine with a plain dataclass row
+def BenchRowMemory(Count=100000):
+    DataclassLine = make_dataclass("DataclassLine", DscLine._FIELDS_)
+    DataclassSize = _MeasureRows(DataclassLine, Count)
+    SlottedSize = _MeasureRows(_TableRow, Count)
+    print("Row memory (%d rows)" % Count)
+    print("    dataclass row: %8.1f bytes/row" % DataclassSize)
+    print("    DscLine      : %8.1f bytes/row" % SlottedSize)
+    print("    saved        : %8.1f%%" % ((DataclassSize - SlottedSize) * 100.0 / DataclassSize))
+
+## CleanString implemented by checking one by one character, as the reference
+def _CleanStringReference(Line, CommentCharacter=DataType.TAB_COMMENT_SPLIT, AllowCppStyleComment=False, BuildOption=False):
+    Line = Line.strip()
+    if AllowCppStyleComment:
+        Line = Line.replace(DataType.TAB_COMMENT_EDK_SPLIT, CommentCharacter)
+    InDoubleQuoteString = False
+    InSingleQuoteString = False
+    CommentInString = False
+    for Index in range(0, len(Line)):
+        if Line[Index] == '"' and not InSingleQuoteString:
+            InDoubleQuoteString = not InDoubleQuoteString
+        elif Line[Index] == "'" and not InDoubleQuoteString:
+            InSingleQuoteString = not InSingleQuoteString
+        elif Line[Index] == CommentCharacter and (InSingleQuoteString or InDoubleQuoteString):
+            CommentInString = True
+        elif Line[Index] == CommentCharacter and not (InSingleQuoteString or InDoubleQuoteString):
+            Line = Line[0: Index]
+            break
+    if CommentInString and BuildOption:
+        Line = Line.replace('"', '')
+        ChIndex = Line.find('#')
+        while ChIndex >= 0:
+            if GlobalData.gIsWindows:
+                if ChIndex == 0 or Line[ChIndex - 1] != '^':
+                    Line = Line[0:ChIndex] + '^' + Line[ChIndex:]
+                    ChIndex = Line.find('#', ChIndex + 2)
+                else:
+                    ChIndex = Line.find('#', ChIndex + 1)
+            else:
+                if ChIndex == 0 or Line[ChIndex - 1] != '\\':
+                    Line = Line[0:ChIndex] + '\\' + Line[ChIndex:]
+                    ChIndex = Line.find('#', ChIndex + 2)
+                else:
+                    ChIndex = Line.find('#', ChIndex + 1)
+    return Line.strip()
+
+## CleanString2 implemented by checking one by one character, as the reference
+def _CleanString2Reference(Line, CommentCharacter=DataType.TAB_COMMENT_SPLIT, AllowCppStyleComment=False):
+    Line = Line.strip()
+    if AllowCppStyleComment:
+        Line = Line.replace(DataType.TAB_COMMENT_EDK_SPLIT, CommentCharacter)
+    InDoubleQuoteString = False
+    InSingleQuoteString = False
+    Comment = ''
+    for Index in range(0, len(Line)):
+        if Line[Index] == '"' and not InSingleQuoteString:
+            InDoubleQuoteString = not InDoubleQuoteString
+        elif Line[Index] == "'" and not InDoubleQuoteString:
+            InSingleQuoteString = not InSingleQuoteString
+        elif Line[Index] == CommentCharacter and not (InDoubleQuoteString or InSingleQuoteString):
+            Comment = Line[Index:].strip()
+            Line = Line[0:Index].strip()
+            break
+    return Line, Comment
+
+# Typical lines of DSC, INF and DEC files
+_META_FILE_LINES = [
+    "[Defines]",
+    "  PLATFORM_NAME                  = OvmfX64",
+    "  PLATFORM_GUID                  = 5a9e7754-d81b-49ea-85ad-69eaa7b1539b  # platform",
+    "  OUTPUT_DIRECTORY               = Build/OvmfX64",
+    "  SUPPORTED_ARCHITECTURES        = X64",
+    "  DEFINE SECURE_BOOT_ENABLE      = FALSE",
+    "!if $(TARGET) == DEBUG",
+    "!include OvmfPkg/OvmfTpmDefines.dsc.inc",
+    "[LibraryClasses.common.DXE_DRIVER]",
+    "  PcdLib|MdePkg/Library/DxePcdLib/DxePcdLib.inf",
+    "  DebugLib|OvmfPkg/Library/PlatformDebugLibIoPort/PlatformDebugLibIoPort.inf  # Comment",
+    "  MdePkg/Library/BaseMemoryLibRepStr/BaseMemoryLibRepStr.inf {",
+    "    <PcdsFixedAtBuild>",
+    "      gEfiMdePkgTokenSpaceGuid.PcdDebugPrintErrorLevel|0x80000000",
+    "  }",
+    "[PcdsFixedAtBuild]",
+    "  gEfiMdeModulePkgTokenSpaceGuid.PcdFirmwareVendor|L\"EDK II\"",
+    "  gEfiMdeModulePkgTokenSpaceGuid.PcdStatusCodeMemorySize|1",
+    "  gUefiOvmfPkgTokenSpaceGuid.PcdOvmfFlashNvStorageEventLogSize|0x2000 # size",
+    "  gEfiMdePkgTokenSpaceGuid.PcdDefaultTerminalType|4",
+    "  gEfiMdeModulePkgTokenSpaceGuid.PcdBootManagerMenuFile|{ 0xdc, 0x5b, 0xc2, 0xee, 0xf2, 0x67, 0x95, 0x4d }",
+    "  gTokenSpaceGuid.PcdString|\"abc # not a comment\" # comment",
+    "  gTokenSpaceGuid.PcdChar|'#' # comment",
+    "[BuildOptions]",
+    "  GCC:*_*_*_CC_FLAGS = -DDISABLE_NEW_DEPRECATED_INTERFACES",
+    "  MSFT:*_*_*_CC_FLAGS = /D \"MDEPKG_NDEBUG\" /D \"NAME=#x\"",
+    "# This is a comment line",
+    "",
+    "[Sources]",
+    "  Fat.c",
+    "  ReadWrite.c  // EDK style comment",
+    "[Packages]",
+    "  MdePkg/MdePkg.dec",
+    "[Protocols]",
+    "  gEfiBlockIoProtocolGuid                       ## TO_START",
+    "[Guids.common]",
+    "  gEfiMdePkgTokenSpaceGuid = { 0x914AEBE7, 0x4635, 0x459b, { 0xAA, 0x1C, 0x11, 0xE2, 0x19, 0xB0, 0x3A, 0x10 }}",
+    "  ## @Prompt Maximum number of Unicode string characters.",
+    "  gEfiMdePkgTokenSpaceGuid.PcdMaximumUnicodeStringLength|1000000|UINT32|0x00000001",
+    "  gEfiMdePkgTokenSpaceGuid.PcdUefiVariableDefaultPlatformLang|\"en-US\"|VOID*|0x0000001d",
+]
+
+## Get the lines to check CleanString with: typical lines, special cases and random lines
+def _CleanStringCorpus(Count=20000):
+    Lines = list(_META_FILE_LINES)
+    Lines += ['"', "'", '#', '"#', "'#", '"#"#', "'\"#'#", '"\'#"#', 'a"b#', "a'b#c'd#e", '\\"#"#',
+              '  # leading comment', 'a // b', '"//" // c', 'a;b', '"a;b";c', "x\ny#z", "\t#\t"]
+    Random = random.Random(0)
+    Alphabet = 'ab #"\';/\\\t\n'
+    for _ in range(Count):
+        Lines.append(''.join(Random.choice(Alphabet) for _ in range(Random.randint(0, 16))))
+    return Lines
+
+## Check CleanString and CleanString2 against the reference implementations
+#
+#   @retval: The number of cases checked. AssertionError is raised if any
+#            result is different.
+#
+def CheckCleanString(Count=20000):
+    Cases = 0
+    IsWindows = GlobalData.gIsWindows
+    try:
+        for Line in _CleanStringCorpus(Count):
+            for CommentCharacter in ('#', ';', '"', "'", '//', ''):
+                for AllowCppStyleComment in (False, True):
+                    Expected = _CleanString2Reference(Line, CommentCharacter, AllowCppStyleComment)
+                    Result = CleanString2(Line, CommentCharacter, AllowCppStyleComment)
+                    assert Result == Expected, (Line, CommentCharacter, AllowCppStyleComment, Result, Expected)
+                    for BuildOption in (False, True):
+                        for GlobalData.gIsWindows in (False, True):
+                            Expected = _CleanStringReference(Line, CommentCharacter, AllowCppStyleComment, BuildOption)
+                            Result = CleanString(Line, CommentCharacter, AllowCppStyleComment, BuildOption)
+                            assert Result == Expected, (Line, CommentCharacter, AllowCppStyleComment, BuildOption, Result, Expected)
+                            Cases += 1
+    finally:
+        GlobalData.gIsWindows = IsWindows
+    return Cases
+
+## Compare the time CleanString and CleanString2 take with the reference implementations
+def BenchCleanString(Count=100):
+    print("CleanString (%d identical cases)" % CheckCleanString())
+    for Name, Function, Reference in (("CleanString ", CleanString, _CleanStringReference),
+                                      ("CleanString2", CleanString2, _CleanString2Reference)):
+        Time = timeit.timeit(lambda: [Function(Line) for Line in _META_FILE_LINES], number=Count)
+        ReferenceTime = timeit.timeit(lambda: [Reference(Line) for Line in _META_FILE_LINES], number=Count)
+        print("    %s: %8.2f us/line, reference %8.2f us/line, %5.1fx" % (Name,
+              Time * 1e6 / Count / len(_META_FILE_LINES), ReferenceTime * 1e6 / Count / len(_META_FILE_LINES),
+              ReferenceTime / Time))
+
+## Write a platform whose PCDs are all in !include files
+#
+#   @param  Workspace:  The directory to write files in
+#   @param  Count:      The number of PCDs
+#   @param  Includes:   The number of !include files
+#
+#   @retval: The PathClass of the DSC file
+#
+def _WriteIncludePlatform(Workspace, Count, Includes):
+    Lines = ["[Defines]",
+             "  PLATFORM_NAME           = Bench",
+             "  PLATFORM_GUID           = 11111111-2222-3333-4444-555555555555",
+             "  PLATFORM_VERSION        = 0.1",
+             "  DSC_SPECIFICATION       = 0x00010005",
+             "  OUTPUT_DIRECTORY        = Build/Bench",
+             "  SUPPORTED_ARCHITECTURES = X64",
+             "  BUILD_TARGETS           = DEBUG",
+             "",
+             "[PcdsFixedAtBuild]"]
+    for Include in range(Includes):
+        FileName = "Pcds%d.dsc.inc" % Include
+        with open(os.path.join(Workspace, FileName), "w") as File:
+            for Index in range(Include * Count // Includes, (Include + 1) * Count // Includes):
+                File.write("  gBenchTokenSpaceGuid.PcdToken%d|0x%x\n" % (Index, Index))
+        Lines.append("!include %s" % FileName)
+    with open(os.path.join(Workspace, "Bench.dsc"), "w") as File:
+        File.write("\n".join(Lines) + "\n")
+    return PathClass("Bench.dsc", Workspace)
+
+## Measure the post-process of platforms having more and more !include files
+#
+# The records of !include files are pushed on a stack of record lists during
+# post-process, so the time per record should stay the same as the platform
+# grows.
+#
+def BenchIncludes(Count=100000, Includes=400):
+    print("DSC post-process with !include")
+    for Scale in (4, 2, 1):
+        Workspace = tempfile.mkdtemp()
+        try:
+            DscFile = _WriteIncludePlatform(Workspace, Count // Scale, Includes // Scale)
+            mws.setWs(Workspace)
+            Context = ParseContext(Workspace)
+            Parser = DscParser(DscFile, MODEL_FILE_DSC, DataType.TAB_ARCH_COMMON,
+                               MetaFileStorage(DscFile, MODEL_FILE_DSC, Context=Context), Context=Context)
+            Parser.StartParse()
+            Start = time.perf_counter()
+            Records = len(Parser[MODEL_PCD_FIXED_AT_BUILD, DataType.TAB_ARCH_COMMON])
+            Time = time.perf_counter() - Start
+        finally:
+            shutil.rmtree(Workspace)
+        print("    %4d files, %7d records: %6.2f s, %5.1f us/record" % (Includes // Scale, Records, Time,
+                                                                      Time * 1e6 / Records))
+
+## Write a DSC file having some of its PCDs set by TARGET
+#
+#   @param  Workspace:  The directory to write the file in
+#   @param  Count:      The number of PCDs
+#   @param  Blocks:     The number of !if blocks, each one setting one PCD
+#
+#   @retval: The PathClass of the DSC file
+#
+def _WriteConditionalPlatform(Workspace, Count, Blocks):
+    Lines = ["[Defines]",
+             "  PLATFORM_NAME           = Bench",
+             "  PLATFORM_GUID           = 11111111-2222-3333-4444-555555555555",
+             "  PLATFORM_VERSION        = 0.1",
+             "  DSC_SPECIFICATION       = 0x00010005",
+             "  OUTPUT_DIRECTORY        = Build/Bench",
+             "  SUPPORTED_ARCHITECTURES = X64",
+             "  BUILD_TARGETS           = DEBUG|RELEASE",
+             "",
+             "[PcdsFixedAtBuild]"]
+    for Index in range(Count):
+        if Index % (Count // Blocks) == 0:
+            Lines.extend(["!if $(TARGET) == DEBUG",
+                          "  gBenchTokenSpaceGuid.PcdToken%d|0x%x" % (Index, Index),
+                          "!else",
+                          "  gBenchTokenSpaceGuid.PcdToken%d|0" % Index,
+                          "!endif"])
+        else:
+            Lines.append("  gBenchTokenSpaceGuid.PcdToken%d|0x%x" % (Index, Index))
+    with open(os.path.join(Workspace, "Bench.dsc"), "w") as File:
+        File.write("\n".join(Lines) + "\n")
+    return PathClass("Bench.dsc", Workspace)
+
+## Compare the time of post-processing a platform with the time of patching it for a new TARGET
+def BenchMacroUpdate(Count=100000, Blocks=100):
+    print("DSC update of command line macros")
+    Workspace = tempfile.mkdtemp()
+    try:
+        DscFile = _WriteConditionalPlatform(Workspace, Count, Blocks)
+        mws.setWs(Workspace)
+        Context = ParseContext(Workspace, CommandLineDefines={'TARGET': 'DEBUG'})
+        Parser = DscParser(DscFile, MODEL_FILE_DSC, DataType.TAB_ARCH_COMMON,
+                           MetaFileStorage(DscFile, MODEL_FILE_DSC, Context=Context), Context=Context)
+        Parser.StartParse()
+        Start = time.perf_counter()
+        Parser._PostProcess()
+        Full = time.perf_counter() - Start
+        Start = time.perf_counter()
+        Ranges = Parser.UpdateMacros({'TARGET': 'RELEASE'})
+        Update = time.perf_counter() - Start
+    finally:
+        shutil.rmtree(Workspace)
+    print("    post-process %7d records: %6.2f s" % (len(Parser._Table.GetRecords()), Full))
+    print("    update TARGET, %4d ranges: %6.2f s" % (len(Ranges), Update))
+
+## Write a DEC file declaring many PCDs
+#
+# Every tenth PCD takes its value from an expression using the PCD before
+# it, so the PCDs declared so far are looked up while parsing.
+#
+#   @param  Workspace:  The directory to write the file in
+#   @param  Count:      The number of PCDs
+#
+#   @retval: The PathClass of the DEC file
+#
+def _WritePackage(Workspace, Count, Rules=False):
+    Lines = ["[Defines]",
+             "  DEC_SPECIFICATION = 0x00010005",
+             "  PACKAGE_NAME      = BenchPkg",
+             "  PACKAGE_GUID      = 11111111-2222-3333-4444-555555555555",
+             "  PACKAGE_VERSION   = 0.1",
+             "",
+             "[Guids]",
+             "  gBenchTokenSpaceGuid = { 0x11111111, 0x2222, 0x3333, { 0x44, 0x44, 0x55, 0x55, 0x55, 0x55, 0x55, 0x55 }}",
+             "",
+             "[PcdsFixedAtBuild]"]
+    for Index in range(Count):
+        if Index % 10 == 1:
+            Value = "gBenchTokenSpaceGuid.PcdToken%d + 1" % (Index - 1)
+        else:
+            Value = "0x%x" % Index
+        if Rules:
+            Lines.append("  ## @ValidRange 0x80000001 | 0 - 0x%x" % (Index + 10))
+        Lines.append("  gBenchTokenSpaceGuid.PcdToken%d|%s|UINT32|0x%x" % (Index, Value, Index + 1))
+    with open(os.path.join(Workspace, "BenchPkg.dec"), "w") as File:
+        File.write("\n".join(Lines) + "\n")
+    return PathClass("BenchPkg.dec", Workspace)
+
+## Measure the parse of DEC files having more and more PCDs
+#
+# Duplicates are checked in a set and expressions look up the PCDs declared
+# so far in place, so the time per PCD should stay the same as the package
+# grows.
+#
+def BenchDecPcds(Count=20000):
+    print("DEC parse with many PCDs")
+    for Scale in (8, 4, 2, 1):
+        Workspace = tempfile.mkdtemp()
+        try:
+            DecFile = _WritePackage(Workspace, Count // Scale)
+            mws.setWs(Workspace)
+            Context = ParseContext(Workspace)
+            Parser = DecParser(DecFile, MODEL_FILE_DEC, DataType.TAB_ARCH_COMMON,
+                               MetaFileStorage(DecFile, MODEL_FILE_DEC, Context=Context), Context=Context)
+            Start = time.perf_counter()
+            Records = len(Parser[MODEL_PCD_FIXED_AT_BUILD])
+            Time = time.perf_counter() - Start
+        finally:
+            shutil.rmtree(Workspace)
+        print("    %7d PCDs: %6.2f s, %5.1f us/PCD" % (Records, Time, Time * 1e6 / Records))
+
+## Measure the build of package database and its refresh after one DEC file changes
+#
+# Only the changed file should be parsed again, so a refresh should take a
+# small part of the time of a full build.
+#
+def BenchPackageDatabase(Count=20000, Packages=40):
+    print("Package database of %d DEC files" % Packages)
+    Workspace = tempfile.mkdtemp()
+    try:
+        for Index in range(Packages):
+            os.mkdir(os.path.join(Workspace, "Pkg%d" % Index))
+            _WritePackage(os.path.join(Workspace, "Pkg%d" % Index), Count // Packages)
+        mws.setWs(Workspace)
+        Context = ParseContext(Workspace)
+        Start = time.perf_counter()
+        Database = PackageDatabase([Workspace]).Build(Context=Context)
+        Time = time.perf_counter() - Start
+        print("    build:   %6.2f s" % Time)
+        with open(os.path.join(Workspace, "Pkg0", "BenchPkg.dec"), "a") as File:
+            File.write("\n")
+        Start = time.perf_counter()
+        Parsed = Database.Refresh(Context=Context)
+        Time = time.perf_counter() - Start
+        print("    refresh: %6.2f s, %d DEC file parsed" % (Time, Parsed))
+        Start = time.perf_counter()
+        for Index in range(Count // Packages):
+            Database.GetPcd("gBenchTokenSpaceGuid", "PcdToken%d" % Index)
+        Time = time.perf_counter() - Start
+        print("    lookup:  %6.2f us/PCD" % (Time * 1e6 / (Count // Packages)))
+    finally:
+        shutil.rmtree(Workspace)
+
+## Measure getting the validation rules of every PCD of a package
+#
+# The comments are indexed once for all PCDs, so the time per PCD should not
+# grow with the package.
+#
+def BenchValidRules(Count=20000):
+    print("Validation rules of all PCDs of a package")
+    for Scale in (4, 1):
+        Workspace = tempfile.mkdtemp()
+        try:
+            DecFile = _WritePackage(Workspace, Count // Scale, True)
+            mws.setWs(Workspace)
+            Context = ParseContext(Workspace)
+            Parser = DecParser(DecFile, MODEL_FILE_DEC, DataType.TAB_ARCH_COMMON,
+                               MetaFileStorage(DecFile, MODEL_FILE_DEC, Context=Context), Context=Context)
+            Pcds = [(Record.Value1, Record.Value2) for Record in Parser[MODEL_PCD_FIXED_AT_BUILD]]
+            Start = time.perf_counter()
+            for TokenSpaceGuid, PcdCName in Pcds:
+                Parser.GetValidExpression(TokenSpaceGuid, PcdCName)
+            Time = time.perf_counter() - Start
+            Start = time.perf_counter()
+            Failed = 0
+            for TokenSpaceGuid, PcdCName in Pcds:
+                for Rule in Parser.GetValidRules(TokenSpaceGuid, PcdCName):
+                    Failed += Rule.CheckValues(range(0, 100, 10)).count(False)
+            CheckTime = time.perf_counter() - Start
+        finally:
+            shutil.rmtree(Workspace)
+        print("    %7d PCDs: %5.1f us/PCD to get texts, %5.1f us/PCD to check 10 values (%d failed)"
+              % (len(Pcds), Time * 1e6 / len(Pcds), CheckTime * 1e6 / len(Pcds), Failed))
+
+## Measure the validation of all PCD settings of a platform against the DEC declarations
+#
+# Each setting is checked by a few lookups and cached checks, so validating
+# thousands of settings should take milliseconds.
+#
+def BenchPcdValidation(Count=5000):
+    print("Validation of %d PCD settings" % Count)
+    Workspace = tempfile.mkdtemp()
+    try:
+        _WritePackage(Workspace, Count, True)
+        DscFile = _WriteIncludePlatform(Workspace, Count, max(1, Count // 250))
+        mws.setWs(Workspace)
+        Context = ParseContext(Workspace)
+        Parser = DscParser(DscFile, MODEL_FILE_DSC, DataType.TAB_ARCH_COMMON,
+                           MetaFileStorage(DscFile, MODEL_FILE_DSC, Context=Context), Context=Context)
+        Parser[MODEL_PCD_FIXED_AT_BUILD, DataType.TAB_ARCH_COMMON]
+        Validator = PcdValidator(PackageDatabase([Workspace]).Build(1, Context), Context)
+        for Run in ("first", "again"):
+            Start = time.perf_counter()
+            Violations = Validator.Validate(Parser)
+            Time = time.perf_counter() - Start
+            print("    %s: %6.1f ms, %4.1f us/setting, %d violations" % (Run, Time * 1e3, Time * 1e6 / Count,
+                                                                       len(Violations)))
+    finally:
+        shutil.rmtree(Workspace)
+
+## Write a byte array initializer of VOID* PCD
+#
+#   @param  Size:       The number of bytes
+#   @param  Mixed:      True to put an element needing evaluation, e.g. UINT16(0x1234),
+#                       in every 256 bytes
+#
+def _ByteArrayValue(Size, Mixed=False):
+    Random = random.Random(Size)
+    Items = []
+    while len(Items) < Size:
+        if Mixed and len(Items) % 256 == 255:
+            Items.append('UINT16(0x%04X)' % Random.randrange(0x10000))
+            Items.append('')
+        Items.append(Random.choice(('0x%02X', '%d')) % Random.randrange(256))
+    return '{' + ', '.join(Item for Item in Items if Item) + '}'
+
+## Measure the conversion of large byte arrays of VOID* PCDs, e.g. VPD and HII blobs
+#
+# Arrays of plain numbers are converted at once, so the time should grow
+# linearly with the size of the array.
+#
+def BenchByteArrays(Size=65536):
+    print("Byte arrays of VOID* PCDs")
+    for Scale in (4, 1):
+        for Mixed in (False, True):
+            Value = _ByteArrayValue(Size // Scale, Mixed)
+            Time = timeit.timeit(lambda: ValueExpressionEx(Value, DataType.TAB_VOID, {})(True), number=3) / 3
+            FieldTime = timeit.timeit(lambda: ParseFieldValue(Value), number=3) / 3
+            print("    %6d bytes%s: %7.1f ms to evaluate, %7.1f ms to get the value"
+                  % (Size // Scale, " (mixed)" if Mixed else "        ", Time * 1e3, FieldTime * 1e3))
+
+if __name__ == "__main__":
+    Count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    BenchRowMemory(Count)
+    BenchCleanString(max(1, Count // 100))
+    BenchIncludes(Count, max(4, Count // 250))
+    BenchMacroUpdate(Count, max(1, Count // 1000))
+    BenchDecPcds(max(10000, Count // 5))
+    BenchPackageDatabase(max(10000, Count // 5))
+    BenchValidRules(max(10000, Count // 5))
+    BenchPcdValidation(max(5000, Count // 20))
+    BenchByteArrays()
@@ -0,0 +1,251 @@
+## @file
+# This file is used to evaluate a DSC file under many sets of macros
+#
+# SPDX-License-Identifier: BSD-2-Clause-Patent
+#
+
+##
+# Import Modules
+#
+import multiprocessing
+import re
+from collections import Counter
+
+import Common.DataType as DT
+import CommonDataClass.DataClass as DC
+import Common.GlobalData as GlobalData
+from Common.Misc import PathClass
+from Common.ParseContext import ParseContext, GetContext
+from . import InfBatchParser
+from .MetaFileParser2 import DscParser
+from .MetaFileStore import MetaFileStorage, PlatformTable
+
+## RegEx for the lines of conditional directives, whose bare names could be macros too
+_ConditionPattern = re.compile(r'\s*!\s*(if|ifdef|ifndef|elseif)\b', re.IGNORECASE)
+_NamePattern = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
+## The result of evaluating a DSC file under one set of macros
+#
+#   @var Macros:        The macros given for the variant
+#   @var Table:         The post-processed PlatformTable. Variants evaluated
+#                       the same share one table, which must not be changed.
+#   @var PlatformPcds:  The values of PCDs set in DSC file, {name: value}
+#   @var EvaluatedAs:   The index of the variant which is post-processed
+#                       for this one, its own index if post-processed itself
+#
+class DscVariant(object):
+    __slots__ = ('Macros', 'Table', 'PlatformPcds', 'EvaluatedAs')
+
+    def __init__(self, Macros, Table=None, PlatformPcds=None, EvaluatedAs=-1):
+        self.Macros = Macros
+        self.Table = Table
+        self.PlatformPcds = PlatformPcds or {}
+        self.EvaluatedAs = EvaluatedAs
+
+    def __repr__(self):
+        return 'DscVariant(%r, %d records, %d)' % (self.Macros, len(self.Table.GetAll()) if self.Table else 0,
+                                                 self.EvaluatedAs)
+
+## Get the names of the macros files could use
+#
+#   The names are the ones used as $(NAME), and all names in conditional
+#   directives as !ifdef uses bare macro names. Comments are not removed, so
+#   more names could be got than used, never less.
+#
+#   @param  FileList:   The list of files
+#   @param  Context:    The ParseContext reading files
+#   @param  RefOnly:    Get the names used as $(NAME) only
+#
+#   @retval: A set of names
+#
+def _GetMacroNames(FileList, Context, RefOnly=False):
+    Names = set()
+    for FilePath in FileList:
+        for Line in Context.FileContents.GetLines(FilePath):
+            if '$(' in Line:
+                Names.update(GlobalData.gMacroRefPattern.findall(Line))
+            if not RefOnly and _ConditionPattern.match(Line):
+                Names.update(_NamePattern.findall(Line))
+    return Names
+
+## Get the values of some macros of a variant, as a key to compare variants
+def _MacroKey(Names, Macros):
+    return tuple((Name, Macros.get(Name)) for Name in sorted(Names))
+
+## Get the context of a variant, sharing file contents and !include records with the base context
+#
+#   @param  Base:       The ParseContext giving workspace, global macros and options
+#   @param  Macros:     The macros of variant, added to the command line macros of Base
+#
+def _GetVariantContext(Base, Macros):
+    Defines = dict(Base.CommandLineDefines)
+    Defines.update(Macros)
+    Context = ParseContext(Base.Workspace, Base.GlobalDefines, Defines)
+    Context.AllFiles = Base.AllFiles
+    Context.CaseInsensitive = Base.CaseInsensitive
+    Context.Options = Base.Options
+    Context.FileContents = Base.FileContents
+    Context.IncludeRecords = Base.IncludeRecords
+    return Context
+
+# The raw tables of the DSC file of a worker process, {raw key: raw data}
+_WorkerRawTables = None
+_WorkerDscFile = None
+
+## Initialize a worker process with the status of parent process
+def _InitWorker(State):
+    global _WorkerRawTables, _WorkerDscFile
+    InfBatchParser._InitWorker(State)
+    _WorkerRawTables = State['RawTables']
+    _WorkerDscFile = State['DscFile']
+
+## Post-process the DSC file for one variant
+#
+#   @param  Args:       (variant index, macros, raw key)
+#   @param  DscFile:    The DSC file PathClass, None for the one of worker process
+#   @param  RawTables:  The raw tables, None for the ones of worker process
+#   @param  Base:       The base ParseContext, None for the one of worker process
+#
+#   @retval: (variant index, post-processed records, last ID, PCD values,
+#            names of the macros the DSC file and its !include files could use)
+#
+def _EvaluateVariant(Args, DscFile=None, RawTables=None, Base=None):
+    Index, Macros, RawKey = Args
+    DscFile = DscFile or _WorkerDscFile
+    RawTables = RawTables or _WorkerRawTables
+    Context = _GetVariantContext(Base or InfBatchParser._WorkerContext, Macros)
+    Parser = DscParser(DscFile, DC.MODEL_FILE_DSC, DT.TAB_ARCH_COMMON,
+                       MetaFileStorage(DscFile, DC.MODEL_FILE_DSC, Context=Context), Context=Context)
+    Parser.LoadRawTable(RawTables[RawKey])
+    Parser._PostProcess()
+    FileList = [DscFile] + [IncludedFile for IncludedFile, _, _, _, _ in Parser.GetIncludeGraph()]
+    return (Index, Parser._Table.Dump(), Parser._Table.ID, dict(Context.PlatformPcds),
+            _GetMacroNames(FileList, Context))
+
+## Evaluate a DSC file under many sets of macros
+#
+#   The raw table is parsed once for the variants giving the same values to
+#   the macros used as $(NAME) in the DSC file, and shared by them. Variants
+#   giving the same values to all macros the DSC file and the files it
+#   includes could use evaluate every directive the same, so only one of
+#   them is post-processed. Variants are post-processed in Jobs worker
+#   processes, each one in a context of its own as if it were the only one.
+#
+#   @param  DscFile:    The DSC file path
+#   @param  MacroSets:  The list of variants, each one a dict of macros added
+#                       to the command line macros of Context, e.g. TARGET,
+#                       TOOL_CHAIN_TAG and -D macros
+#   @param  Jobs:       The number of worker processes, None for the number of
+#                       CPUs, 1 to evaluate in current process
+#   @param  Context:    The ParseContext giving workspace, global macros and
+#                       options, None for the default one. Its PCD and macro
+#                       maps are not changed.
+#
+#   @retval: (list of DscVariant in the order of MacroSets, differences). The
+#            differences are got by GetVariantDifferences().
+#
+def EvaluateDscMatrix(DscFile, MacroSets, Jobs=None, Context=None):
+    Context = GetContext(Context)
+    if not isinstance(DscFile, PathClass):
+        DscFile = PathClass(DscFile, Context.Workspace)
+    MacroSets = [dict(Macros) for Macros in MacroSets]
+    # a macro given by a variant could use other macros
+    ValueNames = set()
+    for Macros in MacroSets:
+        for Value in Macros.values():
+            ValueNames.update(GlobalData.gMacroRefPattern.findall(str(Value)))
+
+    # one raw table for each set of values of the macros the raw parse uses
+    RawNames = _GetMacroNames([DscFile], Context, True) | ValueNames
+    RawKeys = [_MacroKey(RawNames, Macros) for Macros in MacroSets]
+    RawTables = {}
+    for Macros, RawKey in zip(MacroSets, RawKeys):
+        if RawKey in RawTables:
+            continue
+        RawContext = _GetVariantContext(Context, Macros)
+        Parser = DscParser(DscFile, DC.MODEL_FILE_DSC, DT.TAB_ARCH_COMMON,
+                           MetaFileStorage(DscFile, DC.MODEL_FILE_DSC, Context=RawContext), Context=RawContext)
+        Parser.StartParse()
+        RawTables[RawKey] = Parser.DumpRawTable()
+
+    if Jobs is None:
+        Jobs = multiprocessing.cpu_count()
+    Jobs = min(Jobs, len(MacroSets))
+    Pool = None
+    if Jobs > 1:
+        State = InfBatchParser._GetWorkerState(Context)
+        State['RawTables'] = RawTables
+        State['DscFile'] = DscFile
+        Pool = multiprocessing.Pool(Jobs, initializer=_InitWorker, initargs=(State,))
+
+    Variants = [DscVariant(Macros) for Macros in MacroSets]
+    # (index, names of macros used) of the variants post-processed
+    Evaluated = []
+    KnownNames = _GetMacroNames([DscFile], Context) | ValueNames
+    Pending = list(range(len(MacroSets)))
+    try:
+        while Pending:
+            # one variant for each set of values of the macros known to be used
+            Tasks = {}
+            for Index in Pending:
+                Tasks.setdefault(_MacroKey(KnownNames, MacroSets[Index]), (Index, MacroSets[Index], RawKeys[Index]))
+            Tasks = list(Tasks.values())
+            if Pool is None:
+                Results = [_EvaluateVariant(Task, DscFile, RawTables, Context) for Task in Tasks]
+            else:
+                Results = Pool.map(_EvaluateVariant, Tasks, max(1, len(Tasks) // (Jobs * 4)))
+            for Index, Records, ID, Pcds, Names in Results:
+                Table = PlatformTable()
+                Table.Load(Records, ID)
+                Variant = Variants[Index]
+                Variant.Table, Variant.PlatformPcds, Variant.EvaluatedAs = Table, Pcds, Index
+                Evaluated.append((Index, Names | ValueNames))
+                KnownNames |= Names
+
+            # the ones giving the same values as a variant post-processed to
+            # all macros it could use are evaluated the same way
+            Left = []
+            for Index in Pending:
+                if Variants[Index].Table is not None:
+                    continue
+                for Other, Names in Evaluated:
+                    if _MacroKey(Names, MacroSets[Index]) == _MacroKey(Names, MacroSets[Other]):
+                        Variants[Index].Table = Variants[Other].Table
+                        Variants[Index].PlatformPcds = Variants[Other].PlatformPcds
+                        Variants[Index].EvaluatedAs = Other
+                        break
+                else:
+                    Left.append(Index)
+            Pending = Left
+    finally:
+        if Pool is not None:
+            Pool.terminate()
+            Pool.join()
+    return Variants, GetVariantDifferences(Variants)
+
+## Get the records which are not the same in all variants
+#
+#   Records are compared by content, regardless of their IDs, owners and
+#   line numbers, as DscParser.Refresh() does.
+#
+#   @param  Variants:   The list of DscVariant
+#
+#   @retval: A dict of {(model, value1, value2, value3, scope1, scope2,
+#            scope3, enabled): tuple of the number of such records in each
+#            variant}, for the records whose numbers are not all the same
+#
+def GetVariantDifferences(Variants):
+    KeyOf = lambda Record: (Record.Model, Record.Value1, Record.Value2, Record.Value3,
+                            Record.Scope1, Record.Scope2, Record.Scope3, Record.Enabled)
+    # variants sharing a table have the same counts
+    CountsOfTable = {}
+    for Variant in Variants:
+        if id(Variant.Table) not in CountsOfTable:
+            CountsOfTable[id(Variant.Table)] = Counter(KeyOf(Record) for Record in Variant.Table.GetAll())
+    CountList = [CountsOfTable[id(Variant.Table)] for Variant in Variants]
+    Differences = {}
+    for Key in set().union(*CountList):
+        Numbers = tuple(Counts[Key] for Counts in CountList)
+        if min(Numbers) != max(Numbers):
+            Differences[Key] = Numbers
+    return Differences
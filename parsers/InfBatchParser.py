@@ -0,0 +1,270 @@
+## @file
+# This file is used to parse all the INF files referenced by a DSC file
+#
+# SPDX-License-Identifier: BSD-2-Clause-Patent
+#
+
+##
+# Import Modules
+#
+import multiprocessing
+import os
+
+import Common.EdkLogger as EdkLogger
+import Common.DataType as DT
+import CommonDataClass.DataClass as DC
+from Common.BuildToolError import FatalError
+from Common.Misc import PathClass
+from Common.StringUtils import NormPath
+from Common.MultipleWorkspace import MultipleWorkspace as mws
+from Common.ParseContext import ParseContext, GetContext
+from .MetaFileParser2 import InfParser
+from .MetaFileStore import MetaFileStorage
+from .MetaFileCache import MetaFileCache
+
+## Get the INF files referenced by DSC parsers
+#
+#   Both the modules in [Components] and the library instances in
+#   [LibraryClasses], including the ones in <LibraryClasses> of components,
+#   are collected.
+#
+#   @param  DscParsers:     A post-processed DscParser, or a dict of them with
+#                           arch as key
+#   @param  Context:        The ParseContext of the DSC parsers, None for the
+#                           default one
+#
+#   @retval: An ordered dict of {INF file path: the first arch using it}
+#
+def GetDscModuleFiles(DscParsers, Context=None):
+    if not isinstance(DscParsers, dict):
+        DscParsers = {DscParsers._Arch: DscParsers}
+    ModuleFiles = {}
+    for Arch, Dsc in DscParsers.items():
+        for Component in Dsc[DC.MODEL_META_DATA_COMPONENT, Arch]:
+            ModuleFiles.setdefault(NormPath(Component.Value1, Context=Context), Arch)
+            for LibraryClass in Dsc._Table.Query(DC.MODEL_EFI_LIBRARY_CLASS, Arch, BelongsToItem=Component.ID):
+                ModuleFiles.setdefault(NormPath(LibraryClass.Value2, Context=Context), Arch)
+        for LibraryClass in Dsc[DC.MODEL_EFI_LIBRARY_CLASS, Arch]:
+            ModuleFiles.setdefault(NormPath(LibraryClass.Value2, Context=Context), Arch)
+        for LibraryInstance in Dsc[DC.MODEL_EFI_LIBRARY_INSTANCE, Arch]:
+            ModuleFiles.setdefault(NormPath(LibraryInstance.Value1, Context=Context), Arch)
+    ModuleFiles.pop('', None)
+    return ModuleFiles
+
+# The parse context of a worker process
+_WorkerContext = None
+
+## Get the status of a parse context needed to parse INF files in a worker process
+def _GetWorkerState(Context):
+    Cache = Context.MetaFileCache
+    return {
+        'Workspace'         :   Context.Workspace,
+        'GlobalDefines'     :   Context.GlobalDefines,
+        'CommandLineDefines':   Context.CommandLineDefines,
+        'CaseInsensitive'   :   Context.CaseInsensitive,
+        'Options'           :   Context.Options,
+        'PackagesPath'      :   mws.PACKAGES_PATH,
+        'FileIndex'         :   mws.FileIndex,
+        'Cache'             :   (Cache.CacheDir, Cache.MaxSize) if Cache is not None else None,
+    }
+
+## Initialize the parse context of a worker process with the status of parent process
+def _InitWorker(State):
+    global _WorkerContext
+    mws.WORKSPACE = State['Workspace']
+    mws.PACKAGES_PATH = State['PackagesPath']
+    mws.FileIndex = State['FileIndex']
+    mws.invalidate()
+    _WorkerContext = ParseContext(State['Workspace'], State['GlobalDefines'], State['CommandLineDefines'])
+    _WorkerContext.AllFiles = State['FileIndex']
+    _WorkerContext.CaseInsensitive = State['CaseInsensitive']
+    _WorkerContext.Options = State['Options']
+    if State['Cache'] is not None:
+        _WorkerContext.MetaFileCache = MetaFileCache(*State['Cache'])
+
+## Parse an INF file and get its raw table
+#
+#   @param  Args:   (INF file PathClass, arch)
+#
+#   @retval: The data got by InfParser.DumpRawTable()
+#
+def _ParseModule(Args):
+    ModuleFile, Arch = Args
+    Parser = InfParser(ModuleFile, DC.MODEL_FILE_INF, Arch,
+                       MetaFileStorage(ModuleFile, DC.MODEL_FILE_INF, Context=_WorkerContext), Context=_WorkerContext)
+    Parser.StartParse()
+    return Parser.DumpRawTable()
+
+## Parse all INF files referenced by DSC parsers
+#
+#   The INF files are parsed in Jobs worker processes. The tables are sent
+#   back in the compact form of InfParser.DumpRawTable() and loaded into the
+#   storage cache of current process, so the result is the same as parsing
+#   them one by one here. Files which have been parsed are not parsed again.
+#
+#   @param  DscParsers:     A post-processed DscParser, or a dict of them with
+#                           arch as key
+#   @param  Jobs:           The number of worker processes, None for the
+#                           number of CPUs, 1 to parse in current process
+#   @param  Context:        The ParseContext of the DSC parsers, None for the
+#                           default one
+#
+#   @retval: An ordered dict of {INF file PathClass: InfParser}
+#
+def ParseDscModules(DscParsers, Jobs=None, Context=None):
+    Context = GetContext(Context)
+    Parsers = {}
+    Pending = []
+    for ModuleFile, Arch in GetDscModuleFiles(DscParsers, Context).items():
+        ModuleFile = PathClass(ModuleFile, Context.Workspace)
+        ErrorCode, ErrorInfo = ModuleFile.Validate('.inf', Context=Context)
+        if ErrorCode != 0:
+            EdkLogger.error('Parser', ErrorCode, ExtraData=ErrorInfo)
+        if ModuleFile in Parsers:
+            continue
+        Parser = InfParser(ModuleFile, DC.MODEL_FILE_INF, Arch,
+                           MetaFileStorage(ModuleFile, DC.MODEL_FILE_INF, Context=Context), Context=Context)
+        Parsers[ModuleFile] = Parser
+        if not Parser.Finished and not Parser._RawTable.IsIntegrity():
+            Pending.append((ModuleFile, Arch))
+
+    if Jobs is None:
+        Jobs = multiprocessing.cpu_count()
+    Jobs = min(Jobs, len(Pending))
+    if Jobs <= 1:
+        for ModuleFile, _ in Pending:
+            Parsers[ModuleFile].StartParse()
+        return Parsers
+
+    ChunkSize = max(1, len(Pending) // (Jobs * 4))
+    with multiprocessing.Pool(Jobs, initializer=_InitWorker, initargs=(_GetWorkerState(Context),)) as Pool:
+        for (ModuleFile, _), RawData in zip(Pending, Pool.imap(_ParseModule, Pending, ChunkSize)):
+            Parsers[ModuleFile].LoadRawTable(RawData)
+    return Parsers
+
+## The [Defines] information of an INF file got by ScanInfHeader()
+#
+#   @var File:          The INF file path
+#   @var BaseName:      BASE_NAME, '' if not defined
+#   @var FileGuid:      FILE_GUID, '' if not defined
+#   @var ModuleType:    MODULE_TYPE, '' if not defined
+#   @var LibraryClass:  The list of LIBRARY_CLASS values
+#   @var InfVersion:    INF_VERSION as a number, 0 if not defined
+#
+class InfHeader(object):
+    __slots__ = ('File', 'BaseName', 'FileGuid', 'ModuleType', 'LibraryClass', 'InfVersion')
+
+    def __init__(self, File, BaseName='', FileGuid='', ModuleType='', LibraryClass=None, InfVersion=0):
+        self.File = File
+        self.BaseName = BaseName
+        self.FileGuid = FileGuid
+        self.ModuleType = ModuleType
+        self.LibraryClass = LibraryClass or []
+        self.InfVersion = InfVersion
+
+    def __repr__(self):
+        return 'InfHeader(%r, %r, %r, %r, %r, 0x%08x)' % (self.File, self.BaseName, self.FileGuid,
+                                                         self.ModuleType, self.LibraryClass, self.InfVersion)
+
+## Get the [Defines] information of an INF file
+#
+#   Only the file up to the end of [Defines] section is parsed, by the same
+#   InfParser code as a full parse, so the values are validated and their
+#   macros replaced the same way. The parser is made in a context of its own,
+#   which is dropped once the header is got.
+#
+#   @param  ModuleFile:     The INF file path
+#   @param  Context:        The ParseContext giving workspace and macros, None
+#                           for the default one
+#
+#   @retval: An InfHeader object. FatalError is raised if the [Defines]
+#            section is invalid.
+#
+def ScanInfHeader(ModuleFile, Context=None):
+    Context = GetContext(Context)
+    ScanContext = ParseContext(Context.Workspace, Context.GlobalDefines, Context.CommandLineDefines)
+    ScanContext.CaseInsensitive = Context.CaseInsensitive
+    ScanContext.Options = Context.Options
+    if not isinstance(ModuleFile, PathClass):
+        ModuleFile = PathClass(ModuleFile, Context.Workspace)
+    Parser = InfParser(ModuleFile, DC.MODEL_FILE_INF, DT.TAB_ARCH_COMMON,
+                       MetaFileStorage(ModuleFile, DC.MODEL_FILE_INF, Context=ScanContext), Context=ScanContext)
+    Header = InfHeader(ModuleFile.Path)
+    for Record in Parser[DC.MODEL_META_DATA_HEADER]:
+        Name, Value = Record.Value2, Record.Value3
+        if Name == DT.TAB_INF_DEFINES_BASE_NAME:
+            Header.BaseName = Value
+        elif Name == DT.TAB_INF_DEFINES_FILE_GUID:
+            Header.FileGuid = Value
+        elif Name == DT.TAB_INF_DEFINES_MODULE_TYPE:
+            Header.ModuleType = Value
+        elif Name == DT.TAB_INF_DEFINES_LIBRARY_CLASS:
+            Header.LibraryClass.append(Value)
+    Header.InfVersion = Parser._Version
+    return Header
+
+## Get the meta files of a type in directory trees
+#
+#   Hidden directories, like .git, are skipped.
+#
+#   @param  Directories:    The list of directories
+#   @param  Extension:      The file extension in lower case, e.g. '.dec'
+#
+#   @retval: The sorted list of file paths, each one only once
+#
+def FindMetaFiles(Directories, Extension):
+    Files = set()
+    for Directory in Directories:
+        for Root, Dirs, Names in os.walk(Directory):
+            Dirs[:] = [Dir for Dir in Dirs if not Dir.startswith('.')]
+            for Name in Names:
+                if os.path.splitext(Name)[1].lower() == Extension:
+                    Files.add(os.path.normpath(os.path.join(Root, Name)))
+    return sorted(Files)
+
+## Get the INF files in directory trees
+def FindInfFiles(Directories):
+    return FindMetaFiles(Directories, '.inf')
+
+## Get the header of an INF file, None if its [Defines] section is invalid
+#
+#   @param  ModuleFile:     The INF file path
+#   @param  Context:        The ParseContext, None for the one of worker process
+#
+def _ScanModule(ModuleFile, Context=None):
+    try:
+        return ScanInfHeader(ModuleFile, Context or _WorkerContext)
+    except FatalError:
+        return None
+
+## Get the headers of all INF files in directory trees
+#
+#   Hidden directories, like .git, are skipped. The files are scanned in
+#   Jobs worker processes. The files whose [Defines] section is invalid are
+#   reported by EdkLogger and mapped to None.
+#
+#   @param  Directories:    The list of directories, None for WORKSPACE and
+#                           the directories in PACKAGES_PATH
+#   @param  Jobs:           The number of worker processes, None for the
+#                           number of CPUs, 1 to scan in current process
+#   @param  Context:        The ParseContext giving workspace and macros, None
+#                           for the default one
+#
+#   @retval: A dict of {INF file path: InfHeader or None}, in path order
+#
+def ScanInfHeaders(Directories=None, Jobs=None, Context=None):
+    Context = GetContext(Context)
+    if Directories is None:
+        Directories = [Context.Workspace] + list(mws.PACKAGES_PATH or [])
+    ModuleFiles = FindInfFiles(Directories)
+
+    if Jobs is None:
+        Jobs = multiprocessing.cpu_count()
+    Jobs = min(Jobs, len(ModuleFiles))
+    if Jobs <= 1:
+        Results = [_ScanModule(ModuleFile, Context) for ModuleFile in ModuleFiles]
+    else:
+        ChunkSize = max(1, len(ModuleFiles) // (Jobs * 4))
+        with multiprocessing.Pool(Jobs, initializer=_InitWorker, initargs=(_GetWorkerState(Context),)) as Pool:
+            Results = Pool.map(_ScanModule, ModuleFiles, ChunkSize)
+    return dict(zip(ModuleFiles, Results))
@@ -0,0 +1,196 @@
+## @file
+# This file is used to store parsed meta file tables on disk
+#
+# SPDX-License-Identifier: BSD-2-Clause-Patent
+#
+
+##
+# Import Modules
+#
+# Standard os is used instead of LongFilePathOs, whose remove() keeps retrying
+# for seconds on a file which has just been evicted by another process.
+import os
+import pickle
+import tempfile
+import time
+from hashlib import md5
+
+import Common.EdkLogger as EdkLogger
+
+## Get the md5 digest of a file content
+#
+#   @param  FilePath:   The path of the file
+#
+#   @retval: The hex digest, or None if the file cannot be read
+#
+def FileDigest(FilePath):
+    try:
+        with open(str(FilePath), 'rb') as File:
+            return md5(File.read()).hexdigest()
+    except (IOError, OSError):
+        return None
+
+## Cache of parsed meta file tables in a directory
+#
+# Each entry is one file named by the digest of its key. The content is a
+# fixed magic, the md5 digest of the payload and the pickled payload. Entries
+# are written to a temporary file and renamed, so several processes can share
+# one directory: a reader sees either a whole entry or nothing. Entries which
+# have a wrong magic or digest, or cannot be unpickled, are removed and
+# treated as missing.
+#
+# The modification time of an entry is updated on each hit, and the oldest
+# entries are evicted once the directory grows over MaxSize bytes.
+#
+class MetaFileCache(object):
+    # bump it when the parsers or the table format change
+    VERSION = 3
+
+    _MAGIC_ = b'EDKMFC\x00\x01'
+    _SUFFIX_ = '.cache'
+    _TEMP_SUFFIX_ = '.tmp'
+    # temporary files older than this (in seconds) are left by dead writers
+    _TEMP_TIMEOUT_ = 3600
+    # evict down to this ratio of MaxSize to avoid evicting on every write
+    _EVICT_RATIO_ = 0.9
+
+    ## Constructor
+    #
+    #   @param  CacheDir:   The directory storing the cache entries
+    #   @param  MaxSize:    The size cap in bytes of all entries
+    #
+    def __init__(self, CacheDir, MaxSize=256 * 1024 * 1024):
+        self.CacheDir = CacheDir
+        self.MaxSize = MaxSize
+        self.Hits = 0
+        self.Misses = 0
+        # estimated size of the directory, computed on the first write
+        self._Size = None
+        if not os.path.isdir(CacheDir):
+            os.makedirs(CacheDir, exist_ok=True)
+
+    ## Get the entry file path of a key
+    def _EntryPath(self, Key):
+        Digest = md5(repr((self.VERSION,) + tuple(Key)).encode('utf-8')).hexdigest()
+        return os.path.join(self.CacheDir, Digest + self._SUFFIX_)
+
+    ## Remove a file, ignore it if it has been removed by others
+    @staticmethod
+    def _Remove(FilePath):
+        try:
+            os.remove(FilePath)
+        except OSError:
+            pass
+
+    ## Get the payload stored for a key
+    #
+    #   @param  Key:    A tuple of the values identifying the entry
+    #
+    #   @retval: The payload, or None if there's no valid entry
+    #
+    def Get(self, Key):
+        EntryPath = self._EntryPath(Key)
+        try:
+            with open(EntryPath, 'rb') as File:
+                Data = File.read()
+        except (IOError, OSError):
+            self.Misses += 1
+            return None
+
+        Payload = None
+        Head = len(self._MAGIC_) + 16
+        if Data[:len(self._MAGIC_)] == self._MAGIC_ and md5(Data[Head:]).digest() == Data[len(self._MAGIC_):Head]:
+            try:
+                Payload = pickle.loads(Data[Head:])
+            except Exception as Exc:
+                EdkLogger.debug(EdkLogger.DEBUG_5, "Invalid cache entry %s: %s" % (EntryPath, Exc))
+        if Payload is None:
+            EdkLogger.debug(EdkLogger.DEBUG_5, "Corrupted cache entry %s is removed" % EntryPath)
+            self._Remove(EntryPath)
+            self.Misses += 1
+            return None
+
+        # mark it as recently used
+        try:
+            os.utime(EntryPath, None)
+        except OSError:
+            pass
+        self.Hits += 1
+        return Payload
+
+    ## Store the payload for a key
+    #
+    #   @param  Key:        A tuple of the values identifying the entry
+    #   @param  Payload:    A picklable object other than None
+    #
+    def Set(self, Key, Payload):
+        EntryPath = self._EntryPath(Key)
+        Data = pickle.dumps(Payload, pickle.HIGHEST_PROTOCOL)
+        Data = self._MAGIC_ + md5(Data).digest() + Data
+        try:
+            Handle, TempPath = tempfile.mkstemp(suffix=self._TEMP_SUFFIX_, dir=self.CacheDir)
+            try:
+                with os.fdopen(Handle, 'wb') as File:
+                    File.write(Data)
+                os.replace(TempPath, EntryPath)
+            except:
+                self._Remove(TempPath)
+                raise
+        except (IOError, OSError) as Exc:
+            EdkLogger.debug(EdkLogger.DEBUG_5, "Failed to write cache entry %s: %s" % (EntryPath, Exc))
+            return
+
+        if self._Size is None:
+            self._Size = self._Scan()[0]
+        else:
+            self._Size += len(Data)
+        if self._Size > self.MaxSize:
+            self.Evict()
+
+    ## List the entries in cache directory
+    #
+    #   @retval: (total size, [(mtime, size, path), ...]), temporary files
+    #            left by dead writers are removed
+    #
+    def _Scan(self):
+        Total = 0
+        Entries = []
+        Now = time.time()
+        try:
+            NameList = os.listdir(self.CacheDir)
+        except OSError:
+            return 0, []
+        for Name in NameList:
+            FilePath = os.path.join(self.CacheDir, Name)
+            try:
+                Stat = os.stat(FilePath)
+            except OSError:
+                continue
+            if Name.endswith(self._TEMP_SUFFIX_):
+                if Now - Stat.st_mtime > self._TEMP_TIMEOUT_:
+                    self._Remove(FilePath)
+                continue
+            if not Name.endswith(self._SUFFIX_):
+                continue
+            Total += Stat.st_size
+            Entries.append((Stat.st_mtime, Stat.st_size, FilePath))
+        return Total, Entries
+
+    ## Remove the least recently used entries until the cache fits its cap
+    def Evict(self):
+        Total, Entries = self._Scan()
+        Limit = self.MaxSize * self._EVICT_RATIO_
+        if Total > self.MaxSize:
+            Entries.sort()
+            for _, Size, FilePath in Entries:
+                if Total <= Limit:
+                    break
+                self._Remove(FilePath)
+                Total -= Size
+        self._Size = Total
+
+    ## Remove all entries
+    def Clear(self):
+        for _, _, FilePath in self._Scan()[1]:
+            self._Remove(FilePath)
+        self._Size = 0
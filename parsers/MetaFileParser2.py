@@ -12,7 +12,8 @@
 
 from hashlib import md5
 import re
-from collections import defaultdict
+from collections import ChainMap, Counter, OrderedDict
+from copy import copy
 import Common.GlobalData as GlobalData
 from Common.BuildToolError import (
     FORMAT_INVALID,
@@ -31,6 +32,7 @@ from Common.StringUtils import (
     CleanString2,
     NormPath
 ) 
+from Common.MultipleWorkspace import MultipleWorkspace as mws
 from Common.Misc import (
     GuidStructureStringToGuidString,
     CheckPcdDatum,
@@ -40,14 +42,21 @@ from Common.Misc import (
     StructPattern
 )
 from Common.Expression import ValueExpression, ValueExpressionEx, ReplaceExprMacro, BuildOptionValue
+from Common.ParseContext import DefaultContext, GetContext
+from Common.VersionedDict import VersionedDict
 from CommonDataClass.Exceptions import *
 from .MetaFileStore import MetaFileStorage
+from .MetaFileCache import FileDigest
 from .MetaFileCommentParser import CheckInfComment
 
 ## RegEx for finding file versions
 hexVersionPattern = re.compile(r'0[xX][\da-f-A-F]{5,8}')
 decVersionPattern = re.compile(r'\d+\.\d+')
 CODEPattern = re.compile(r"{CODE\([a-fA-F0-9Xx\{\},\s]*\)}")
+## RegEx for finding the lines which could use the ARCH macro
+ArchMacroPattern = re.compile(r'\bARCH\b')
+## RegEx for the names of macros and PCDs an expression could use
+ExpressionNamePattern = re.compile(r'(?<![\w.])[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*')
 
 ## A decorator used to parse macro definition
 def ParseMacro(Parser):
@@ -69,7 +78,7 @@ def ParseMacro(Parser):
         Type = Match.group(1)
         Name, Value = TokenList
         # Global macros can be only defined via environment variable
-        if Name in GlobalData.gGlobalDefines:
+        if Name in self._Context.GlobalDefines:
             EdkLogger.error('Parser', FORMAT_INVALID, "%s can only be defined via environment variable" % Name,
                             ExtraData=self._CurrentLine, File=self.MetaFile, Line=self._LineIndex + 1)
         # Only upper case letters, digit and '_' are allowed
@@ -131,8 +140,8 @@ class MetaFileParser(object):
     # data type (file content) for specific file type
     DataType = {}
 
-    # Parser objects used to implement singleton
-    MetaFiles = {}
+    # Parser objects of default context used to implement singleton
+    MetaFiles = DefaultContext.MetaFiles
 
     ## Factory method
     #
@@ -143,16 +152,29 @@ class MetaFileParser(object):
     #                           (InfParser, DecParser or DscParser)
     #   @param  FilePath        The path of meta file
     #   @param  *args           The specific class related parameters
-    #   @param  **kwargs        The specific class related dict parameters
+    #   @param  **kwargs        The specific class related dict parameters,
+    #                           Context is the ParseContext owning the object
     #
     def __new__(cls, FilePath, *args, **kwargs):
-        if FilePath in cls.MetaFiles:
-            return cls.MetaFiles[FilePath]
+        MetaFiles = GetContext(kwargs.get('Context')).MetaFiles
+        if FilePath in MetaFiles:
+            return MetaFiles[FilePath]
         else:
             ParserObject = super(MetaFileParser, cls).__new__(cls)
-            cls.MetaFiles[FilePath] = ParserObject
+            MetaFiles[FilePath] = ParserObject
             return ParserObject
 
+    # parser attributes stored in cache together with the raw table
+    _CacheState = ('_Defines', '_Version', '_Packages', '_FileLocalMacros', '_SectionsMacroDict')
+
+    # models whose records are only in the sections of the same model, so
+    # they can be queried once these sections are parsed
+    _LazyModels = frozenset()
+
+    # whether queries with arch are done on the post-processed table which
+    # needs the whole file
+    _HasPostProcess = False
+
     def GetTableID(self):
         return (10**7)
 
@@ -166,8 +188,10 @@ class MetaFileParser(object):
     #   @param      Table           Database used to retrieve module/package information
     #   @param      Owner           Owner ID (for sub-section parsing)
     #   @param      From            ID from which the data comes (for !INCLUDE directive)
+    #   @param      Context         ParseContext of the parser, None for the default one
     #
-    def __init__(self, FilePath, FileType, Arch, Table, Owner= -1, From= -1):
+    def __init__(self, FilePath, FileType, Arch, Table, Owner= -1, From= -1, Context=None):
+        self._Context = GetContext(Context)
         Table.ID = self.GetTableID()
         self._Table = Table
         self._RawTable = Table
@@ -177,12 +201,19 @@ class MetaFileParser(object):
         self._FileDir = self.MetaFile.Dir
         self._Defines = {}
         self._Packages = []
-        self._FileLocalMacros = {}
-        self._SectionsMacroDict = defaultdict(dict)
+        self._FileLocalMacros = VersionedDict()
+        self._SectionsMacroDict = VersionedDict()
+        # (key, section type, scope, macros) of the last macro resolution
+        self._MacroCache = None
+        # number of macro resolutions served from and missed by _MacroCache
+        self.MacroCacheHits = 0
+        self.MacroCacheMisses = 0
 
         # for recursive parsing
         self._Owner = [Owner]
         self._From = From
+        # files parsed for !include directive are not cached
+        self._Cacheable = Owner == -1 and From == -1
 
         # parsr status for parsing
         self._ValueList = ['', '', '', '', '']
@@ -199,6 +230,8 @@ class MetaFileParser(object):
         self._Enabled = True
         self._Finished = False
         self._PostProcessed = False
+        # (section parser, start table ID, raw cache key) if the file is partly parsed
+        self._Parsing = None
         # Different version of meta-file has different way to parse.
         self._Version = 0
         self._GuidDict = {}  # for Parser PCD value {GUID(gTokeSpaceGuidName)}
@@ -211,8 +244,17 @@ class MetaFileParser(object):
     def _Store(self, *Args):
         return self._Table.Insert(*Args)
 
-    ## Virtual method for starting parse
+    ## Parse the whole file
     def Start(self):
+        for _ in self._ParseSections():
+            pass
+
+    ## Virtual method parsing the file
+    #
+    #   It's a generator which yields the line index of each section header
+    #   before parsing the section, so the parse can stop there and go on later.
+    #
+    def _ParseSections(self):
         raise NotImplementedError
 
     ## Notify a post-process is needed
@@ -253,28 +295,140 @@ class MetaFileParser(object):
     def __getitem__(self, DataInfo):
         if not isinstance(DataInfo, type(())):
             DataInfo = (DataInfo,)
+        RawQuery = len(DataInfo) == 1 or DataInfo[1] is None
 
-        # Parse the file first, if necessary
-        self.StartParse()
+        # Parse the file first, if necessary. Only the sections having the
+        # records are needed if they are got from raw table
+        if RawQuery or not self._HasPostProcess:
+            self.StartParse(DataInfo[0])
+        else:
+            self.StartParse()
 
         # No specific ARCH or Platform given, use raw data
-        if self._RawTable and (len(DataInfo) == 1 or DataInfo[1] is None):
+        if self._RawTable and RawQuery:
             return self._FilterRecordList(self._RawTable.Query(*DataInfo), self._Arch)
 
         # Do post-process if necessary
         if not self._PostProcessed:
+            if self._HasPostProcess:
+                self.StartParse()
             self._PostProcess()
 
         return self._FilterRecordList(self._Table.Query(*DataInfo), DataInfo[1])
 
-    def StartParse(self):
-        if not self._Finished:
+    ## Parse the file, or the part of it needed to query the records of a model
+    #
+    #   The file is always parsed from the beginning, up to the end of the last
+    #   section having records of the model. So the records and their IDs are
+    #   the same as the ones got by parsing the whole file, and macros defined
+    #   in earlier sections are applied. The rest of file is parsed when a
+    #   later query needs it.
+    #
+    #   @param  Model:  The model to be queried, None to parse the whole file
+    #
+    def StartParse(self, Model=None):
+        if self._Finished:
+            return
+        if self._Parsing is None:
             if self._RawTable.IsIntegrity():
                 self._Finished = True
-            else:
-                self._Table = self._RawTable
-                self._PostProcessed = False
-                self.Start()
+                return
+            self._Table = self._RawTable
+            self._PostProcessed = False
+            CacheKey = self._RawCacheKey()
+            if self._LoadRawTable(CacheKey):
+                return
+            self._Parsing = (self._ParseSections(), self._RawTable.ID, CacheKey)
+
+        Parser, _, CacheKey = self._Parsing
+        End = self._GetSectionsEnd(Model)
+        for Index in Parser:
+            if End is not None and Index > End:
+                return
+        self._Parsing = None
+        self._SaveRawTable(CacheKey)
+
+    ## Get the line index up to which the file is parsed to query a model
+    #
+    #   The section headers are found by the section index of file content.
+    #
+    #   @param  Model:  The model to be queried
+    #
+    #   @retval: The line index of the header of the last section of the
+    #            model, -1 if there's no such section, or None if the whole
+    #            file is needed
+    #
+    def _GetSectionsEnd(self, Model):
+        if Model not in self._LazyModels:
+            return None
+        End = -1
+        for LineNo, Header in self._Context.FileContents.Get(self.MetaFile).GetSectionHeaders():
+            Header = CleanString2(Header, AllowCppStyleComment=True)[0]
+            if not Header.endswith(DT.TAB_SECTION_END):
+                return None
+            for Item in Header[1:-1].split(DT.TAB_COMMA_SPLIT):
+                if self.DataType.get(Item.split(DT.TAB_SPLIT)[0].strip().upper()) == Model:
+                    End = LineNo - 1
+        return End
+
+    ## Whether the tables of the file could be stored in cache
+    #
+    #   Files parsed for !include directive inherit the status of the parent
+    #   parser, so they are not cached.
+    #
+    def _IsCacheable(self):
+        return self._Context.MetaFileCache is not None and self._Cacheable
+
+    ## Get the key of the raw table in cache, None if it should not be cached
+    def _RawCacheKey(self):
+        if not self._IsCacheable():
+            return None
+        Digest = self._Context.FileContents.GetDigest(self.MetaFile)
+        if Digest is None:
+            return None
+        return ('Raw', type(self).__name__, Digest, self._RawTable.ID)
+
+    ## Restore the raw table and parser status from cache
+    #
+    #   @retval: True if the table is loaded, Start() is not needed
+    #
+    def _LoadRawTable(self, CacheKey):
+        if CacheKey is None:
+            return False
+        Payload = self._Context.MetaFileCache.Get(CacheKey)
+        if Payload is None:
+            return False
+        self.LoadRawTable(Payload)
+        return True
+
+    ## Store the raw table and parser status in cache
+    def _SaveRawTable(self, CacheKey):
+        if CacheKey is None or not self._RawTable.IsIntegrity():
+            return
+        self._Context.MetaFileCache.Set(CacheKey, self.DumpRawTable())
+
+    ## Get the raw table and parser status in a picklable form
+    #
+    #   @retval: (record list, last ID, parser status), to be restored by
+    #            LoadRawTable()
+    #
+    def DumpRawTable(self):
+        State = {Name: getattr(self, Name) for Name in self._CacheState if hasattr(self, Name)}
+        return (self._RawTable.Dump(), self._RawTable.ID, State)
+
+    ## Restore the raw table and parser status got by DumpRawTable()
+    def LoadRawTable(self, RawData):
+        RecordList, ID, State = RawData
+        # drop the records of partly parsed file
+        if self._Parsing is not None:
+            self._RawTable.Truncate(self._Parsing[1])
+            self._Parsing = None
+        self._RawTable.Load(RecordList, ID)
+        for Name in State:
+            setattr(self, Name, State[Name])
+        self._Table = self._RawTable
+        self._PostProcessed = False
+        self._Finished = True
     ## Data parser for the common format in different type of file
     #
     #   The common format in the meatfile is like
@@ -393,7 +547,7 @@ class MetaFileParser(object):
         MacroUsed = GlobalData.gMacroRefPattern.findall(Value)
         if len(MacroUsed) != 0:
             for Macro in MacroUsed:
-                if Macro in GlobalData.gGlobalDefines:
+                if Macro in self._Context.GlobalDefines:
                     EdkLogger.error("Parser", FORMAT_INVALID, "Global macro %s is not permitted." % (Macro), ExtraData=self._CurrentLine, File=self.MetaFile, Line=self._LineIndex + 1)
             else:
                 EdkLogger.error("Parser", FORMAT_INVALID, "%s not defined" % (Macro), ExtraData=self._CurrentLine, File=self.MetaFile, Line=self._LineIndex + 1)
@@ -442,14 +596,52 @@ class MetaFileParser(object):
                 Line=self._LineIndex + 1
                 )
     def GetValidExpression(self, TokenSpaceGuid, PcdCName):
-        return self._Table.GetValidExpression(TokenSpaceGuid, PcdCName)
+        return self._Table.GetValidExpression(TokenSpaceGuid, PcdCName, self.MetaFile)
 
+    ## Get the compiled @ValidRange, @ValidList and @Expression rules of a PCD
+    def GetValidRules(self, TokenSpaceGuid, PcdCName):
+        return self._Table.GetValidRules(TokenSpaceGuid, PcdCName, self.MetaFile)
+
+    ## Get the macros applicable to current line
+    #
+    #   The macros are the layers got by _MacroLayers() looked up from the
+    #   last one, nothing is copied. The resolution is cached, and used again
+    #   as long as the versions of the macro sources, the section type and the
+    #   scope are the same. Changes made by caller go to a new empty layer,
+    #   so the cached resolution is not affected.
+    #
     @property
     def _Macros(self):
-        Macros = {}
-        Macros.update(self._FileLocalMacros)
-        Macros.update(self._GetApplicableSectionMacro())
-        return Macros
+        Key = self._MacroKey()
+        Cache = self._MacroCache
+        if Key is not None and Cache is not None and Cache[0] == Key and Cache[1] == self._SectionType \
+           and Cache[2] == self._Scope:
+            self.MacroCacheHits += 1
+            return Cache[3].new_child()
+        self.MacroCacheMisses += 1
+        Macros = ChainMap(*reversed(self._MacroLayers()))
+        if Key is not None:
+            self._MacroCache = (Key, copy(self._SectionType), [copy(Scope) for Scope in self._Scope], Macros)
+        return Macros.new_child()
+
+    ## Get the dicts of macros, the later ones override the earlier ones
+    def _MacroLayers(self):
+        return [self._FileLocalMacros] + self._GetApplicableSectionMacroList()
+
+    ## Get the dicts the macros come from
+    def _MacroSources(self):
+        return (self._FileLocalMacros, self._SectionsMacroDict)
+
+    ## Get the key the resolved macros depend on
+    #
+    #   @retval: The versions of macro sources, or None if any of them is not
+    #            a VersionedDict and the resolution cannot be cached
+    #
+    def _MacroKey(self):
+        Key = tuple(getattr(Source, 'Version', None) for Source in self._MacroSources())
+        if None in Key:
+            return None
+        return Key
 
     ## Construct section Macro dict
     def _ConstructSectionMacroDict(self, Name, Value):
@@ -464,16 +656,24 @@ class MetaFileParser(object):
         else:
             SectionDictKey = self._SectionType, ScopeKey
 
-        self._SectionsMacroDict[SectionDictKey][Name] = Value
+        # set the dict again to update the version of _SectionsMacroDict
+        SectionMacros = self._SectionsMacroDict.get(SectionDictKey, {})
+        SectionMacros[Name] = Value
+        self._SectionsMacroDict[SectionDictKey] = SectionMacros
 
     ## Get section Macros that are applicable to current line, which may come from other sections
     ## that share the same name while scope is wider
     def _GetApplicableSectionMacro(self):
         Macros = {}
+        for SectionMacros in self._GetApplicableSectionMacroList():
+            Macros.update(SectionMacros)
+        return Macros
 
-        ComComMacroDict = {}
-        ComSpeMacroDict = {}
-        SpeSpeMacroDict = {}
+    ## Get the dicts of section Macros applicable to current line, the later ones override the earlier ones
+    def _GetApplicableSectionMacroList(self):
+        ComComMacroList = []
+        ComSpeMacroList = []
+        SpeSpeMacroList = []
 
         ActiveSectionType = self._SectionType
         if isinstance(self, DecParser):
@@ -488,23 +688,19 @@ class MetaFileParser(object):
                 if(Scope0, Scope1, Scope2) not in Scope:
                     break
             else:
-                SpeSpeMacroDict.update(self._SectionsMacroDict[(SectionType, Scope)])
+                SpeSpeMacroList.append(self._SectionsMacroDict[(SectionType, Scope)])
 
             for ActiveScope in self._Scope:
                 Scope0, Scope1, Scope2 = ActiveScope[0], ActiveScope[1], ActiveScope[2]
                 if(Scope0, Scope1, Scope2) not in Scope and (Scope0, DT.TAB_COMMON, DT.TAB_COMMON) not in Scope and (DT.TAB_COMMON, Scope1, DT.TAB_COMMON) not in Scope:
                     break
             else:
-                ComSpeMacroDict.update(self._SectionsMacroDict[(SectionType, Scope)])
+                ComSpeMacroList.append(self._SectionsMacroDict[(SectionType, Scope)])
 
             if (DT.TAB_COMMON, DT.TAB_COMMON, DT.TAB_COMMON) in Scope:
-                ComComMacroDict.update(self._SectionsMacroDict[(SectionType, Scope)])
+                ComComMacroList.append(self._SectionsMacroDict[(SectionType, Scope)])
 
-        Macros.update(ComComMacroDict)
-        Macros.update(ComSpeMacroDict)
-        Macros.update(SpeSpeMacroDict)
-
-        return Macros
+        return ComComMacroList + ComSpeMacroList + SpeSpeMacroList
 
     def ProcessMultipleLineCODEValue(self,Content):
         CODEBegin = False
@@ -574,6 +770,10 @@ class InfParser(MetaFileParser):
         DT.TAB_USER_EXTENSIONS.upper() : DC.MODEL_META_DATA_USER_EXTENSION
     }
 
+    _CacheState = MetaFileParser._CacheState + ('PcdsDict',)
+
+    _LazyModels = frozenset(DataType.values()) - {DC.MODEL_UNKNOWN, DC.MODEL_META_DATA_DEFINE}
+
     ## Constructor of InfParser
     #
     #  Initialize object of InfParser
@@ -582,21 +782,21 @@ class InfParser(MetaFileParser):
     #   @param      FileType        The raw data of DSC file
     #   @param      Arch            Default Arch value for filtering sections
     #   @param      Table           Database used to retrieve module/package information
+    #   @param      Context         ParseContext of the parser, None for the default one
     #
-    def __init__(self, FilePath, FileType, Arch, Table):
+    def __init__(self, FilePath, FileType, Arch, Table, Context=None):
         # prevent re-initialization
         if hasattr(self, "_Table"):
             return
-        MetaFileParser.__init__(self, FilePath, FileType, Arch, Table)
+        MetaFileParser.__init__(self, FilePath, FileType, Arch, Table, Context=Context)
         self.PcdsDict = {}
 
-    ## Parser starter
-    def Start(self):
+    ## Parse the file, yielding the line index of each section header
+    def _ParseSections(self):
         NmakeLine = ''
         Content = ''
         try:
-            with open(str(self.MetaFile), 'r') as File:
-                Content = File.readlines()
+            Content = self._Context.FileContents.GetLines(self.MetaFile)
         except:
             EdkLogger.error("Parser", FILE_READ_FAILURE, ExtraData=self.MetaFile)
 
@@ -634,6 +834,7 @@ class InfParser(MetaFileParser):
 
             # section header
             if Line[0] == DT.TAB_SECTION_START and Line[-1] == DT.TAB_SECTION_END:
+                yield Index
                 if not GetHeaderComment:
                     for Cmt, LNo in Comments:
                         self._Store(DC.MODEL_META_DATA_HEADER_COMMENT, Cmt, '', '', DT.TAB_COMMON,
@@ -694,7 +895,7 @@ class InfParser(MetaFileParser):
                 continue
             if Comment:
                 Comments.append((Comment, Index + 1))
-            if GlobalData.gOptions and GlobalData.gOptions.CheckUsage:
+            if self._Context.Options and self._Context.Options.CheckUsage:
                 CheckInfComment(self._SectionType, Comments, str(self.MetaFile), Index + 1, self._ValueList)
             #
             # Model, Value1, Value2, Value3, Arch, Platform, BelongsToItem=-1,
@@ -818,7 +1019,7 @@ class InfParser(MetaFileParser):
             elif InfPcdValueList[0] in ['False', 'false', 'FALSE']:
                 self._ValueList[2] = TokenList[1].replace(InfPcdValueList[0], '0', 1)
             elif isinstance(InfPcdValueList[0], str) and InfPcdValueList[0].find('$(') >= 0:
-                Value = ReplaceExprMacro(InfPcdValueList[0],self._Macros)
+                Value = ReplaceExprMacro(InfPcdValueList[0],self._Macros, Context=self._Context)
                 if Value != '0':
                     self._ValueList[2] = Value
         if (self._ValueList[0], self._ValueList[1]) not in self.PcdsDict:
@@ -927,7 +1128,48 @@ class DscParser(MetaFileParser):
 
     SymbolPattern = ValueExpression.SymbolPattern
 
-    IncludedFiles = set()
+    # Included files of default context
+    IncludedFiles = DefaultContext.IncludedFiles
+
+    # the [Defines] section is in raw table as is
+    _LazyModels = frozenset([DC.MODEL_META_DATA_HEADER])
+    _HasPostProcess = True
+
+    # parser attributes stored in cache together with the post-processed table
+    _PostProcessCacheState = ('_Symbols', '_FileLocalMacros', '_IdMapping', '_SectionsMacroDict', '_IncludeGraph')
+    # maps of parse context which are updated by post-process
+    _PostProcessGlobals = ('PlatformPcds', 'PlatformOtherPcds', 'EdkGlobal')
+    # a checkpoint is taken before an !include once the records post-processed
+    # since the last one are more than 1/_CHECKPOINT_SPACING_ of the ones before
+    _CHECKPOINT_SPACING_ = 8
+    # placeholders of the owner, the !include item and the scope given by the
+    # site of an !include, in the records an included file is parsed into
+    _SITE_ITEM_ = -2
+    _SITE_SCOPE_ = '<site>'
+    # how the lines before the first section header of an included file
+    # depend on the site: none of them, items and macro definitions only, or
+    # other lines (directives, sub-sections)
+    _NO_PREFIX_, _ITEM_PREFIX_, _OTHER_PREFIX_ = range(3)
+    # the global macro set to each arch by PostProcessArchs()
+    _ARCH_MACRO_ = 'ARCH'
+    # the directives whose results are kept to be replayed by UpdateMacros()
+    _ConditionModels = frozenset([DC.MODEL_META_DATA_CONDITIONAL_STATEMENT_IF,
+                                  DC.MODEL_META_DATA_CONDITIONAL_STATEMENT_IFDEF,
+                                  DC.MODEL_META_DATA_CONDITIONAL_STATEMENT_IFNDEF,
+                                  DC.MODEL_META_DATA_CONDITIONAL_STATEMENT_ELSEIF])
+    # the PCDs whose values are evaluated as expressions
+    _ExpressionPcdModels = frozenset([DC.MODEL_PCD_FIXED_AT_BUILD, DC.MODEL_PCD_FEATURE_FLAG])
+    # the records UpdateMacros() always post-processes again, as they set
+    # macros or the section, or depend on the directive stack
+    _ReplayedModels = frozenset([DC.MODEL_META_DATA_SECTION_HEADER, DC.MODEL_META_DATA_SUBSECTION_HEADER,
+                                 DC.MODEL_META_DATA_HEADER, DC.MODEL_META_DATA_DEFINE,
+                                 DC.MODEL_META_DATA_GLOBAL_DEFINE, DC.MODEL_META_DATA_CONDITIONAL_STATEMENT_ELSE,
+                                 DC.MODEL_META_DATA_CONDITIONAL_STATEMENT_ENDIF,
+                                 DC.MODEL_META_DATA_CONDITIONAL_STATEMENT_ERROR])
+    # parser attributes saved in the checkpoint taken before each !include
+    _CheckpointState = ('_DirectiveStack', '_DirectiveEvalStack', '_FileLocalMacros', '_Symbols', '_IdMapping',
+                        '_IncludedFileList', '_IncludedNames', '_SectionName', '_SectionType', '_SubsectionName', '_SubsectionType',
+                        '_InSubsection', '_Enabled', '_FileWithError', '_LastItem')
 
     ## Constructor of DscParser
     #
@@ -939,12 +1181,13 @@ class DscParser(MetaFileParser):
     #   @param      Table           Database used to retrieve module/package information
     #   @param      Owner           Owner ID (for sub-section parsing)
     #   @param      From            ID from which the data comes (for !INCLUDE directive)
+    #   @param      Context         ParseContext of the parser, None for the default one
     #
-    def __init__(self, FilePath, FileType, Arch, Table, Owner= -1, From= -1):
+    def __init__(self, FilePath, FileType, Arch, Table, Owner= -1, From= -1, Context=None):
         # prevent re-initialization
         if hasattr(self, "_Table") and self._Table is Table:
             return
-        MetaFileParser.__init__(self, FilePath, FileType, Arch, Table, Owner, From)
+        MetaFileParser.__init__(self, FilePath, FileType, Arch, Table, Owner, From, Context)
         self._Version = 0x00010005  # Only EDK2 dsc file is supported
         # to store conditional directive evaluation result
         self._DirectiveStack = []
@@ -957,23 +1200,142 @@ class DscParser(MetaFileParser):
         self._InDirective = -1
 
         # Final valid replacable symbols
-        self._Symbols = {}
+        self._Symbols = VersionedDict()
         #
         #  Map the ID between the original table and new table to track
         #  the owner item
         #
         self._IdMapping = {-1:-1}
 
+        #
+        # The records to be post-processed, a stack of [record list, index
+        # of next record]. The records of an !include file are pushed on top
+        # of the records of the file including it.
+        #
         self._Content = None
+        # the last record got from _Content
+        self._LastRecord = None
+
+        # the ID the raw table starts from, kept to parse the file again
+        self._TableStartID = Table.ID
+        # digest of the file content the post-processed table comes from
+        self._Fingerprint = None
+        # copies of the context maps taken before post-process
+        self._GlobalsSnapshot = None
+        #
+        # The !include files in the order of post-process, a list of
+        # (file, digest, FromItem, first record ID, last record ID). The
+        # checkpoint taken before processing each of them, or None if not
+        # taken, is in _Checkpoints at the same index.
+        #
+        self._IncludeGraph = []
+        self._Checkpoints = []
+        self._PendingCheckpoint = None
+        # the number of records post-processed before the last checkpoint
+        self._CheckpointSize = 0
+        # {(file, ID of !include item): table ID} for the files parsed again
+        # by Refresh(), None if not refreshing
+        self._ReparseTableIDs = None
+        #
+        # The raw record each post-processed record comes from, with the result
+        # of a conditional directive or the value a FixedAtBuild or FeatureFlag
+        # PCD gives to expressions, {ID: (raw record, result or None)}. The
+        # !include items whose records are post-processed in their place
+        # are in _IncludeSites as (ID of the next post-processed record, raw
+        # record). They are empty if the table is loaded from cache.
+        #
+        self._RecordSources = {}
+        self._IncludeSites = []
+        # the value the last FixedAtBuild or FeatureFlag PCD gives to expressions
+        self._PcdSymbolValue = None
 
     def GetTableID(self):
-        return (len(self.IncludedFiles) + 1) * (10**7)
-    ## Parser starter
-    def Start(self):
+        return (len(self._Context.IncludedFiles) + 1) * (10**7)
+
+    ## Get the digest of the macros which could affect the parsing result
+    #
+    #   The GUIDs are in it as the values of PCDs given in command line are
+    #   resolved with them.
+    #
+    def _MacroDigest(self):
+        Macros = (sorted(self._Context.GlobalDefines.items()), sorted(self._Context.CommandLineDefines.items()),
+                  sorted(self._Context.EdkGlobal.items()), self._Context.BuildOptionPcd,
+                  sorted(self._GuidDict.items()))
+        return md5(repr(Macros).encode('utf-8')).hexdigest()
+
+    ## Section header of raw table could use global macros
+    def _RawCacheKey(self):
+        CacheKey = MetaFileParser._RawCacheKey(self)
+        if CacheKey is None:
+            return None
+        return CacheKey + (self._MacroDigest(),)
+
+    ## Get the key of the post-processed table in cache
+    def _PostProcessCacheKey(self):
+        if not self._IsCacheable():
+            return None
+        Digest = self._Context.FileContents.GetDigest(self.MetaFile)
+        if Digest is None:
+            return None
+        return ('PostProcess', Digest, self.MetaFile.Path, self._Context.Workspace, tuple(mws.getPkgPath()),
+                self._Arch, self._RawTable.ID, self._MacroDigest())
+
+    ## Restore the post-processed table and its side effects from cache
+    #
+    #   The entry is stale if any !include file has been changed, or its
+    #   name is resolved to another file now.
+    #
+    #   @retval: True if the table is loaded, post-process is not needed
+    #
+    def _LoadPostProcessedTable(self, CacheKey):
+        if CacheKey is None:
+            return False
+        Payload = self._Context.MetaFileCache.Get(CacheKey)
+        if Payload is None:
+            return False
+        for IncludedFile, Digest, Name in Payload['Includes']:
+            if self._ResolveInclude(Name)[0] != IncludedFile:
+                return False
+            if self._Context.FileContents.GetDigest(IncludedFile) != Digest:
+                return False
+        self._Table.Load(Payload['Records'], Payload['ID'])
+        for Name, Value in Payload['State'].items():
+            setattr(self, Name, Value)
+        self._Context.PlatformDefines = Payload['PlatformDefines']
+        for Name, Value in Payload['Globals'].items():
+            getattr(self._Context, Name).update(Value)
+        self._Context.IncludedFiles.update(IncludedFile for IncludedFile, _, _ in Payload['Includes'])
+        self._PostProcessed = True
+        return True
+
+    ## Store the post-processed table and its side effects in cache
+    #
+    #   @param  CacheKey:   The key got before post-process
+    #   @param  Globals:    Copies of context maps taken before post-process
+    #
+    def _SavePostProcessedTable(self, CacheKey, Globals):
+        if CacheKey is None:
+            return
+        Changes = {}
+        for Name in self._PostProcessGlobals:
+            Before = Globals[Name]
+            Changes[Name] = {Key: Value for Key, Value in getattr(self._Context, Name).items()
+                             if Key not in Before or Before[Key] != Value}
+        Payload = {
+            'Includes'          :   [(IncludedFile, self._Context.FileContents.GetDigest(IncludedFile), Name)
+                                    for IncludedFile, Name in zip(self._IncludedFileList, self._IncludedNames)],
+            'Records'           :   self._Table.Dump(),
+            'ID'                :   self._Table.ID,
+            'State'             :   {Name: getattr(self, Name) for Name in self._PostProcessCacheState},
+            'PlatformDefines'   :   self._Context.PlatformDefines,
+            'Globals'           :   Changes,
+        }
+        self._Context.MetaFileCache.Set(CacheKey, Payload)
+    ## Parse the file, yielding the line index of each section header
+    def _ParseSections(self):
         Content = ''
         try:
-            with open(str(self.MetaFile), 'r') as File:
-                Content = File.readlines()
+            Content = self._Context.FileContents.GetLines(self.MetaFile)
         except:
             EdkLogger.error("Parser", FILE_READ_FAILURE, ExtraData=self.MetaFile)
 
@@ -1000,6 +1362,7 @@ class DscParser(MetaFileParser):
 
             # section header
             if Line[0] == DT.TAB_SECTION_START and Line[-1] == DT.TAB_SECTION_END:
+                yield Index
                 self._SectionType = DC.MODEL_META_DATA_SECTION_HEADER
             # subsection ending
             elif Line[0] == '}' and self._InSubsection:
@@ -1077,6 +1440,121 @@ class DscParser(MetaFileParser):
                             ExtraData=Text, File=self.MetaFile, Line=Line)
         self._Done()
 
+    ## Get how the records of the file depend on the site including it
+    #
+    #   @retval: (digest, shape), the shape is one of _NO_PREFIX_,
+    #            _ITEM_PREFIX_ and _OTHER_PREFIX_, or None if the records
+    #            depend on the macros, which are used in a section header or
+    #            in a macro definition
+    #
+    def _GetIncludeShape(self):
+        Digest = self._Context.FileContents.GetDigest(self.MetaFile)
+        ShapeKey = (self.MetaFile.Path, Digest)
+        if ShapeKey in self._Context.IncludeRecords:
+            return Digest, self._Context.IncludeRecords[ShapeKey]
+        Shape = self._NO_PREFIX_
+        InPrefix = True
+        for Line in self._Context.FileContents.GetLines(self.MetaFile):
+            Line = CleanString2(Line)[0]
+            if not Line:
+                continue
+            IsHeader = Line[0] == DT.TAB_SECTION_START and Line[-1] == DT.TAB_SECTION_END
+            if (IsHeader or GlobalData.gMacroDefPattern.match(Line)) and '$(' in Line:
+                Shape = None
+                break
+            if IsHeader:
+                InPrefix = False
+            elif InPrefix:
+                if Line[0] in '!}' + DT.TAB_OPTION_START or Line[-1] == '{':
+                    Shape = self._OTHER_PREFIX_
+                elif Shape == self._NO_PREFIX_:
+                    Shape = self._ITEM_PREFIX_
+        self._Context.IncludeRecords[ShapeKey] = Shape
+        return Digest, Shape
+
+    ## Parse the file for an !include directive
+    #
+    #   The records of an included file only differ in the owner, the !include
+    #   item, the IDs and, for the lines before the first section header, the
+    #   scope, as long as the file doesn't use macros in section headers and
+    #   macro definitions. So the file is parsed once with placeholders of
+    #   them, and the records are stamped with the values of each site.
+    #
+    def _ParseIncluded(self):
+        if self._Finished:
+            return
+        if self._RawTable.IsIntegrity():
+            self._Finished = True
+            return
+        Digest, Shape = self._GetIncludeShape()
+        if Digest is None or Shape is None:
+            self.StartParse()
+            return
+        Key = (self.MetaFile.Path, Digest, self._Enabled, self._InSubsection)
+        # the sub-section type is reset by the first component having sub-sections
+        if self._InSubsection:
+            Key += (self._SubsectionType,)
+            if Shape == self._ITEM_PREFIX_:
+                Shape = self._OTHER_PREFIX_
+        if Shape != self._NO_PREFIX_:
+            Key += (self._SectionName, self._SectionType)
+        if Shape == self._OTHER_PREFIX_:
+            Key += (tuple(tuple(Scope) for Scope in self._Scope),)
+        Records = self._Context.IncludeRecords.get(Key)
+        if Records is None:
+            Records = self.__ParseForSites(Shape == self._ITEM_PREFIX_)
+            self._Context.IncludeRecords[Key] = Records
+        else:
+            self._Context.IncludeParsesAvoided += 1
+        self.__StampRecords(Records)
+
+    ## Parse the file into records having placeholders of the site values
+    #
+    #   @param  SiteScope:  Whether the scope is a placeholder too
+    #
+    #   @retval: The record tuples, IDs start from 1
+    #
+    def __ParseForSites(self, SiteScope):
+        Table, Owner, From, Scope = self._RawTable, self._Owner, self._From, self._Scope
+        self._Table = self._RawTable = MetaFileStorage(self.MetaFile, DC.MODEL_FILE_DSC, True, Context=self._Context)
+        self._RawTable.ID = 0
+        self._Owner = [self._SITE_ITEM_]
+        self._From = self._SITE_ITEM_
+        if SiteScope:
+            self._Scope = [[self._SITE_SCOPE_] * 3]
+        try:
+            self.Start()
+            return self._RawTable.Dump()
+        finally:
+            self._Table = self._RawTable = Table
+            self._Owner = Owner
+            self._From = From
+            self._Scope = Scope
+
+    ## Fill the raw table with the records got by __ParseForSites()
+    def __StampRecords(self, Records):
+        ID = self._RawTable.ID
+        SiteScopes = [tuple(Item.strip() for Item in Scope) for Scope in self._Scope]
+        IdMapping = {}
+        RecordList = []
+        for Record in Records:
+            BelongsToItem = Record[8]
+            if BelongsToItem == self._SITE_ITEM_:
+                BelongsToItem = self._Owner[-1]
+            else:
+                BelongsToItem = IdMapping.get(BelongsToItem, BelongsToItem)
+            FromItem = self._From if Record[9] == self._SITE_ITEM_ else Record[9]
+            if Record[5] == self._SITE_SCOPE_:
+                Scopes = SiteScopes
+            else:
+                Scopes = [Record[5:8]]
+            for Scope in Scopes:
+                ID += 1
+                RecordList.append((ID,) + Record[1:5] + tuple(Scope) + (BelongsToItem, FromItem) + Record[10:])
+            IdMapping[Record[0]] = ID
+        self._RawTable.Load(RecordList, ID)
+        self._Finished = True
+
     ## <subsection_header> parser
     def _SubsectionHeaderParser(self):
         self._SubsectionName = self._CurrentLine[1:-1].upper()
@@ -1351,28 +1829,93 @@ class DscParser(MetaFileParser):
                 )
 
     ## Override parent's method since we'll do all macro replacements in parser
-    @property
-    def _Macros(self):
-        Macros = {}
-        Macros.update(self._FileLocalMacros)
-        Macros.update(self._GetApplicableSectionMacro())
-        Macros.update(GlobalData.gEdkGlobal)
-        Macros.update(GlobalData.gPlatformDefines)
-        Macros.update(GlobalData.gCommandLineDefines)
+    def _MacroLayers(self):
+        Layers = MetaFileParser._MacroLayers(self)
+        Layers.append(self._Context.EdkGlobal)
+        Layers.append(self._Context.PlatformDefines)
+        Layers.append(self._Context.CommandLineDefines)
         # PCD cannot be referenced in macro definition
         if self._ItemType not in [DC.MODEL_META_DATA_DEFINE, DC.MODEL_META_DATA_GLOBAL_DEFINE]:
-            Macros.update(self._Symbols)
-        if GlobalData.BuildOptionPcd:
-            for Item in GlobalData.BuildOptionPcd:
+            Layers.append(self._Symbols)
+        if self._Context.BuildOptionPcd:
+            Macros = {}
+            for Item in self._Context.BuildOptionPcd:
                 if isinstance(Item, tuple):
                     continue
                 PcdName, TmpValue = Item.split("=")
-                TmpValue = BuildOptionValue(TmpValue, self._GuidDict)
+                TmpValue = BuildOptionValue(TmpValue, self._GuidDict, self._Context)
                 Macros[PcdName.strip()] = TmpValue
-        return Macros
+            Layers.append(Macros)
+        return Layers
+
+    def _MacroSources(self):
+        return MetaFileParser._MacroSources(self) + (self._Context.EdkGlobal, self._Context.PlatformDefines,
+                                                     self._Context.CommandLineDefines, self._Symbols)
+
+    def _MacroKey(self):
+        Key = MetaFileParser._MacroKey(self)
+        if Key is None:
+            return None
+        return Key + (self._ItemType in [DC.MODEL_META_DATA_DEFINE, DC.MODEL_META_DATA_GLOBAL_DEFINE],
+                      tuple(self._Context.BuildOptionPcd),
+                      tuple(self._GuidDict.items()) if self._Context.BuildOptionPcd else ())
 
     def _PostProcess(self):
-        Processer = {
+        self._Table = MetaFileStorage(self.MetaFile, DC.MODEL_FILE_DSC, True, Context=self._Context)
+        # taken before loading from cache, which updates the maps too
+        self._GlobalsSnapshot = {Name: dict(getattr(self._Context, Name)) for Name in self._PostProcessGlobals}
+        self._Fingerprint = self._Context.FileContents.GetDigest(self.MetaFile)
+        self._Checkpoints = []
+        self._CheckpointSize = 0
+        self._RecordSources = {}
+        self._IncludeSites = []
+        CacheKey = self._PostProcessCacheKey()
+        if self._LoadPostProcessedTable(CacheKey):
+            return
+        self._IncludedFileList = []
+        self._IncludedNames = []
+        self._IncludeGraph = []
+        self._DirectiveStack = []
+        self._DirectiveEvalStack = []
+        self._FileWithError = self.MetaFile
+        self._FileLocalMacros = VersionedDict()
+        # left by an earlier post-process, e.g. of another arch
+        self._Symbols = VersionedDict()
+        self._IdMapping = {-1:-1}
+        self._SectionsMacroDict.clear()
+        self._Context.PlatformDefines = VersionedDict()
+
+        # Get all macro and PCD which has straitforward value
+        self.__RetrievePcdValue()
+        self._Content = [[self._RawTable.GetAll(), 0]]
+        self._InSubsection = False
+        self.__ProcessContent()
+        self.__EndPostProcess(CacheKey)
+
+    ## Get the next record in _Content without removing it
+    #
+    #   @retval: The record, None if there's no more record
+    #
+    def __PeekRecord(self):
+        Content = self._Content
+        while Content:
+            Records, Index = Content[-1]
+            if Index < len(Records):
+                return Records[Index]
+            Content.pop()
+        return None
+
+    ## Remove the next record from _Content and return it
+    def __NextRecord(self):
+        Record = self.__PeekRecord()
+        if Record is not None:
+            self._Content[-1][1] += 1
+            self._LastRecord = Record
+        return Record
+
+    ## Get the method post-processing each type of record
+    def __GetProcessers(self):
+        return {
             DC.MODEL_META_DATA_SECTION_HEADER                  :   self.__ProcessSectionHeader,
             DC.MODEL_META_DATA_SUBSECTION_HEADER               :   self.__ProcessSubsectionHeader,
             DC.MODEL_META_DATA_HEADER                          :   self.__ProcessDefine,
@@ -1406,24 +1949,53 @@ class DscParser(MetaFileParser):
             DC.MODEL_META_DATA_CONDITIONAL_STATEMENT_ERROR     :   self._ProcessError,
         }
 
-        self._Table = MetaFileStorage(self.MetaFile, DC.MODEL_FILE_DSC, True)
-        self._DirectiveStack = []
-        self._DirectiveEvalStack = []
-        self._FileWithError = self.MetaFile
-        self._FileLocalMacros = {}
-        self._SectionsMacroDict.clear()
-        GlobalData.gPlatformDefines = {}
-
-        # Get all macro and PCD which has straitforward value
-        self.__RetrievePcdValue()
-        self._Content = self._RawTable.GetAll()
-        self._ContentIndex = 0
-        self._InSubsection = False
-        while self._ContentIndex < len(self._Content) :
+    ## Call the method post-processing current record
+    #
+    #   Errors of expressions and macros are reported at the line of record.
+    #
+    def __CallProcesser(self, Processer):
+        try:
+            Processer()
+        except EvaluationException as Excpt:
+            #
+            # Only catch expression evaluation error here. We need to report
+            # the precise number of line on which the error occurred
+            #
+            if hasattr(Excpt, 'Pcd'):
+                if Excpt.Pcd in self._Context.PlatformOtherPcds:
+                    Info = self._Context.PlatformOtherPcds[Excpt.Pcd]
+                    EdkLogger.error('Parser', FORMAT_INVALID, "Cannot use this PCD (%s) in an expression as"
+                                    " it must be defined in a [PcdsFixedAtBuild] or [PcdsFeatureFlag] section"
+                                    " of the DSC file, and it is currently defined in this section:"
+                                    " %s, line #: %d." % (Excpt.Pcd, Info[0], Info[1]),
+                                File=self._FileWithError, ExtraData=' '.join(self._ValueList),
+                                Line=self._LineIndex + 1)
+                else:
+                    EdkLogger.error('Parser', FORMAT_INVALID, "PCD (%s) is not defined in DSC file" % Excpt.Pcd,
+                                File=self._FileWithError, ExtraData=' '.join(self._ValueList),
+                                Line=self._LineIndex + 1)
+            else:
+                EdkLogger.error('Parser', FORMAT_INVALID, "Invalid expression: %s" % str(Excpt),
+                                File=self._FileWithError, ExtraData=' '.join(self._ValueList),
+                                Line=self._LineIndex + 1)
+        except MacroException as Excpt:
+            EdkLogger.error('Parser', FORMAT_INVALID, str(Excpt),
+                            File=self._FileWithError, ExtraData=' '.join(self._ValueList),
+                            Line=self._LineIndex + 1)
+
+    ## Post-process the records in _Content
+    def __ProcessContent(self):
+        Processer = self.__GetProcessers()
+        while True:
             # Id, self._ItemType, V1, V2, V3, S1, S2, S3, Owner, self._From, \
-                # LineStart, ColStart, LineEnd, ColEnd, Enabled = self._Content[self._ContentIndex]
-
-            item = self._Content[self._ContentIndex]
+                # LineStart, ColStart, LineEnd, ColEnd, Enabled = self.__NextRecord()
+
+            item = self.__PeekRecord()
+            if item is None:
+                break
+            if item.Model == DC.MODEL_META_DATA_INCLUDE:
+                self._PendingCheckpoint = self.__TakeCheckpointIfDue()
+            self.__NextRecord()
             Id = item.ID
             self._ItemType = item.Model
             V1 = item.Value1
@@ -1440,21 +2012,19 @@ class DscParser(MetaFileParser):
             if self._From < 0:
                 self._FileWithError = self.MetaFile
 
-            self._ContentIndex += 1
-
             self._Scope = [[S1, S2, S3]]
             #
             # For !include directive, handle it specially,
             # merge arch and module type in case of duplicate items
             #
             while self._ItemType == DC.MODEL_META_DATA_INCLUDE:
-                if self._ContentIndex >= len(self._Content):
+                Record = self.__PeekRecord()
+                if Record is None:
                     break
-                Record = self._Content[self._ContentIndex]
                 if LineStart == Record.StartLine and LineEnd == Record.EndLine:
                     if [Record.Scope1, Record.Scope2, Record.Scope3] not in self._Scope:
                         self._Scope.append([Record.Scope1, Record.Scope2, Record.Scope3])
-                    self._ContentIndex += 1
+                    self.__NextRecord()
                 else:
                     break
 
@@ -1465,36 +2035,10 @@ class DscParser(MetaFileParser):
                 self._InSubsection = True
             else:
                 self._InSubsection = False
-            try:
-                Processer[self._ItemType]()
-            except EvaluationException as Excpt:
-                #
-                # Only catch expression evaluation error here. We need to report
-                # the precise number of line on which the error occurred
-                #
-                if hasattr(Excpt, 'Pcd'):
-                    if Excpt.Pcd in GlobalData.gPlatformOtherPcds:
-                        Info = GlobalData.gPlatformOtherPcds[Excpt.Pcd]
-                        EdkLogger.error('Parser', FORMAT_INVALID, "Cannot use this PCD (%s) in an expression as"
-                                        " it must be defined in a [PcdsFixedAtBuild] or [PcdsFeatureFlag] section"
-                                        " of the DSC file, and it is currently defined in this section:"
-                                        " %s, line #: %d." % (Excpt.Pcd, Info[0], Info[1]),
-                                    File=self._FileWithError, ExtraData=' '.join(self._ValueList),
-                                    Line=self._LineIndex + 1)
-                    else:
-                        EdkLogger.error('Parser', FORMAT_INVALID, "PCD (%s) is not defined in DSC file" % Excpt.Pcd,
-                                    File=self._FileWithError, ExtraData=' '.join(self._ValueList),
-                                    Line=self._LineIndex + 1)
-                else:
-                    EdkLogger.error('Parser', FORMAT_INVALID, "Invalid expression: %s" % str(Excpt),
-                                    File=self._FileWithError, ExtraData=' '.join(self._ValueList),
-                                    Line=self._LineIndex + 1)
-            except MacroException as Excpt:
-                EdkLogger.error('Parser', FORMAT_INVALID, str(Excpt),
-                                File=self._FileWithError, ExtraData=' '.join(self._ValueList),
-                                Line=self._LineIndex + 1)
+            self.__CallProcesser(Processer[self._ItemType])
 
             if self._ValueList is None:
+                self._IncludeSites.append((self._Table.ID + 1, item))
                 continue
 
             NewOwner = self._IdMapping.get(Owner, -1)
@@ -1519,10 +2063,463 @@ class DscParser(MetaFileParser):
                                 self._Enabled
                                 )
             self._IdMapping[Id] = self._LastItem
+            if self._ItemType in self._ConditionModels:
+                self._RecordSources[self._LastItem] = (item, self._DirectiveEvalStack[-1])
+            elif self._ItemType in self._ExpressionPcdModels:
+                self._RecordSources[self._LastItem] = (item, self._PcdSymbolValue)
+            else:
+                self._RecordSources[self._LastItem] = (item, None)
 
-        GlobalData.gPlatformDefines.update(self._FileLocalMacros)
+    ## Finish post-process and store the result in cache
+    def __EndPostProcess(self, CacheKey):
+        self._Context.PlatformDefines.update(self._FileLocalMacros)
         self._PostProcessed = True
         self._Content = None
+        self._LastRecord = None
+        self._PendingCheckpoint = None
+        self._SavePostProcessedTable(CacheKey, self._GlobalsSnapshot)
+
+    ## Save the status of post-process before an !include directive
+    #
+    #   @retval: The checkpoint, post-process could be resumed from it by
+    #            __RestoreCheckpoint() and __ProcessContent()
+    #
+    def __TakeCheckpoint(self):
+        State = {Name: copy(getattr(self, Name)) for Name in self._CheckpointState}
+        State['_SectionsMacroDict'] = {Key: dict(Value) for Key, Value in self._SectionsMacroDict.items()}
+        return {
+            'State'     :   State,
+            'Globals'   :   {Name: dict(getattr(self._Context, Name))
+                             for Name in self._PostProcessGlobals + ('PlatformDefines',)},
+            'Content'   :   [list(Frame) for Frame in self._Content],
+            'TableID'   :   self._Table.ID,
+        }
+
+    ## Take a checkpoint if enough records have been post-processed since the last one
+    #
+    #   The state saved grows with the records, so checkpoints are taken
+    #   farther apart as the records grow, to keep the time of taking them
+    #   linear in the number of records.
+    #
+    #   @retval: The checkpoint, or None if it's not taken
+    #
+    def __TakeCheckpointIfDue(self):
+        Size = len(self._IdMapping)
+        if (Size - self._CheckpointSize) * self._CHECKPOINT_SPACING_ < self._CheckpointSize:
+            return None
+        self._CheckpointSize = Size
+        return self.__TakeCheckpoint()
+
+    ## Restore the status of post-process saved in a checkpoint
+    def __RestoreCheckpoint(self, Checkpoint):
+        State = Checkpoint['State']
+        for Name in self._CheckpointState:
+            setattr(self, Name, State[Name])
+        self._SectionsMacroDict.clear()
+        self._SectionsMacroDict.update(State['_SectionsMacroDict'])
+        self.__RestoreGlobals(Checkpoint['Globals'])
+        self._Table.Truncate(Checkpoint['TableID'])
+        self._RecordSources = {ID: Source for ID, Source in self._RecordSources.items()
+                               if ID <= Checkpoint['TableID']}
+        self._IncludeSites = [Site for Site in self._IncludeSites if Site[0] <= Checkpoint['TableID']]
+        self._Content = [list(Frame) for Frame in Checkpoint['Content']]
+        self._CheckpointSize = len(self._IdMapping)
+
+    ## Restore the maps of parse context from their copies
+    def __RestoreGlobals(self, Globals):
+        for Name, Value in Globals.items():
+            Map = getattr(self._Context, Name)
+            Map.clear()
+            Map.update(Value)
+
+    ## Remove the storage and parser objects of a file, so it will be parsed again
+    def __DropFile(self, FilePath):
+        for Key in [Key for Key in self._Context.StorageCache if Key[0] == FilePath.Path and not Key[2]]:
+            del self._Context.StorageCache[Key]
+        self._Context.MetaFiles.pop(FilePath, None)
+
+    ## Get a table ID after the ones used by all tables of parse context
+    def __UnusedTableID(self):
+        return (max(Table.ID for Table in self._Context.StorageCache.values()) // (10**7) + 1) * (10**7)
+
+    ## Get the !include files in the order of post-process
+    #
+    #   @retval: A list of (file, digest, ID of !include item, first ID, last
+    #            ID). The IDs are the ones of the records the file contributes
+    #            in raw table, -1 if it has none.
+    #
+    def GetIncludeGraph(self):
+        return list(self._IncludeGraph)
+
+    ## Post-process the file for several arches and get a view for each one
+    #
+    #   As build does, the global macro ARCH is set to each arch in turn. The
+    #   records are post-processed once for all arches if neither the DSC
+    #   file nor any of its !include files uses ARCH, as the directives are
+    #   then evaluated the same for all of them; otherwise once for each arch.
+    #   Each record of a post-processed table is tagged with the arches it
+    #   applies to, and the views of the arches sharing a table query it
+    #   with their own arch. ARCH is restored when done, and the maps of parse
+    #   context are left as the last post-process sets them.
+    #
+    #   @param  ArchList:   The list of arches
+    #
+    #   @retval: An ordered dict of {arch: DscArchView}
+    #
+    def PostProcessArchs(self, ArchList):
+        Defines = self._Context.GlobalDefines
+        Saved = Defines.get(self._ARCH_MACRO_)
+        Views = {}
+        Pending = list(ArchList)
+        Globals = None
+        try:
+            while Pending:
+                Defines[self._ARCH_MACRO_] = Pending[0]
+                if Globals is not None:
+                    self.__RestoreGlobals(Globals)
+                    # the tables of !include sites new to this pass must not
+                    # reuse the IDs of the ones of earlier passes
+                    self._ReparseTableIDs = {}
+                self.StartParse()
+                self._PostProcess()
+                self._ReparseTableIDs = None
+                if Globals is None:
+                    Globals = self._GlobalsSnapshot
+                Group = [Pending[0]] if self.__UsesArchMacro() else Pending
+                RecordArchs = self.__TagRecords(Group)
+                IncludeGraph = self.GetIncludeGraph()
+                for Arch in Group:
+                    Views[Arch] = DscArchView(self, Arch, self._Table, RecordArchs, IncludeGraph)
+                Pending = [Arch for Arch in Pending if Arch not in Views]
+        finally:
+            self._ReparseTableIDs = None
+            if Saved is None:
+                Defines.pop(self._ARCH_MACRO_, None)
+            else:
+                Defines[self._ARCH_MACRO_] = Saved
+        return OrderedDict((Arch, Views[Arch]) for Arch in ArchList)
+
+    ## Check whether the DSC file or any of its !include files could use ARCH
+    #
+    #   Lines are checked without removing comments. A file included only
+    #   for some arches is reached through a directive using ARCH, so the
+    #   files post-processed for one arch are enough to tell.
+    #
+    def __UsesArchMacro(self):
+        FileList = [self.MetaFile] + [IncludedFile for IncludedFile, _, _, _, _ in self._IncludeGraph]
+        for FilePath in FileList:
+            for Line in self._Context.FileContents.GetLines(FilePath):
+                if ArchMacroPattern.search(Line):
+                    return True
+        return False
+
+    ## Get the arches each record of post-processed table applies to
+    #
+    #   @param  ArchList:   The arches the table is post-processed for
+    #
+    #   @retval: A dict of {record ID: frozenset of arches}, records applying
+    #            to none of the arches are not in it
+    #
+    def __TagRecords(self, ArchList):
+        AllArches = frozenset(ArchList)
+        ArchesOfScope = {DT.TAB_ARCH_COMMON: AllArches}
+        RecordArchs = {}
+        for Record in self._Table.GetAll():
+            Arches = ArchesOfScope.get(Record.Scope1)
+            if Arches is None:
+                Arches = ArchesOfScope[Record.Scope1] = AllArches & frozenset([Record.Scope1])
+            if Arches:
+                RecordArchs[Record.ID] = Arches
+        return RecordArchs
+
+    ## Get the table IDs of the !include files, to be kept when they are parsed again
+    #
+    #   @retval: {(file, ID of !include item): table ID}
+    #
+    def __IncludeTableIDs(self):
+        return {(IncludedFile, FromItem): FirstID - 1
+                for IncludedFile, _, FromItem, FirstID, _ in self._IncludeGraph if FirstID >= 0}
+
+    ## Parse the DSC file again and post-process all its records
+    #
+    #   @param  TableIDs:   The table IDs of the !include files got by
+    #                       __IncludeTableIDs()
+    #
+    def __ParseAgain(self, TableIDs):
+        StartID = self._TableStartID
+        self.__DropFile(self.MetaFile)
+        self._Context.MetaFiles[self.MetaFile] = self
+        self.__RestoreGlobals(self._GlobalsSnapshot)
+        Table = MetaFileStorage(self.MetaFile, DC.MODEL_FILE_DSC, Context=self._Context)
+        DscParser.__init__(self, self.MetaFile, self._FileType, self._Arch, Table, Context=self._Context)
+        Table.ID = self._TableStartID = StartID
+        self._ReparseTableIDs = TableIDs
+        self.StartParse()
+        self._PostProcess()
+
+    ## Parse again the files changed after post-process
+    #
+    #   Only the changed !include files are parsed again, and post-process is
+    #   resumed from the last checkpoint taken before the first of them. The files
+    #   are given the table IDs they had, so the IDs of records stay the same.
+    #   If the DSC file itself is changed, or there's no checkpoint because
+    #   the table is loaded from cache, all records are post-processed again.
+    #
+    #   @retval: (changed files, removed records, added records). Records are
+    #            the ones in post-processed table, compared by content
+    #            regardless of their IDs, owners and line numbers.
+    #
+    def Refresh(self):
+        if not self._PostProcessed:
+            return [], [], []
+        # the files are read from disk, not from the contents read before
+        ChangedFiles = []
+        if FileDigest(self.MetaFile) != self._Fingerprint:
+            ChangedFiles.append(self.MetaFile)
+            self._Context.FileContents.Invalidate(self.MetaFile)
+        Restart = None
+        for Index, (IncludedFile, Digest, _, _, _) in enumerate(self._IncludeGraph):
+            if IncludedFile in ChangedFiles or FileDigest(IncludedFile) == Digest:
+                continue
+            ChangedFiles.append(IncludedFile)
+            self._Context.FileContents.Invalidate(IncludedFile)
+            self.__DropFile(IncludedFile)
+            if Restart is None:
+                Restart = Index
+        if not ChangedFiles:
+            return [], [], []
+        while Restart is not None and 0 < Restart < len(self._Checkpoints) and self._Checkpoints[Restart] is None:
+            Restart -= 1
+
+        OldRecords = self._Table.GetAll()
+        TableIDs = self.__IncludeTableIDs()
+        if ChangedFiles[0] is self.MetaFile:
+            self.__ParseAgain(TableIDs)
+        elif Restart >= len(self._Checkpoints):
+            self._ReparseTableIDs = TableIDs
+            self.__RestoreGlobals(self._GlobalsSnapshot)
+            self._PostProcess()
+        else:
+            self._ReparseTableIDs = TableIDs
+            Checkpoint = self._Checkpoints[Restart]
+            del self._Checkpoints[Restart:]
+            del self._IncludeGraph[Restart:]
+            self.__RestoreCheckpoint(Checkpoint)
+            self.__ProcessContent()
+            self.__EndPostProcess(self._PostProcessCacheKey())
+        self._ReparseTableIDs = None
+
+        # records are compared by content only
+        KeyOf = lambda Record: (Record.Model, Record.Value1, Record.Value2, Record.Value3,
+                                Record.Scope1, Record.Scope2, Record.Scope3, Record.Enabled)
+        NewRecords = self._Table.GetAll()
+        OldKeys = Counter(KeyOf(Record) for Record in OldRecords)
+        NewKeys = Counter(KeyOf(Record) for Record in NewRecords)
+        RemovedKeys = OldKeys - NewKeys
+        AddedKeys = NewKeys - OldKeys
+        Removed = []
+        for Record in OldRecords:
+            if RemovedKeys[KeyOf(Record)] > 0:
+                RemovedKeys[KeyOf(Record)] -= 1
+                Removed.append(Record)
+        Added = []
+        for Record in NewRecords:
+            if AddedKeys[KeyOf(Record)] > 0:
+                AddedKeys[KeyOf(Record)] -= 1
+                Added.append(Record)
+        return ChangedFiles, Removed, Added
+
+    ## Change command line macros and patch the post-processed table
+    #
+    #   The directives and values which could use a changed macro, or a macro
+    #   or PCD changed by them in turn, are evaluated again, and the records
+    #   whose values or enabled flags change are patched in place, keeping
+    #   their IDs. The other records are only walked to set the macros, PCDs
+    #   and directive stacks again. The files are parsed and post-processed
+    #   again as a whole if a changed macro is used in a section header or a
+    #   macro definition, which are replaced in raw table, or changes which
+    #   !include files are included, or if the table is loaded from cache.
+    #
+    #   @param  Macros:     {name: value} of the command line macros to set,
+    #                       None as value to remove the macro
+    #
+    #   @retval: The list of (first ID, last ID) of the records touched, in
+    #            ID order
+    #
+    def UpdateMacros(self, Macros):
+        Defines = self._Context.CommandLineDefines
+        Changed = set()
+        for Name, Value in Macros.items():
+            if Defines.get(Name) == Value:
+                continue
+            Changed.add(Name)
+            if Value is None:
+                Defines.pop(Name, None)
+            else:
+                Defines[Name] = Value
+        if not Changed or not self._PostProcessed:
+            return []
+        # the state saved in checkpoints comes from the old values
+        self._Checkpoints = []
+        if self._RecordSources and not self.__RawUsesMacros(Changed):
+            Touched = self.__ReplayContent(Changed)
+            if Touched is not None:
+                self._Context.PlatformDefines.update(self._FileLocalMacros)
+                self._SavePostProcessedTable(self._PostProcessCacheKey(), self._GlobalsSnapshot)
+                return self.__GetRanges(Touched)
+        TableIDs = self.__IncludeTableIDs()
+        for IncludedFile, _, _, _, _ in self._IncludeGraph:
+            self.__DropFile(IncludedFile)
+        self.__ParseAgain(TableIDs)
+        self._ReparseTableIDs = None
+        return self.__GetRanges([Record.ID for Record in self._Table.GetRecords()])
+
+    ## Check whether some macros are used in a section header or a macro definition
+    #
+    #   @param  Names:  The set of macro names
+    #
+    def __RawUsesMacros(self, Names):
+        FileList = [self.MetaFile] + [IncludedFile for IncludedFile, _, _, _, _ in self._IncludeGraph]
+        for FilePath in set(FileList):
+            for Line in self._Context.FileContents.GetLines(FilePath):
+                if '$(' not in Line:
+                    continue
+                Line = CleanString2(Line)[0]
+                if not Line:
+                    continue
+                if (Line[0] == DT.TAB_SECTION_START and Line[-1] == DT.TAB_SECTION_END) \
+                   or GlobalData.gMacroDefPattern.match(Line):
+                    if not Names.isdisjoint(GlobalData.gMacroRefPattern.findall(Line)):
+                        return True
+        return False
+
+    ## Check whether current record could use some of the names
+    #
+    #   The names are the ones used as $(NAME), and, in the expressions of
+    #   conditional directives and PCD values, the bare names of macros and
+    #   PCDs. The names in the values of the macros and PCDs used are taken
+    #   as used too, as the values could be evaluated as expressions.
+    #
+    #   @param  Dirty:  The set of names of macros and PCDs
+    #
+    def __UsesNames(self, Dirty):
+        Names = set()
+        for Value in self._ValueList:
+            if '$(' in Value:
+                Names.update(GlobalData.gMacroRefPattern.findall(Value))
+        if self._ItemType in self._ConditionModels or self._ItemType in self._ExpressionPcdModels:
+            for Name in ExpressionNamePattern.findall(self._ValueList[-1 if self._ItemType in self._ExpressionPcdModels
+                                                                      else 1]):
+                Names.add(Name)
+                Names.update(Name.split(DT.TAB_SPLIT))
+        if not Names:
+            return False
+        if not Names.isdisjoint(Dirty):
+            return True
+        Macros = self._Macros
+        Pending = list(Names)
+        while Pending:
+            Value = Macros.get(Pending.pop())
+            if not isinstance(Value, str):
+                continue
+            for Name in ExpressionNamePattern.findall(Value):
+                for Name in [Name] + Name.split(DT.TAB_SPLIT):
+                    if Name in Dirty:
+                        return True
+                    if Name not in Names:
+                        Names.add(Name)
+                        Pending.append(Name)
+        return False
+
+    ## Post-process the records of table again, evaluating only the ones using changed names
+    #
+    #   @param  Dirty:  The set of names of the macros changed. The macros
+    #                   and PCDs changed by the records are added to it.
+    #
+    #   @retval: The list of IDs of the records changed, or None if the
+    #            !include files included would change
+    #
+    def __ReplayContent(self, Dirty):
+        Processer = self.__GetProcessers()
+        self.__RestoreGlobals(self._GlobalsSnapshot)
+        self._DirectiveStack = []
+        self._DirectiveEvalStack = []
+        self._FileWithError = self.MetaFile
+        self._FileLocalMacros = VersionedDict()
+        self._Symbols = VersionedDict()
+        self._SectionsMacroDict.clear()
+        self._Context.PlatformDefines = VersionedDict()
+        self.__RetrievePcdValue()
+        self._Enabled = True
+
+        IncludedFiles = {FromItem: IncludedFile for IncludedFile, _, FromItem, _, _ in self._IncludeGraph}
+        Sites = {}
+        for ID, Record in self._IncludeSites:
+            Sites.setdefault(ID, []).append(Record)
+        Touched = []
+        for Row in self._Table.GetRecords():
+            # the records of an !include file follow the !include item
+            for Record in Sites.get(Row.ID, ()):
+                self._ItemType = Record.Model
+                self._ValueList = [Record.Value1, Record.Value2, Record.Value3]
+                if not self._Enabled or self.__UsesNames(Dirty):
+                    return None
+                self._FileWithError = IncludedFiles.get(Record.ID, self._FileWithError)
+
+            Record, Result = self._RecordSources[Row.ID]
+            self._ItemType = Model = Record.Model
+            self._From = Record.FromItem
+            if self._From < 0:
+                self._FileWithError = self.MetaFile
+            self._Scope = [[Record.Scope1, Record.Scope2, Record.Scope3]]
+            self._LineIndex = Record.StartLine - 1
+            self._ValueList = [Record.Value1, Record.Value2, Record.Value3]
+            self._InSubsection = Row.BelongsToItem > 0
+            Values = [Row.Value1, Row.Value2, Row.Value3]
+            if Model == DC.MODEL_META_DATA_INCLUDE:
+                if self._Enabled and (not Row.Enabled or self.__UsesNames(Dirty)):
+                    return None
+                self._ValueList = Values
+            elif Model in self._ReplayedModels or self.__UsesNames(Dirty):
+                self.__CallProcesser(Processer[Model])
+            elif Model in self._ConditionModels:
+                self.__ProcessDirective(Result)
+            elif Model in self._ExpressionPcdModels:
+                self.__SetPcdSymbol(Result)
+                self._ValueList = Values
+            else:
+                self._ValueList = Values
+
+            self._Enabled = (not self._DirectiveEvalStack) or (False not in self._DirectiveEvalStack)
+            if Model in self._ConditionModels:
+                self._RecordSources[Row.ID] = (Record, self._DirectiveEvalStack[-1])
+            NewValues = [Value.strip() for Value in self._ValueList]
+            if NewValues == Values and self._Enabled == Row.Enabled:
+                continue
+            # the macros and PCDs set by a changed record change the records using them
+            if Model in [DC.MODEL_META_DATA_HEADER, DC.MODEL_META_DATA_DEFINE, DC.MODEL_META_DATA_GLOBAL_DEFINE]:
+                Dirty.add(NewValues[1])
+            elif Model in self._ExpressionPcdModels:
+                Dirty.add(DT.TAB_SPLIT.join(NewValues[0:2]))
+            self._Table.Update(Row.ID, NewValues[0], NewValues[1], NewValues[2], self._Enabled)
+            Touched.append(Row.ID)
+        return Touched
+
+    ## Merge record IDs into ranges of consecutive IDs
+    #
+    #   @param  IDs:    The list of IDs in increasing order
+    #
+    #   @retval: The list of (first ID, last ID)
+    #
+    @staticmethod
+    def __GetRanges(IDs):
+        Ranges = []
+        for ID in IDs:
+            if Ranges and Ranges[-1][1] == ID - 1:
+                Ranges[-1][1] = ID
+            else:
+                Ranges.append([ID, ID])
+        return [tuple(Range) for Range in Ranges]
     def _ProcessError(self):
         if not self._Enabled:
             return
@@ -1544,12 +2541,11 @@ class DscParser(MetaFileParser):
 
     def __RetrievePcdValue(self):
         try:
-            with open(str(self.MetaFile), 'r') as File:
-                Content = File.readlines()
+            Content = self._Context.FileContents.Get(self.MetaFile)
         except:
             EdkLogger.error("Parser", FILE_READ_FAILURE, ExtraData=self.MetaFile)
 
-        GlobalData.gPlatformOtherPcds['DSCFILE'] = str(self.MetaFile)
+        self._Context.PlatformOtherPcds['DSCFILE'] = str(self.MetaFile)
         for PcdType in (DC.MODEL_PCD_PATCHABLE_IN_MODULE, DC.MODEL_PCD_DYNAMIC_DEFAULT, DC.MODEL_PCD_DYNAMIC_HII,
                         DC.MODEL_PCD_DYNAMIC_VPD, DC.MODEL_PCD_DYNAMIC_EX_DEFAULT, DC.MODEL_PCD_DYNAMIC_EX_HII,
                         DC.MODEL_PCD_DYNAMIC_EX_VPD):
@@ -1560,11 +2556,9 @@ class DscParser(MetaFileParser):
                 PcdName = item.Value2
                 Line = item.StartLine
                 Name = TokenSpaceGuid + '.' + PcdName
-                if Name not in GlobalData.gPlatformOtherPcds:
-                    PcdLine = Line
-                    while not Content[Line - 1].lstrip().startswith(DT.TAB_SECTION_START):
-                        Line -= 1
-                    GlobalData.gPlatformOtherPcds[Name] = (CleanString(Content[Line - 1]), PcdLine, PcdType)
+                if Name not in self._Context.PlatformOtherPcds:
+                    _, Header = Content.GetSectionHeader(Line)
+                    self._Context.PlatformOtherPcds[Name] = (CleanString(Header), Line, PcdType)
 
     def __ProcessDefine(self):
         if not self._Enabled:
@@ -1585,7 +2579,7 @@ class DscParser(MetaFileParser):
             else:
                 self._ConstructSectionMacroDict(Name, Value)
         elif self._ItemType == DC.MODEL_META_DATA_GLOBAL_DEFINE:
-            GlobalData.gEdkGlobal[Name] = Value
+            self._Context.EdkGlobal[Name] = Value
 
         #
         # Keyword in [Defines] section can be used as Macros
@@ -1595,14 +2589,18 @@ class DscParser(MetaFileParser):
 
         self._ValueList = [Type, Name, Value]
 
-    def __ProcessDirective(self):
-        Result = None
-        if self._ItemType in [DC.MODEL_META_DATA_CONDITIONAL_STATEMENT_IF,
-                             DC.MODEL_META_DATA_CONDITIONAL_STATEMENT_ELSEIF]:
+    ## Post-process a directive
+    #
+    #   @param  Result:     The result of a conditional directive got before,
+    #                       None to evaluate it
+    #
+    def __ProcessDirective(self, Result=None):
+        if Result is None and self._ItemType in [DC.MODEL_META_DATA_CONDITIONAL_STATEMENT_IF,
+                                                 DC.MODEL_META_DATA_CONDITIONAL_STATEMENT_ELSEIF]:
             Macros = self._Macros
-            Macros.update(GlobalData.gGlobalDefines)
+            Macros.update(self._Context.GlobalDefines)
             try:
-                Result = ValueExpression(self._ValueList[1], Macros)()
+                Result = ValueExpression(self._ValueList[1], Macros, self._Context)()
             except SymbolNotFound as Exc:
                 EdkLogger.debug(EdkLogger.DEBUG_5, str(Exc), self._ValueList[1])
                 Result = False
@@ -1622,7 +2620,7 @@ class DscParser(MetaFileParser):
             self._DirectiveStack.append(self._ItemType)
             if self._ItemType == DC.MODEL_META_DATA_CONDITIONAL_STATEMENT_IF:
                 Result = bool(Result)
-            else:
+            elif Result is None:
                 Macro = self._ValueList[1]
                 Macro = Macro[2:-1] if (Macro.startswith("$(") and Macro.endswith(")")) else Macro
                 Result = Macro in self._Macros
@@ -1648,44 +2646,40 @@ class DscParser(MetaFileParser):
                     break
         elif self._ItemType == DC.MODEL_META_DATA_INCLUDE:
             # The included file must be relative to workspace or same directory as DSC file
-            __IncludeMacros = {}
             #
             # Allow using system environment variables  in path after !include
             #
-            __IncludeMacros['WORKSPACE'] = GlobalData.gGlobalDefines['WORKSPACE']
+            __IncludeMacros = {'WORKSPACE': self._Context.GlobalDefines['WORKSPACE']}
             #
             # Allow using MACROs comes from [Defines] section to keep compatible.
+            # They are looked up in place, not copied, as PCDs are among them.
             #
-            __IncludeMacros.update(self._Macros)
+            __IncludeMacros = ChainMap(self._Macros, __IncludeMacros)
 
-            IncludedFile = NormPath(ReplaceMacro(self._ValueList[1], __IncludeMacros, RaiseError=True))
-            #
-            # First search the include file under the same directory as DSC file
-            #
-            IncludedFile1 = PathClass(IncludedFile, self.MetaFile.Dir)
+            IncludedFile = NormPath(ReplaceMacro(self._ValueList[1], __IncludeMacros, RaiseError=True), Context=self._Context)
             if self._Enabled:
-                ErrorCode, ErrorInfo1 = IncludedFile1.Validate()
+                IncludedFile1, ErrorCode, ErrorInfo = self._ResolveInclude(IncludedFile)
                 if ErrorCode != 0:
-                    #
-                    # Also search file under the WORKSPACE directory
-                    #
-                    IncludedFile1 = PathClass(IncludedFile, GlobalData.gWorkspace)
-                    ErrorCode, ErrorInfo2 = IncludedFile1.Validate()
-                    if ErrorCode != 0:
-                        EdkLogger.error('parser', ErrorCode, File=self._FileWithError,
-                                        Line=self._LineIndex + 1, ExtraData=ErrorInfo1 + "\n" + ErrorInfo2)
+                    EdkLogger.error('parser', ErrorCode, File=self._FileWithError,
+                                    Line=self._LineIndex + 1, ExtraData=ErrorInfo)
 
                 self._FileWithError = IncludedFile1
 
-                FromItem = self._Content[self._ContentIndex - 1].ID
+                FromItem = self._LastRecord.ID
                 if self._InSubsection:
-                    Owner = self._Content[self._ContentIndex - 1].BelongsToItem
+                    Owner = self._LastRecord.BelongsToItem
                 else:
-                    Owner = self._Content[self._ContentIndex - 1].ID
-                IncludedFileTable = MetaFileStorage(IncludedFile1, DC.MODEL_FILE_DSC, False, FromItem=FromItem)
-                self.IncludedFiles.add (IncludedFile1)
+                    Owner = self._LastRecord.ID
+                IncludedFileTable = MetaFileStorage(IncludedFile1, DC.MODEL_FILE_DSC, False, FromItem=FromItem,
+                                                    Context=self._Context)
+                self._Context.IncludedFiles.add (IncludedFile1)
+                self._IncludedFileList.append(IncludedFile1)
+                self._IncludedNames.append(IncludedFile)
                 Parser = DscParser(IncludedFile1, self._FileType, self._Arch, IncludedFileTable,
-                                   Owner=Owner, From=FromItem)
+                                   Owner=Owner, From=FromItem, Context=self._Context)
+                # a file parsed again by Refresh() keeps the IDs it had
+                if self._ReparseTableIDs is not None and not IncludedFileTable.IsIntegrity():
+                    IncludedFileTable.ID = self._ReparseTableIDs.get((IncludedFile1, FromItem)) or self.__UnusedTableID()
 
                 
 
@@ -1697,14 +2691,36 @@ class DscParser(MetaFileParser):
                 Parser._Scope = self._Scope
                 Parser._Enabled = self._Enabled
                 # Parse the included file
-                Parser.StartParse()
+                Parser._ParseIncluded()
                 # Insert all records in the table for the included file into dsc file table
                 Records = IncludedFileTable.GetAll()
                 if Records:
-                    self._Content[self._ContentIndex:self._ContentIndex] = Records
-                    self._Content.pop(self._ContentIndex - 1)
+                    self._Content.append([Records, 0])
                     self._ValueList = None
-                    self._ContentIndex -= 1
+                self._IncludeGraph.append((IncludedFile1, self._Context.FileContents.GetDigest(IncludedFile1), FromItem,
+                                           Records[0].ID if Records else -1, Records[-1].ID if Records else -1))
+                self._Checkpoints.append(self._PendingCheckpoint)
+
+    ## Find the file an !include directive names
+    #
+    #   @param  IncludedFile:   The normalized file name after !include
+    #
+    #   @retval: (PathClass of the file, error code, error message)
+    #
+    def _ResolveInclude(self, IncludedFile):
+        #
+        # First search the include file under the same directory as DSC file
+        #
+        IncludedFile1 = PathClass(IncludedFile, self.MetaFile.Dir)
+        ErrorCode, ErrorInfo1 = IncludedFile1.Validate(Context=self._Context)
+        if ErrorCode == 0:
+            return IncludedFile1, 0, ''
+        #
+        # Also search file under the WORKSPACE directory
+        #
+        IncludedFile1 = PathClass(IncludedFile, self._Context.Workspace)
+        ErrorCode, ErrorInfo2 = IncludedFile1.Validate(Context=self._Context)
+        return IncludedFile1, ErrorCode, ErrorInfo1 + "\n" + ErrorInfo2 if ErrorCode != 0 else ''
 
     def __ProcessPackages(self):
         self._ValueList[0] = ReplaceMacro(self._ValueList[0], self._Macros)
@@ -1738,7 +2754,7 @@ class DscParser(MetaFileParser):
         PcdValue = ValList[Index]
         if PcdValue and "." not in self._ValueList[0]:
             try:
-                ValList[Index] = ValueExpression(PcdValue, self._Macros)(True)
+                ValList[Index] = ValueExpression(PcdValue, self._Macros, self._Context)(True)
             except WrnExpression as Value:
                 ValList[Index] = Value.result
             except:
@@ -1749,14 +2765,19 @@ class DscParser(MetaFileParser):
         if ValList[Index] == 'False':
             ValList[Index] = '0'
 
-        if (not self._DirectiveEvalStack) or (False not in self._DirectiveEvalStack):
-            GlobalData.gPlatformPcds[DT.TAB_SPLIT.join(self._ValueList[0:2])] = PcdValue
-            self._Symbols[DT.TAB_SPLIT.join(self._ValueList[0:2])] = PcdValue
+        self.__SetPcdSymbol(PcdValue)
         try:
             self._ValueList[2] = '|'.join(ValList)
         except Exception:
             print(ValList)
 
+    ## Make the value of a FixedAtBuild or FeatureFlag PCD usable in expressions if it's enabled
+    def __SetPcdSymbol(self, PcdValue):
+        self._PcdSymbolValue = PcdValue
+        if (not self._DirectiveEvalStack) or (False not in self._DirectiveEvalStack):
+            self._Context.PlatformPcds[DT.TAB_SPLIT.join(self._ValueList[0:2])] = PcdValue
+            self._Symbols[DT.TAB_SPLIT.join(self._ValueList[0:2])] = PcdValue
+
     def __ProcessComponent(self):
         self._ValueList[0] = ReplaceMacro(self._ValueList[0], self._Macros)
 
@@ -1793,6 +2814,51 @@ class DscParser(MetaFileParser):
         DC.MODEL_META_DATA_SUBSECTION_HEADER               :   _SubsectionHeaderParser,
     }
 
+## The view of a DscParser post-processed for one arch
+#
+# Views are made by DscParser.PostProcessArchs(). The views of the arches
+# sharing a post-processed table query the same table, keeping only the
+# records tagged with their own arch. They could be used in place of the
+# parser, e.g. by DscGen.from_parser() and GetDscModuleFiles().
+#
+#   @param      Parser          The DscParser
+#   @param      Arch            The arch of the view
+#   @param      Table           The post-processed table
+#   @param      RecordArchs     The arches of records, {record ID: frozenset}
+#   @param      IncludeGraph    The !include files of the post-process making Table
+#
+class DscArchView(object):
+    def __init__(self, Parser, Arch, Table, RecordArchs, IncludeGraph):
+        self._Parser = Parser
+        self._Arch = Arch
+        self._Table = Table
+        self._RecordArchs = RecordArchs
+        self._IncludeGraph = IncludeGraph
+        self.MetaFile = Parser.MetaFile
+
+    ## Use [] style to query data as the parser does
+    #
+    #   Queries without arch get the records of raw table for the arch of view.
+    #
+    def __getitem__(self, DataInfo):
+        if not isinstance(DataInfo, type(())):
+            DataInfo = (DataInfo,)
+        Parser = self._Parser
+        if len(DataInfo) == 1 or DataInfo[1] is None:
+            Parser.StartParse(DataInfo[0])
+            return Parser._FilterRecordList(Parser._RawTable.Query(*DataInfo), self._Arch)
+        Empty = frozenset()
+        return [Record for Record in Parser._FilterRecordList(self._Table.Query(*DataInfo), DataInfo[1])
+                if self._Arch in self._RecordArchs.get(Record.ID, Empty)]
+
+    ## Get the arches a record of the view applies to
+    def GetRecordArchs(self, Record):
+        return self._RecordArchs.get(Record.ID, frozenset())
+
+    ## Get the !include files of the arch, as DscParser.GetIncludeGraph() does
+    def GetIncludeGraph(self):
+        return list(self._IncludeGraph)
+
 ## DEC file parser class
 #
 #   @param      FilePath        The path of platform description file
@@ -1818,6 +2884,10 @@ class DecParser(MetaFileParser):
         DT.TAB_USER_EXTENSIONS.upper()                 :   DC.MODEL_META_DATA_USER_EXTENSION,
     }
 
+    _CacheState = MetaFileParser._CacheState + ('_AllPCDs', '_AllPcdDict', '_GuidDict', '_DefinesCount')
+
+    _LazyModels = frozenset(DataType.values()) - {DC.MODEL_META_DATA_DEFINE}
+
     ## Constructor of DecParser
     #
     #  Initialize object of DecParser
@@ -1826,15 +2896,19 @@ class DecParser(MetaFileParser):
     #   @param      FileType        The raw data of DSC file
     #   @param      Arch            Default Arch value for filtering sections
     #   @param      Table           Database used to retrieve module/package information
+    #   @param      Context         ParseContext of the parser, None for the default one
     #
-    def __init__(self, FilePath, FileType, Arch, Table):
+    def __init__(self, FilePath, FileType, Arch, Table, Context=None):
         # prevent re-initialization
         if hasattr(self, "_Table"):
             return
-        MetaFileParser.__init__(self, FilePath, FileType, Arch, Table, -1)
+        MetaFileParser.__init__(self, FilePath, FileType, Arch, Table, -1, Context=Context)
         self._Comments = []
         self._Version = 0x00010005  # Only EDK2 dec file is supported
-        self._AllPCDs = [] # Only for check duplicate PCD
+        # (scope, token space GUID, PCD name) of the PCDs defined, to check duplicates
+        self._AllPCDs = set()
+        # {token space GUID.PCD name: value} of the PCDs defined, looked up by
+        # the expressions of later PCD values before the GUID names
         self._AllPcdDict = {}
 
         self._CurrentStructurePcdName = ""
@@ -1843,12 +2917,11 @@ class DecParser(MetaFileParser):
 
         self._RestofValue = ""
 
-    ## Parser starter
-    def Start(self):
+    ## Parse the file, yielding the line index of each section header
+    def _ParseSections(self):
         Content = ''
         try:
-            with open(str(self.MetaFile), 'r') as File:
-                Content = File.readlines()
+            Content = self._Context.FileContents.GetLines(self.MetaFile)
         except:
             EdkLogger.error("Parser", FILE_READ_FAILURE, ExtraData=self.MetaFile)
 
@@ -1869,6 +2942,7 @@ class DecParser(MetaFileParser):
 
             # section header
             if Line[0] == DT.TAB_SECTION_START and Line[-1] == DT.TAB_SECTION_END:
+                yield Index
                 self._SectionHeaderParser()
                 if self._SectionName == DT.TAB_DEC_DEFINES.upper():
                     self._DefinesCount += 1
@@ -2188,8 +3262,8 @@ class DecParser(MetaFileParser):
             PcdValue = ValueList[0]
             if PcdValue:
                 try:
-                    self._GuidDict.update(self._AllPcdDict)
-                    ValueList[0] = ValueExpressionEx(ValueList[0], ValueList[1], self._GuidDict)(True)
+                    ValueList[0] = ValueExpressionEx(ValueList[0], ValueList[1],
+                                                     ChainMap(self._AllPcdDict, self._GuidDict), self._Context)(True)
                 except BadExpression as Value:
                     EdkLogger.error('Parser', FORMAT_INVALID, Value, ExtraData=self._CurrentLine, File=self.MetaFile, Line=self._LineIndex + 1)
             # check format of default value against the datum type
@@ -2209,12 +3283,12 @@ class DecParser(MetaFileParser):
                 ValueList[0] = '0'
 
             # check for duplicate PCD definition
-            if (self._Scope[0], self._ValueList[0], self._ValueList[1]) in self._AllPCDs:
+            if (tuple(self._Scope[0]), self._ValueList[0], self._ValueList[1]) in self._AllPCDs:
                 EdkLogger.error('Parser', FORMAT_INVALID,
                                 "The same PCD name and GUID have been already defined",
                                 ExtraData=self._CurrentLine, File=self.MetaFile, Line=self._LineIndex + 1)
             else:
-                self._AllPCDs.append((self._Scope[0], self._ValueList[0], self._ValueList[1]))
+                self._AllPCDs.add((tuple(self._Scope[0]), self._ValueList[0], self._ValueList[1]))
                 self._AllPcdDict[DT.TAB_SPLIT.join(self._ValueList[0:2])] = ValueList[0]
 
             self._ValueList[2] = ValueList[0].strip() + '|' + ValueList[1].strip() + '|' + ValueList[2].strip()
@@ -12,9 +12,20 @@ import Common.EdkLogger as EdkLogger
 from Common.BuildToolError import FORMAT_INVALID
 
 from CommonDataClass.DataClass import MODEL_FILE_DSC, MODEL_FILE_DEC, MODEL_FILE_INF, \
-                                      MODEL_FILE_OTHERS
+                                      MODEL_FILE_OTHERS, MODEL_META_DATA_COMMENT
+from CommonDataClass.Exceptions import BadExpression
+from Common.PcdValidRule import SplitValidComment, CompileValidRule, VALID_RULE_TYPES, \
+                                TAB_VALID_RANGE, TAB_VALID_LIST, TAB_EXPRESSION
 import Common.DataType as DT
-from dataclasses import dataclass, field
+from Common.ParseContext import DefaultContext, GetContext
+from heapq import merge
+from sys import intern
+from dataclasses import dataclass, fields, replace
+
+## Set the _FIELDS_ of a row class, the names of its fields in the order of constructor arguments
+def _RowFields(RowClass):
+    RowClass._FIELDS_ = tuple(Field.name for Field in fields(RowClass))
+    return RowClass
 
 class MetaFileTable():
     # TRICK: use file ID as the part before '.'
@@ -25,6 +36,20 @@ class MetaFileTable():
     def __init__(self):
         self.CurrentContent = []
         self.ID = 0
+        #
+        # Indexes over CurrentContent, all of them hold positions of rows in
+        # CurrentContent. A bucket is a dict whose keys are the positions in
+        # insertion order, so a row is added and removed in constant time:
+        #
+        #   _IdIndex:     ID -> position
+        #   _ModelIndex:  Model -> {(Scope1, Scope2): {position: None, ...}}
+        #   _OwnerIndex:  BelongsToItem -> {Model -> {(Scope1, Scope2): {position: None, ...}}}
+        #
+        self._IdIndex = {}
+        self._ModelIndex = {}
+        self._OwnerIndex = {}
+        # buckets a row is added back to, they are sorted once at next lookup
+        self._UnsortedBuckets = {}
 
     def IsIntegrity(self):
         try:
@@ -40,14 +65,154 @@ class MetaFileTable():
             return False
         return True
 
+    ## Append the end flag; it is never indexed so that Query never returns it
     def SetEndFlag(self):
         self.CurrentContent.append(self._DUMMY_)
 
     def GetAll(self):
         return [item for item in self.CurrentContent if item.ID >= 0 and item.Enabled]
 
+    ## Get all records in table, including the disabled ones
+    def GetRecords(self):
+        return [Row for Row in self.CurrentContent if Row.ID >= 0]
+
+    ## Change the values and the enabled flag of a record
+    #
+    #   The record is replaced by a new row, the row objects got before are
+    #   not changed. Its position in table and in indexes is kept.
+    #
+    #   @param  ID:         The ID of the record
+    #   @param  Value1:     The new Value1
+    #   @param  Value2:     The new Value2
+    #   @param  Value3:     The new Value3
+    #   @param  Enabled:    Whether the record is enabled
+    #
+    def Update(self, ID, Value1, Value2, Value3, Enabled):
+        Position = self._IdIndex[ID]
+        Old = self.CurrentContent[Position]
+        Row = replace(Old, Value1=Value1.strip(), Value2=Value2.strip(), Value3=Value3.strip(), Enabled=Enabled)
+        Indexed = self._IsIndexed(Old)
+        if Indexed and not self._IsIndexed(Row):
+            self._Unindex(Position)
+        self.CurrentContent[Position] = Row
+        if not Indexed and self._IsIndexed(Row):
+            self._Index(Position)
+
+    ## Get all records as tuples of fields, to be restored by Load()
+    def Dump(self):
+        return [tuple(getattr(Row, Name) for Name in Row._FIELDS_) for Row in self.CurrentContent if Row.ID >= 0]
+
+    ## Fill the table with records got by Dump() and mark it complete
+    #
+    #   @param  RecordList: The list of record tuples
+    #   @param  ID:         The last ID used by the table
+    #
+    def Load(self, RecordList, ID):
+        for Record in RecordList:
+            self._Append(self._ROW_(*Record))
+        self.ID = ID
+        self.SetEndFlag()
+
+    ## Remove the records after an ID, and the end flag
+    #
+    #   Records are inserted with increasing IDs, so the ones kept are the
+    #   records inserted before the one after ID. Later inserts go on from ID.
+    #
+    #   @param  ID:         The ID of the last record to keep
+    #
+    def Truncate(self, ID):
+        RowList = [Row for Row in self.CurrentContent if 0 <= Row.ID <= ID]
+        self.__init__()
+        for Row in RowList:
+            self._Append(Row)
+        self.ID = ID
+
+    ## Append a row to the table and index it
+    def _Append(self, Row):
+        Position = len(self.CurrentContent)
+        self.CurrentContent.append(Row)
+        self._IdIndex[Row.ID] = Position
+        if self._IsIndexed(Row):
+            ScopeKey = (Row.Scope1, Row.Scope2)
+            if self._InModelIndex(Row):
+                self._ModelIndex.setdefault(Row.Model, {}).setdefault(ScopeKey, {})[Position] = None
+            self._OwnerIndex.setdefault(Row.BelongsToItem, {}).setdefault(Row.Model, {}).setdefault(ScopeKey, {})[Position] = None
+
+    ## Get the Model/Owner index buckets of a row
+    def _Buckets(self, Row):
+        ScopeKey = (Row.Scope1, Row.Scope2)
+        Buckets = [self._OwnerIndex.setdefault(Row.BelongsToItem, {}).setdefault(Row.Model, {}).setdefault(ScopeKey, {})]
+        if self._InModelIndex(Row):
+            Buckets.append(self._ModelIndex.setdefault(Row.Model, {}).setdefault(ScopeKey, {}))
+        return Buckets
+
+    ## Add a row kept in table to the Model/Owner indexes
+    #
+    #   The position is added at the end of the buckets, a bucket out of order
+    #   is sorted when it is looked up.
+    #
+    def _Index(self, Position):
+        for Bucket in self._Buckets(self.CurrentContent[Position]):
+            if Bucket and Position < next(reversed(Bucket)):
+                self._UnsortedBuckets[id(Bucket)] = Bucket
+            Bucket[Position] = None
+
+    ## Remove a row from the Model/Owner indexes, the row itself is kept in table
+    def _Unindex(self, Position):
+        for Bucket in self._Buckets(self.CurrentContent[Position]):
+            Bucket.pop(Position, None)
+
+    ## Sort the buckets rows are added back to, in one pass for all of them
+    def _SortBuckets(self):
+        for Bucket in self._UnsortedBuckets.values():
+            Positions = sorted(Bucket)
+            Bucket.clear()
+            Bucket.update(dict.fromkeys(Positions))
+        self._UnsortedBuckets = {}
+
+    ## Whether a row can be returned by Query
+    def _IsIndexed(self, Row):
+        return Row.Enabled
+
+    ## Whether a row is returned by Query when no owner is given
+    def _InModelIndex(self, Row):
+        return True
+
+    ## Collect rows from index buckets
+    #
+    #   @param  Buckets:    {(Scope1, Scope2): {position: None, ...}}
+    #   @param  Scope1Set:  Acceptable Scope1 values, None for any
+    #   @param  Scope2Set:  Acceptable Scope2 values, None for any
+    #
+    #   @retval: A list of rows in insertion order
+    #
+    def _Lookup(self, Buckets, Scope1Set=None, Scope2Set=None):
+        if not Buckets:
+            return []
+        if self._UnsortedBuckets:
+            self._SortBuckets()
+        PositionLists = [Positions for (Scope1, Scope2), Positions in Buckets.items()
+                         if Positions and (Scope1Set is None or Scope1 in Scope1Set)
+                         and (Scope2Set is None or Scope2 in Scope2Set)]
+        if not PositionLists:
+            return []
+        if len(PositionLists) == 1:
+            Positions = PositionLists[0]
+        else:
+            Positions = merge(*PositionLists)
+        Content = self.CurrentContent
+        return [Content[Position] for Position in Positions]
+
 
-@dataclass
+## Row of module table
+#
+# Rows are kept in huge number, so they use __slots__ instead of a per-instance
+# __dict__, and the tables intern the scope strings of the rows they insert.
+# A row is shared by the indexes, the cache and the callers of Query, so it is
+# never changed once in a table; a table replaces it by a new row instead.
+#
+@_RowFields
+@dataclass(slots=True)
 class InfLine:
     ID: int
     Model: int
@@ -66,6 +231,8 @@ class InfLine:
 
 ## Python class representation of table storing module data
 class ModuleTable(MetaFileTable):
+    # class of the rows in table
+    _ROW_ = InfLine
     # used as table end flag, in case the changes to database is not committed to db file
     _DUMMY_ = InfLine(-1, -1, '====', '====', '====', '====', '====', -1, -1, -1, -1, -1, False)
 
@@ -91,7 +258,7 @@ class ModuleTable(MetaFileTable):
     def Insert(self, Model, Value1, Value2, Value3, Scope1=DT.TAB_ARCH_COMMON, Scope2=DT.TAB_COMMON,
                BelongsToItem=-1, StartLine=-1, StartColumn=-1, EndLine=False, EndColumn=-1, Enabled=True):
 
-        (Value1, Value2, Value3, Scope1, Scope2) = (Value1.strip(), Value2.strip(), Value3.strip(), Scope1.strip(), Scope2.strip())
+        (Value1, Value2, Value3, Scope1, Scope2) = (Value1.strip(), Value2.strip(), Value3.strip(), intern(Scope1.strip()), intern(Scope2.strip()))
         self.ID = self.ID + self._ID_STEP_
         if self.ID >= (MODEL_FILE_INF + self._ID_MAX_):
             self.ID = MODEL_FILE_INF + self._ID_STEP_
@@ -110,7 +277,7 @@ class ModuleTable(MetaFileTable):
                 EndColumn,
                 Enabled
         )
-        self.CurrentContent.append(row)
+        self._Append(row)
         return self.ID
 
     ## Query table
@@ -122,26 +289,25 @@ class ModuleTable(MetaFileTable):
     # @retval:       A recordSet of all found records
     #
     def Query(self, Model, Arch=None, Platform=None, BelongsToItem=None):
-
-        QueryTab = self.CurrentContent
-        result = [item for item in QueryTab if item.Model == Model and item.Enabled ]
-
+        ArchList = None
         if Arch is not None and Arch != DT.TAB_ARCH_COMMON:
             ArchList = set(['COMMON'])
             ArchList.add(Arch)
-            result = [item for item in result if item.Scope1 in ArchList]
 
+        Platformlist = None
         if Platform is not None and Platform != DT.TAB_COMMON:
             Platformlist = set( ['COMMON','DEFAULT'])
             Platformlist.add(Platform)
-            result = [item for item in result if item.Scope2 in Platformlist]
 
         if BelongsToItem is not None:
-            result = [item for item in result if item.BelongsToItem == BelongsToItem]
-
-        return result
+            Buckets = self._OwnerIndex.get(BelongsToItem, {}).get(Model)
+        else:
+            Buckets = self._ModelIndex.get(Model)
+        return self._Lookup(Buckets, ArchList, Platformlist)
 
-@dataclass
+## Row of package table
+@_RowFields
+@dataclass(slots=True)
 class DecLine:
     ID: int
     Model: int
@@ -159,12 +325,24 @@ class DecLine:
 
 ## Python class representation of table storing package data
 class PackageTable(MetaFileTable):
+    # class of the rows in table
+    _ROW_ = DecLine
     # used as table end flag, in case the changes to database is not committed to db file
     _DUMMY_ = DecLine(-1, -1, '====', '====', '====', '====', '====', -1, -1, -1, -1, -1, -1)
 
     ## Constructor
     def __init__(self):
         MetaFileTable.__init__(self)
+        # validation comments and compiled rules of PCDs, made when asked
+        self._ValidComments = None
+        self._ValidRules = {}
+
+    ## Forget the validation rules when a record is added
+    def _Append(self, Row):
+        MetaFileTable._Append(self, Row)
+        if self._ValidComments is not None or self._ValidRules:
+            self._ValidComments = None
+            self._ValidRules = {}
 
     ## Insert table
     #
@@ -185,7 +363,7 @@ class PackageTable(MetaFileTable):
     #
     def Insert(self, Model, Value1, Value2, Value3, Scope1=DT.TAB_ARCH_COMMON, Scope2=DT.TAB_COMMON,
                BelongsToItem=-1, StartLine=-1, StartColumn=-1, EndLine=False, EndColumn=-1, Enabled=True):
-        (Value1, Value2, Value3, Scope1, Scope2) = (Value1.strip(), Value2.strip(), Value3.strip(), Scope1.strip(), Scope2.strip())
+        (Value1, Value2, Value3, Scope1, Scope2) = (Value1.strip(), Value2.strip(), Value3.strip(), intern(Scope1.strip()), intern(Scope2.strip()))
         self.ID = self.ID + self._ID_STEP_
 
         row = DecLine(
@@ -203,7 +381,7 @@ class PackageTable(MetaFileTable):
                 EndColumn,
                 Enabled
         )
-        self.CurrentContent.append(row)
+        self._Append(row)
         return self.ID
 
     ## Query table
@@ -214,55 +392,95 @@ class PackageTable(MetaFileTable):
     # @retval:       A recordSet of all found records
     #
     def Query(self, Model, Arch=None):
-
-        QueryTab = self.CurrentContent
-        result = [item for item in QueryTab if item.Model == Model and item.Enabled>=0 ]
-
+        ArchList = None
         if Arch is not None and Arch != DT.TAB_ARCH_COMMON:
             ArchList = set(['COMMON'])
             ArchList.add(Arch)
-            result = [item for item in result if item.Scope1 in ArchList]
 
-        return result
+        return self._Lookup(self._ModelIndex.get(Model), ArchList)
 
-    def GetValidExpression(self, TokenSpaceGuid, PcdCName):
+    ## Package records are returned whether they are enabled or not
+    def _IsIndexed(self, Row):
+        return True
 
-        QueryTab = self.CurrentContent
-        result = [[item.Value1, item.StartLine] for item in QueryTab if item.Value2 == TokenSpaceGuid and item.Value3 == PcdCName]
-        validateranges = []
-        validlists = []
-        expressions = []
-        try:
-            for row in result:
-                comment = row[0]
-
-                LineNum = row[1]
-                comment = comment.strip("#")
-                comment = comment.strip()
-                oricomment = comment
-                if comment.startswith("@ValidRange"):
-                    comment = comment.replace("@ValidRange", "", 1)
-                    validateranges.append(comment.split("|")[1].strip())
-                if comment.startswith("@ValidList"):
-                    comment = comment.replace("@ValidList", "", 1)
-                    validlists.append(comment.split("|")[1].strip())
-                if comment.startswith("@Expression"):
-                    comment = comment.replace("@Expression", "", 1)
-                    expressions.append(comment.split("|")[1].strip())
-        except Exception as Exc:
-            ValidType = ""
-            if oricomment.startswith("@ValidRange"):
-                ValidType = "@ValidRange"
-            if oricomment.startswith("@ValidList"):
-                ValidType = "@ValidList"
-            if oricomment.startswith("@Expression"):
-                ValidType = "@Expression"
-            EdkLogger.error('Parser', FORMAT_INVALID, "The syntax for %s of PCD %s.%s is incorrect" % (ValidType, TokenSpaceGuid, PcdCName),
-                            ExtraData=oricomment, File=self.MetaFile, Line=LineNum)
-            return set(), set(), set()
-        return set(validateranges), set(validlists), set(expressions)
-
-@dataclass
+    ## Index the validation comments of PCDs, once for all PCDs
+    #
+    #   @retval: {(token space GUID, PCD name): [(rule type, error code, rule
+    #            text, comment, line)]}. The error code and text are None for
+    #            an invalid comment.
+    #
+    def _GetValidComments(self):
+        if self._ValidComments is None:
+            self._ValidComments = {}
+            for Row in self.Query(MODEL_META_DATA_COMMENT):
+                try:
+                    Rule = SplitValidComment(Row.Value1)
+                except BadExpression:
+                    Rule = (None, None, None)
+                if Rule is not None:
+                    self._ValidComments.setdefault((Row.Value2, Row.Value3), []).append(
+                        Rule + (Row.Value1, Row.StartLine))
+        return self._ValidComments
+
+    ## Report an invalid validation comment
+    def _InvalidComment(self, TokenSpaceGuid, PcdCName, Comment, LineNum, MetaFile):
+        Comment = Comment.strip('#').strip()
+        ValidType = ""
+        for RuleType in VALID_RULE_TYPES:
+            if Comment.startswith(RuleType):
+                ValidType = RuleType
+        EdkLogger.error('Parser', FORMAT_INVALID, "The syntax for %s of PCD %s.%s is incorrect" % (ValidType, TokenSpaceGuid, PcdCName),
+                        ExtraData=Comment, File=MetaFile, Line=LineNum)
+
+    ## Get the @ValidRange, @ValidList and @Expression texts of a PCD
+    #
+    #   @param  TokenSpaceGuid: The token space GUID C name
+    #   @param  PcdCName:       The PCD C name
+    #   @param  MetaFile:       The DEC file, to report errors
+    #
+    #   @retval: (set of ranges, set of lists, set of expressions)
+    #
+    def GetValidExpression(self, TokenSpaceGuid, PcdCName, MetaFile=None):
+        Texts = {TAB_VALID_RANGE: set(), TAB_VALID_LIST: set(), TAB_EXPRESSION: set()}
+        for RuleType, _, Text, Comment, LineNum in self._GetValidComments().get((TokenSpaceGuid, PcdCName), []):
+            if Text is None:
+                self._InvalidComment(TokenSpaceGuid, PcdCName, Comment, LineNum, MetaFile)
+                return set(), set(), set()
+            Texts[RuleType].add(Text)
+        return Texts[TAB_VALID_RANGE], Texts[TAB_VALID_LIST], Texts[TAB_EXPRESSION]
+
+    ## Get the compiled validation rules of a PCD
+    #
+    #   The rules are compiled when they are asked for the first time.
+    #
+    #   @param  TokenSpaceGuid: The token space GUID C name
+    #   @param  PcdCName:       The PCD C name
+    #   @param  MetaFile:       The DEC file, to report errors
+    #
+    #   @retval: The list of PcdValidRule, each rule only once
+    #
+    def GetValidRules(self, TokenSpaceGuid, PcdCName, MetaFile=None):
+        Key = (TokenSpaceGuid, PcdCName)
+        if Key in self._ValidRules:
+            return self._ValidRules[Key]
+        Rules = {}
+        for RuleType, ErrorCode, Text, Comment, LineNum in self._GetValidComments().get(Key, []):
+            if (RuleType, ErrorCode, Text) in Rules:
+                continue
+            try:
+                if Text is None:
+                    raise BadExpression(Comment)
+                Rules[RuleType, ErrorCode, Text] = CompileValidRule(RuleType, ErrorCode, Text,
+                                                                    TokenSpaceGuid + '.' + PcdCName)
+            except BadExpression:
+                self._InvalidComment(TokenSpaceGuid, PcdCName, Comment, LineNum, MetaFile)
+                return []
+        self._ValidRules[Key] = list(Rules.values())
+        return self._ValidRules[Key]
+
+## Row of platform table
+@_RowFields
+@dataclass(slots=True)
 class DscLine:
     ID: int
     Model: int
@@ -285,6 +503,8 @@ class DscLine:
 
 ## Python class representation of table storing platform data
 class PlatformTable(MetaFileTable):
+    # class of the rows in table
+    _ROW_ = DscLine
     # used as table end flag, in case the changes to database is not committed to db file
     _DUMMY_ = DscLine(-1, -1, '====', '====', '====', '====', '====','====', -1, -1, -1, -1, -1, -1, "","","",False)
 
@@ -312,7 +532,7 @@ class PlatformTable(MetaFileTable):
     #
     def Insert(self, Model, Value1, Value2, Value3, Scope1=DT.TAB_ARCH_COMMON, Scope2=DT.TAB_COMMON, Scope3=DT.TAB_DEFAULT_STORES_DEFAULT,BelongsToItem=-1,
                FromItem=-1, StartLine=-1, StartColumn=-1, EndLine=-1, EndColumn=-1, Comment="",Condition="",Included="",Enabled=True):
-        (Value1, Value2, Value3, Scope1, Scope2, Scope3) = (Value1.strip(), Value2.strip(), Value3.strip(), Scope1.strip(), Scope2.strip(), Scope3.strip())
+        (Value1, Value2, Value3, Scope1, Scope2, Scope3) = (Value1.strip(), Value2.strip(), Value3.strip(), intern(Scope1.strip()), intern(Scope2.strip()), intern(Scope3.strip()))
         self.ID = self.ID + self._ID_STEP_
 
         row = DscLine(
@@ -335,9 +555,13 @@ class PlatformTable(MetaFileTable):
                 Included.strip(),
                 Enabled
         )
-        self.CurrentContent.append(row)
+        self._Append(row)
         return self.ID
 
+    ## Only top level records are returned when no owner is given
+    def _InModelIndex(self, Row):
+        return Row.BelongsToItem < 0
+
 
     ## Query table
     #
@@ -350,35 +574,41 @@ class PlatformTable(MetaFileTable):
     # @retval:       A recordSet of all found records
     #
     def Query(self, Model, Scope1=None, Scope2=None, BelongsToItem=None, FromItem=None):
-
-        QueryTab = self.CurrentContent
-        result = [item for item in QueryTab if item.Model == Model and item.Enabled ]
+        Sc1 = None
         if Scope1 is not None and Scope1 != DT.TAB_ARCH_COMMON:
             Sc1 = set(['COMMON'])
             Sc1.add(Scope1)
-            result = [item for item in result if item.Scope1 in Sc1]
-        Sc2 = set( ['COMMON','DEFAULT'])
+        Sc2 = None
         if Scope2 and Scope2 != DT.TAB_COMMON:
+            Sc2 = set( ['COMMON','DEFAULT'])
             if '.' in Scope2:
                 Index = Scope2.index('.')
                 NewScope = DT.TAB_COMMON + Scope2[Index:]
                 Sc2.add(NewScope)
             Sc2.add(Scope2)
-            result = [item for item in result if item.Scope2 in Sc2]
 
         if BelongsToItem is not None:
-            result = [item for item in result if item.BelongsToItem == BelongsToItem]
+            Buckets = self._OwnerIndex.get(BelongsToItem, {}).get(Model)
         else:
-            result = [item for item in result if item.BelongsToItem < 0]
+            Buckets = self._ModelIndex.get(Model)
+        result = self._Lookup(Buckets, Sc1, Sc2)
         if FromItem is not None:
             result = [item for item in result if item.FromItem == FromItem]
 
         return result
 
     def DisableComponent(self,comp_id):
-        for item in self.CurrentContent:
-            if item.ID == comp_id or item.BelongsToItem == comp_id:
-                item.Enabled = False
+        Positions = []
+        if comp_id in self._IdIndex:
+            Positions.append(self._IdIndex[comp_id])
+        for Buckets in self._OwnerIndex.get(comp_id, {}).values():
+            for Bucket in Buckets.values():
+                Positions.extend(Bucket)
+        for Position in Positions:
+            item = self.CurrentContent[Position]
+            if item.Enabled:
+                self._Unindex(Position)
+                self.CurrentContent[Position] = replace(item, Enabled=False)
 
 ## Factory class to produce different storage for different type of meta-file
 class MetaFileStorage(object):
@@ -394,13 +624,22 @@ class MetaFileStorage(object):
         ".dec"  : MODEL_FILE_DEC,
         ".dsc"  : MODEL_FILE_DSC,
     }
-    _ObjectCache = {}
+    # storage objects of default context
+    _ObjectCache = DefaultContext.StorageCache
     ## Constructor
-    def __new__(cls, MetaFile, FileType=None, Temporary=False, FromItem=None):
+    #
+    #   @param      MetaFile        The meta file the storage is for
+    #   @param      FileType        The type of the meta file
+    #   @param      Temporary       Don't cache the storage object if True
+    #   @param      FromItem        ID of the !include item the file comes from
+    #   @param      Context         ParseContext owning the storage, None for the default one
+    #
+    def __new__(cls, MetaFile, FileType=None, Temporary=False, FromItem=None, Context=None):
+        ObjectCache = GetContext(Context).StorageCache
         # no type given, try to find one
         key = (MetaFile.Path, FileType,Temporary,FromItem)
-        if key in cls._ObjectCache:
-            return cls._ObjectCache[key]
+        if key in ObjectCache:
+            return ObjectCache[key]
         if not FileType:
             if MetaFile.Type in cls._FILE_TYPE_:
                 FileType = cls._FILE_TYPE_[MetaFile.Type]
@@ -410,6 +649,6 @@ class MetaFileStorage(object):
         # create the storage object and return it to caller
         reval = cls._FILE_TABLE_[FileType]()
         if not Temporary:
-            cls._ObjectCache[key] = reval
+            ObjectCache[key] = reval
         return reval
 
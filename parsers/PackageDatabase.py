@@ -0,0 +1,385 @@
+## @file
+# This file is used to index the declarations of all DEC files in workspace
+#
+# SPDX-License-Identifier: BSD-2-Clause-Patent
+#
+
+##
+# Import Modules
+#
+import multiprocessing
+import os
+import pickle
+import tempfile
+
+import Common.EdkLogger as EdkLogger
+import Common.DataType as DT
+import CommonDataClass.DataClass as DC
+from Common.BuildToolError import FatalError
+from Common.PcdValidRule import SplitValidComment, CompileValidRule
+from CommonDataClass.Exceptions import BadExpression
+from Common.Misc import PathClass
+from Common.MultipleWorkspace import MultipleWorkspace as mws
+from Common.ParseContext import ParseContext, GetContext
+from . import InfBatchParser
+from .MetaFileParser2 import DecParser
+from .MetaFileStore import MetaFileStorage
+from .MetaFileCache import FileDigest
+
+## The models of the GUID, PPI and Protocol declarations
+_NAME_MODELS_ = (DC.MODEL_EFI_GUID, DC.MODEL_EFI_PPI, DC.MODEL_EFI_PROTOCOL)
+
+## The models of the PCD sections of DEC file
+_PCD_MODELS_ = (DC.MODEL_PCD_FIXED_AT_BUILD, DC.MODEL_PCD_PATCHABLE_IN_MODULE, DC.MODEL_PCD_FEATURE_FLAG,
+                DC.MODEL_PCD_DYNAMIC, DC.MODEL_PCD_DYNAMIC_EX)
+
+## A GUID, PPI or Protocol declared in a DEC file
+#
+#   @var Package:   The DEC file path
+#   @var Value:     The GUID value as written in DEC file
+#   @var Arch:      The arch of the section declaring it
+#   @var Line:      The line number of the declaration
+#
+class PackageDeclaration(object):
+    __slots__ = ('Package', 'Value', 'Arch', 'Line')
+
+    def __init__(self, Package, Value, Arch, Line):
+        self.Package = Package
+        self.Value = Value
+        self.Arch = Arch
+        self.Line = Line
+
+    def __repr__(self):
+        return 'PackageDeclaration(%r, %r, %r, %d)' % (self.Package, self.Value, self.Arch, self.Line)
+
+## A PCD declared in a DEC file
+#
+#   @var Package:       The DEC file path
+#   @var Type:          The model of the PCD section, e.g. MODEL_PCD_FIXED_AT_BUILD
+#   @var DefaultValue:  The default value, with expressions evaluated
+#   @var DatumType:     The datum type, e.g. UINT32
+#   @var Token:         The token number
+#   @var Arch:          The arch of the section declaring it
+#   @var Line:          The line number of the declaration
+#
+class PcdDeclaration(object):
+    __slots__ = ('Package', 'Type', 'DefaultValue', 'DatumType', 'Token', 'Arch', 'Line')
+
+    def __init__(self, Package, Type, DefaultValue, DatumType, Token, Arch, Line):
+        self.Package = Package
+        self.Type = Type
+        self.DefaultValue = DefaultValue
+        self.DatumType = DatumType
+        self.Token = Token
+        self.Arch = Arch
+        self.Line = Line
+
+    def __repr__(self):
+        return 'PcdDeclaration(%r, %d, %r, %r, %r, %r, %d)' % (self.Package, self.Type, self.DefaultValue,
+                                                                self.DatumType, self.Token, self.Arch, self.Line)
+
+## Get the declarations of a DEC file
+#
+#   The file is parsed in a context of its own, as ScanInfHeader() does, so
+#   the packages don't share macros or PCD values.
+#
+#   @param  DecFile:    The DEC file path
+#   @param  Context:    The ParseContext giving workspace and macros, None for
+#                       the one of worker process
+#
+#   @retval: ({model: [(C name, value, arch, line)]} of GUIDs, PPIs and
+#            Protocols, [(token space GUID, PCD name, model, default value,
+#            datum type, token, arch, line)], [(token space GUID, PCD name,
+#            rule type, error code, rule text, line)] of the validation
+#            comments of PCDs), None if the file is invalid
+#
+def _ScanPackage(DecFile, Context=None):
+    Context = Context or InfBatchParser._WorkerContext
+    ScanContext = ParseContext(Context.Workspace, Context.GlobalDefines, Context.CommandLineDefines)
+    ScanContext.CaseInsensitive = Context.CaseInsensitive
+    ScanContext.Options = Context.Options
+    DecFile = PathClass(DecFile, Context.Workspace)
+    try:
+        Parser = DecParser(DecFile, DC.MODEL_FILE_DEC, DT.TAB_ARCH_COMMON,
+                           MetaFileStorage(DecFile, DC.MODEL_FILE_DEC, Context=ScanContext), Context=ScanContext)
+        Parser.StartParse()
+    except FatalError:
+        return None
+    # the raw table has the records of all arches
+    Names = {}
+    for Model in _NAME_MODELS_:
+        Names[Model] = [(Record.Value1, Record.Value2, Record.Scope1, Record.StartLine)
+                        for Record in Parser._RawTable.Query(Model)]
+    Pcds = []
+    for Model in _PCD_MODELS_:
+        for Record in Parser._RawTable.Query(Model):
+            # the default value could have '|' in a string
+            DefaultValue, DatumType, Token = (Record.Value3.rsplit(DT.TAB_VALUE_SPLIT, 2) + ['', ''])[:3]
+            Pcds.append((Record.Value1, Record.Value2, Model, DefaultValue, DatumType, Token,
+                         Record.Scope1, Record.StartLine))
+    # the comments are stored once for each arch of the section
+    Rules = []
+    Seen = set()
+    for Record in Parser._RawTable.Query(DC.MODEL_META_DATA_COMMENT):
+        try:
+            Rule = SplitValidComment(Record.Value1)
+        except BadExpression:
+            # reported by the parsers of DEC file which ask for the rules
+            continue
+        if Rule is not None and (Record.Value2, Record.Value3) + Rule not in Seen:
+            Seen.add((Record.Value2, Record.Value3) + Rule)
+            Rules.append((Record.Value2, Record.Value3) + Rule + (Record.StartLine,))
+    return Names, Pcds, Rules
+
+## The declarations of all DEC files under some root directories
+#
+# Every DEC file is parsed once, in worker processes, and its GUIDs, PPIs,
+# Protocols and PCDs are indexed by name, so they are looked up without
+# parsing the packages again. Each file is kept with the digest of its
+# content, so Refresh() only parses the files added or changed.
+#
+# Lookups don't change the declarations. The database can be pickled, e.g.
+# passed to worker processes, and only the declarations are pickled; the
+# indexes are built again when it's loaded.
+#
+#   @var Roots:     The root directories
+#
+class PackageDatabase(object):
+    # version of the data saved by Save()
+    VERSION = 2
+
+    ## Constructor
+    #
+    #   @param  Roots:  The list of root directories
+    #
+    def __init__(self, Roots):
+        self.Roots = sorted(set(os.path.normpath(os.path.abspath(Root)) for Root in Roots if Root))
+        # {DEC file path: (digest, declarations got by _ScanPackage())}
+        self._Packages = {}
+        self._BuildIndexes()
+
+    ## Index the declarations of all packages
+    def _BuildIndexes(self):
+        # {model: {C name: [PackageDeclaration]}}
+        self._Names = {Model: {} for Model in _NAME_MODELS_}
+        # {(token space GUID, PCD name): [PcdDeclaration]}
+        self._Pcds = {}
+        # {(token space GUID, PCD name): [(DEC file, rule type, error code, rule text, line)]}
+        self._RuleTexts = {}
+        # {(token space GUID, PCD name): [PcdValidRule]}, compiled when asked
+        self._Rules = {}
+        for DecFile in sorted(self._Packages):
+            Declarations = self._Packages[DecFile][1]
+            if Declarations is None:
+                continue
+            Names, Pcds, Rules = Declarations
+            for Model, Records in Names.items():
+                Index = self._Names[Model]
+                for CName, Value, Arch, Line in Records:
+                    Index.setdefault(CName, []).append(PackageDeclaration(DecFile, Value, Arch, Line))
+            for Guid, Name, Model, DefaultValue, DatumType, Token, Arch, Line in Pcds:
+                self._Pcds.setdefault((Guid, Name), []).append(
+                    PcdDeclaration(DecFile, Model, DefaultValue, DatumType, Token, Arch, Line))
+            for Guid, Name, RuleType, ErrorCode, Text, Line in Rules:
+                self._RuleTexts.setdefault((Guid, Name), []).append((DecFile, RuleType, ErrorCode, Text, Line))
+
+    ## Parse all DEC files under the root directories
+    #
+    #   @param  Jobs:       The number of worker processes, None for the
+    #                       number of CPUs, 1 to parse in current process
+    #   @param  Context:    The ParseContext giving workspace and macros, None
+    #                       for the default one
+    #
+    def Build(self, Jobs=None, Context=None):
+        self._Packages.clear()
+        self.Refresh(Jobs, Context)
+        return self
+
+    ## Parse the DEC files added or changed since they were indexed
+    #
+    #   The files removed are dropped from the database.
+    #
+    #   @param  Jobs:       The number of worker processes, None for the
+    #                       number of CPUs, 1 to parse in current process
+    #   @param  Context:    The ParseContext giving workspace and macros, None
+    #                       for the default one
+    #
+    #   @retval: The number of DEC files parsed
+    #
+    def Refresh(self, Jobs=None, Context=None):
+        Context = GetContext(Context)
+        Digests = {}
+        for DecFile in InfBatchParser.FindMetaFiles(self.Roots, '.dec'):
+            Digests[DecFile] = FileDigest(DecFile)
+        Removed = set(self._Packages) - set(Digests)
+        Pending = [DecFile for DecFile, Digest in Digests.items()
+                   if DecFile not in self._Packages or self._Packages[DecFile][0] != Digest]
+        for DecFile in Removed:
+            del self._Packages[DecFile]
+        if not Pending:
+            if Removed:
+                self._BuildIndexes()
+            return 0
+
+        if Jobs is None:
+            Jobs = multiprocessing.cpu_count()
+        Jobs = min(Jobs, len(Pending))
+        if Jobs <= 1:
+            Results = [_ScanPackage(DecFile, Context) for DecFile in Pending]
+        else:
+            State = InfBatchParser._GetWorkerState(Context)
+            ChunkSize = max(1, len(Pending) // (Jobs * 4))
+            with multiprocessing.Pool(Jobs, initializer=InfBatchParser._InitWorker, initargs=(State,)) as Pool:
+                Results = Pool.map(_ScanPackage, Pending, ChunkSize)
+        for DecFile, Declarations in zip(Pending, Results):
+            self._Packages[DecFile] = (Digests[DecFile], Declarations)
+        self._BuildIndexes()
+        return len(Pending)
+
+    ## Get the DEC files indexed, in path order
+    @property
+    def Packages(self):
+        return sorted(self._Packages)
+
+    ## Get the DEC files which could not be parsed, in path order
+    @property
+    def InvalidPackages(self):
+        return sorted(DecFile for DecFile, Entry in self._Packages.items() if Entry[1] is None)
+
+    ## Get the declarations of a C name in the sections of a model
+    #
+    #   @param  Model:  MODEL_EFI_GUID, MODEL_EFI_PPI or MODEL_EFI_PROTOCOL
+    #   @param  CName:  The C name
+    #   @param  Arch:   The arch to use, None for all arches
+    #
+    #   @retval: The list of PackageDeclaration, in package path order
+    #
+    def GetDeclarations(self, Model, CName, Arch=None):
+        Declarations = self._Names[Model].get(CName, [])
+        if Arch is None:
+            return list(Declarations)
+        return [Item for Item in Declarations if Item.Arch in (DT.TAB_ARCH_COMMON, Arch)]
+
+    ## Get the declarations of a GUID C name
+    def GetGuid(self, CName, Arch=None):
+        return self.GetDeclarations(DC.MODEL_EFI_GUID, CName, Arch)
+
+    ## Get the declarations of a PPI C name
+    def GetPpi(self, CName, Arch=None):
+        return self.GetDeclarations(DC.MODEL_EFI_PPI, CName, Arch)
+
+    ## Get the declarations of a Protocol C name
+    def GetProtocol(self, CName, Arch=None):
+        return self.GetDeclarations(DC.MODEL_EFI_PROTOCOL, CName, Arch)
+
+    ## Get the declarations of a PCD
+    #
+    #   A PCD declared in several PCD sections, e.g. [PcdsFixedAtBuild,
+    #   PcdsPatchableInModule], has one declaration for each of them.
+    #
+    #   @param  TokenSpaceGuid: The token space GUID C name
+    #   @param  PcdCName:       The PCD C name
+    #   @param  Arch:           The arch to use, None for all arches
+    #
+    #   @retval: The list of PcdDeclaration, in package path order
+    #
+    def GetPcd(self, TokenSpaceGuid, PcdCName, Arch=None):
+        Declarations = self._Pcds.get((TokenSpaceGuid, PcdCName), [])
+        if Arch is None:
+            return list(Declarations)
+        return [Item for Item in Declarations if Item.Arch in (DT.TAB_ARCH_COMMON, Arch)]
+
+    ## Get the compiled @ValidRange, @ValidList and @Expression rules of a PCD
+    #
+    #   The rules are compiled when they are asked for the first time. The
+    #   invalid ones are reported by EdkLogger.warn() and skipped.
+    #
+    #   @param  TokenSpaceGuid: The token space GUID C name
+    #   @param  PcdCName:       The PCD C name
+    #
+    #   @retval: The list of PcdValidRule
+    #
+    def GetValidRules(self, TokenSpaceGuid, PcdCName):
+        Key = (TokenSpaceGuid, PcdCName)
+        if Key not in self._Rules:
+            Rules = []
+            for DecFile, RuleType, ErrorCode, Text, Line in self._RuleTexts.get(Key, []):
+                try:
+                    Rules.append(CompileValidRule(RuleType, ErrorCode, Text, TokenSpaceGuid + '.' + PcdCName))
+                except BadExpression as Excpt:
+                    EdkLogger.warn('Parser', "The syntax for %s of PCD %s.%s is incorrect" % (RuleType, TokenSpaceGuid, PcdCName),
+                                   File=DecFile, Line=Line, ExtraData=str(Excpt))
+            self._Rules[Key] = Rules
+        return self._Rules[Key]
+
+    def __getstate__(self):
+        return (self.VERSION, self.Roots, self._Packages)
+
+    def __setstate__(self, State):
+        Version = State[0]
+        if Version != self.VERSION:
+            raise ValueError('Version %s of package database is not supported' % Version)
+        _, self.Roots, self._Packages = State
+        self._BuildIndexes()
+
+    ## Store the database in a file
+    #
+    #   It's written to a temporary file in the same directory first and then
+    #   renamed, so a reader never sees a partly written file.
+    #
+    def Save(self, FileName):
+        Handle, TempPath = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(FileName)))
+        try:
+            with os.fdopen(Handle, 'wb') as File:
+                pickle.dump(self, File, pickle.HIGHEST_PROTOCOL)
+            os.replace(TempPath, FileName)
+        except:
+            try:
+                os.remove(TempPath)
+            except OSError:
+                pass
+            raise
+
+    ## Get the database stored by Save()
+    #
+    #   @param  FileName:   The file storing database
+    #   @param  Roots:      The root directories expected
+    #
+    #   @retval: The PackageDatabase, None if the file can't be read or the
+    #            database is of other roots or version. It's not refreshed.
+    #
+    @classmethod
+    def Load(cls, FileName, Roots):
+        try:
+            with open(FileName, 'rb') as File:
+                Database = pickle.load(File)
+        except Exception:
+            return None
+        if not isinstance(Database, cls) or Database.Roots != cls(Roots).Roots:
+            return None
+        return Database
+
+## Get the declarations of all DEC files in WORKSPACE and PACKAGES_PATH
+#
+#   @param  Context:        The ParseContext, None for the default one
+#   @param  CacheFile:      The file to store database between runs, None not
+#                           to store it. Only the DEC files changed since it
+#                           was stored are parsed.
+#   @param  Jobs:           The number of worker processes, None for the
+#                           number of CPUs, 1 to parse in current process
+#
+#   @retval: The PackageDatabase
+#
+def UsePackageDatabase(Context=None, CacheFile=None, Jobs=None):
+    Context = GetContext(Context)
+    Roots = [mws.WORKSPACE or Context.Workspace] + list(mws.PACKAGES_PATH or [])
+    Database = None
+    if CacheFile:
+        Database = PackageDatabase.Load(CacheFile, Roots)
+    if Database is None:
+        Database = PackageDatabase(Roots).Build(Jobs, Context)
+    else:
+        Database.Refresh(Jobs, Context)
+    if CacheFile:
+        Database.Save(CacheFile)
+    return Database
@@ -0,0 +1,289 @@
+## @file
+# This file is used to validate the PCD settings of a DSC file against the
+# declarations of DEC files
+#
+# SPDX-License-Identifier: BSD-2-Clause-Patent
+#
+
+##
+# Import Modules
+#
+import Common.DataType as DT
+import CommonDataClass.DataClass as DC
+from Common.Expression import ValueExpressionEx
+from Common.Misc import AnalyzeDscPcd, CheckPcdDatum, ParseFieldValue
+from Common.ParseContext import GetContext
+from CommonDataClass.Exceptions import BadExpression, WrnExpression
+
+## The kinds of violations
+PCD_UNDECLARED = 'Undeclared'
+PCD_TYPE = 'Type'
+PCD_FORMAT = 'Format'
+PCD_DATUM = 'Datum'
+PCD_SIZE = 'Size'
+PCD_RANGE = 'Range'
+
+## The DEC sections a PCD set in each DSC section could be declared in
+_DEC_MODELS_ = {
+    DC.MODEL_PCD_FIXED_AT_BUILD         :   (DC.MODEL_PCD_FIXED_AT_BUILD,),
+    DC.MODEL_PCD_PATCHABLE_IN_MODULE    :   (DC.MODEL_PCD_PATCHABLE_IN_MODULE,),
+    DC.MODEL_PCD_FEATURE_FLAG           :   (DC.MODEL_PCD_FEATURE_FLAG,),
+    DC.MODEL_PCD_DYNAMIC_DEFAULT        :   (DC.MODEL_PCD_DYNAMIC, DC.MODEL_PCD_DYNAMIC_EX),
+    DC.MODEL_PCD_DYNAMIC_HII            :   (DC.MODEL_PCD_DYNAMIC, DC.MODEL_PCD_DYNAMIC_EX),
+    DC.MODEL_PCD_DYNAMIC_VPD            :   (DC.MODEL_PCD_DYNAMIC, DC.MODEL_PCD_DYNAMIC_EX),
+    DC.MODEL_PCD_DYNAMIC_EX_DEFAULT     :   (DC.MODEL_PCD_DYNAMIC_EX, DC.MODEL_PCD_DYNAMIC),
+    DC.MODEL_PCD_DYNAMIC_EX_HII         :   (DC.MODEL_PCD_DYNAMIC_EX, DC.MODEL_PCD_DYNAMIC),
+    DC.MODEL_PCD_DYNAMIC_EX_VPD         :   (DC.MODEL_PCD_DYNAMIC_EX, DC.MODEL_PCD_DYNAMIC),
+}
+
+## The models having the datum type and maximum size in the fields after value
+_DEFAULT_MODELS_ = (DC.MODEL_PCD_FIXED_AT_BUILD, DC.MODEL_PCD_PATCHABLE_IN_MODULE,
+                    DC.MODEL_PCD_DYNAMIC_DEFAULT, DC.MODEL_PCD_DYNAMIC_EX_DEFAULT)
+
+## The names of PCD sections, used in messages
+_SECTION_NAMES_ = dict((Model, DT.TAB_PCDS + Name) for Model, Name in (
+    (DC.MODEL_PCD_FIXED_AT_BUILD,       DT.TAB_PCDS_FIXED_AT_BUILD),
+    (DC.MODEL_PCD_PATCHABLE_IN_MODULE,  DT.TAB_PCDS_PATCHABLE_IN_MODULE),
+    (DC.MODEL_PCD_FEATURE_FLAG,         DT.TAB_PCDS_FEATURE_FLAG),
+    (DC.MODEL_PCD_DYNAMIC,              DT.TAB_PCDS_DYNAMIC),
+    (DC.MODEL_PCD_DYNAMIC_DEFAULT,      DT.TAB_PCDS_DYNAMIC_DEFAULT),
+    (DC.MODEL_PCD_DYNAMIC_HII,          DT.TAB_PCDS_DYNAMIC_HII),
+    (DC.MODEL_PCD_DYNAMIC_VPD,          DT.TAB_PCDS_DYNAMIC_VPD),
+    (DC.MODEL_PCD_DYNAMIC_EX,           DT.TAB_PCDS_DYNAMIC_EX),
+    (DC.MODEL_PCD_DYNAMIC_EX_DEFAULT,   DT.TAB_PCDS_DYNAMIC_EX_DEFAULT),
+    (DC.MODEL_PCD_DYNAMIC_EX_HII,       DT.TAB_PCDS_DYNAMIC_EX_HII),
+    (DC.MODEL_PCD_DYNAMIC_EX_VPD,       DT.TAB_PCDS_DYNAMIC_EX_VPD),
+))
+
+## A PCD setting which doesn't match its declaration
+#
+#   @var Kind:              PCD_UNDECLARED, PCD_TYPE, PCD_FORMAT, PCD_DATUM,
+#                           PCD_SIZE or PCD_RANGE
+#   @var TokenSpaceGuid:    The token space GUID C name
+#   @var PcdCName:          The PCD C name
+#   @var Arch:              The arch the setting is checked for
+#   @var Value:             The value set, '' if not got
+#   @var Message:           The description of the violation
+#   @var File:              The DSC file, or the file it includes, setting PCD
+#   @var Line:              The line number of the setting
+#   @var ErrorCode:         The error code of the validation rule for
+#                           PCD_RANGE, None for others
+#
+class PcdViolation(object):
+    __slots__ = ('Kind', 'TokenSpaceGuid', 'PcdCName', 'Arch', 'Value', 'Message', 'File', 'Line', 'ErrorCode')
+
+    def __init__(self, Kind, TokenSpaceGuid, PcdCName, Arch, Value, Message, File, Line, ErrorCode=None):
+        self.Kind = Kind
+        self.TokenSpaceGuid = TokenSpaceGuid
+        self.PcdCName = PcdCName
+        self.Arch = Arch
+        self.Value = Value
+        self.Message = Message
+        self.File = File
+        self.Line = Line
+        self.ErrorCode = ErrorCode
+
+    def __repr__(self):
+        return 'PcdViolation(%r, %s.%s, %r, %r, %r, %s(%d))' % (self.Kind, self.TokenSpaceGuid, self.PcdCName, self.Arch,
+                                                               self.Value, self.Message, self.File, self.Line)
+
+## Get the PCD settings of post-processed DSC parsers
+#
+#   Both the PCDs of PCD sections and the ones in <Pcds*> of components are
+#   got. A setting applying to several arches is got once for each of them.
+#
+#   @param  DscParsers:     A post-processed DscParser, or a dict of them with
+#                           arch as key, e.g. got by PostProcessArchs()
+#
+#   @retval: A list of (arch, record, file setting PCD)
+#
+def GetDscPcdSettings(DscParsers):
+    if not isinstance(DscParsers, dict):
+        DscParsers = {DscParsers._Arch: DscParsers}
+    Settings = []
+    for Arch, Dsc in DscParsers.items():
+        # records of !include files have the ID of !include item as FromItem
+        IncludedFiles = {FromItem: str(IncludedFile) for IncludedFile, _, FromItem, _, _ in Dsc.GetIncludeGraph()}
+        Records = []
+        for Model in _DEC_MODELS_:
+            Records.extend(Dsc[Model, Arch])
+        for Component in Dsc[DC.MODEL_META_DATA_COMPONENT, Arch]:
+            for Model in _DEC_MODELS_:
+                Records.extend(Dsc._Table.Query(Model, Arch, BelongsToItem=Component.ID))
+        Records.sort(key=lambda Record: Record.ID)
+        for Record in Records:
+            Settings.append((Arch, Record, IncludedFiles.get(Record.FromItem, str(Dsc.MetaFile))))
+    return Settings
+
+## Validate the PCD settings of DSC files against the declarations of DEC files
+#
+# All settings are checked in one pass: each one is joined with its
+# declaration in PackageDatabase, then its datum type, value, size and the
+# validation rules of DEC file are checked. The datum checks, expressions
+# and sizes are cached by value, and each validation rule checks all values
+# set to its PCD at once, so settings sharing values are cheap. The checks of
+# literal values are kept for later calls; the values evaluated as
+# expressions are got again, as the PCD values they use could change.
+#
+class PcdValidator(object):
+    ## Constructor
+    #
+    #   @param  Database:   The PackageDatabase having the DEC declarations
+    #   @param  Context:    The ParseContext of the DSC parsers, whose PCD
+    #                       values are used by expressions, None for the
+    #                       default one
+    #
+    def __init__(self, Database, Context=None):
+        self._Database = Database
+        self._Context = GetContext(Context)
+        # {(datum type, value): (error message or '', value evaluated)}, of
+        # the literal values and of the values evaluated in current call
+        self._DatumChecks = {}
+        self._Evaluated = {}
+        # {value: size in bytes, or None if unknown}
+        self._Sizes = {}
+
+    ## Validate the PCD settings of post-processed DSC parsers
+    #
+    #   @param  DscParsers:     A post-processed DscParser, or a dict of them
+    #                           with arch as key
+    #
+    #   @retval: The list of PcdViolation, sorted by file and line. A setting
+    #            applying to several arches has its violations reported once.
+    #
+    def Validate(self, DscParsers):
+        Symbols = dict(self._Context.PlatformPcds)
+        self._Evaluated = {}
+        Violations = []
+        # {(token space GUID, PCD name): [(value, arch, record, file)]}
+        Values = {}
+        for Arch, Record, File in GetDscPcdSettings(DscParsers):
+            Value = self._CheckSetting(Arch, Record, File, Symbols, Violations)
+            if Value is not None:
+                Values.setdefault((Record.Value1, Record.Value2), []).append((Value, Arch, Record, File))
+
+        for (TokenSpaceGuid, PcdCName), Settings in Values.items():
+            Rules = self._Database.GetValidRules(TokenSpaceGuid, PcdCName)
+            if not Rules:
+                continue
+            Distinct = list(dict.fromkeys(Value for Value, _, _, _ in Settings))
+            for Rule in Rules:
+                Allowed = dict(zip(Distinct, Rule.CheckValues(Distinct, Symbols)))
+                for Value, Arch, Record, File in Settings:
+                    if not Allowed[Value]:
+                        Violations.append(PcdViolation(
+                            PCD_RANGE, TokenSpaceGuid, PcdCName, Arch, Value,
+                            "The value is not allowed by %s %s" % (Rule.RuleType, Rule.Text),
+                            File, Record.StartLine, Rule.ErrorCode))
+
+        # the same violation of a setting applying to several arches
+        Unique = {}
+        for Violation in Violations:
+            Key = (Violation.File, Violation.Line, Violation.Kind, Violation.TokenSpaceGuid, Violation.PcdCName,
+                   Violation.Message)
+            Unique.setdefault(Key, Violation)
+        return sorted(Unique.values(), key=lambda Violation: (Violation.File, Violation.Line))
+
+    ## Check one setting
+    #
+    #   @retval: The value to check against validation rules, None if it's
+    #            not got or has been found invalid
+    #
+    def _CheckSetting(self, Arch, Record, File, Symbols, Violations):
+        TokenSpaceGuid, PcdCName, Setting, Model = Record.Value1, Record.Value2, Record.Value3, Record.Model
+        def Report(Kind, Value, Message):
+            Violations.append(PcdViolation(Kind, TokenSpaceGuid, PcdCName, Arch, Value, Message, File, Record.StartLine))
+
+        Declarations = self._Database.GetPcd(TokenSpaceGuid, PcdCName, Arch)
+        if not Declarations:
+            Report(PCD_UNDECLARED, '', "The PCD is not declared in any DEC file")
+            return None
+        Matched = [Declaration for Declaration in Declarations if Declaration.Type in _DEC_MODELS_[Model]]
+        if not Matched:
+            Report(PCD_TYPE, '', "The PCD is set in %s section, but declared in %s section" %
+                   (_SECTION_NAMES_[Model], ', '.join(sorted(set(_SECTION_NAMES_[Declaration.Type]
+                                                                 for Declaration in Declarations)))))
+            Matched = Declarations
+        DatumType = Matched[0].DatumType
+
+        # the fields of FeatureFlag PCD are joined as the FixedAtBuild ones in post-process
+        Fields, Valid, Index = AnalyzeDscPcd(Setting, DC.MODEL_PCD_FIXED_AT_BUILD if Model == DC.MODEL_PCD_FEATURE_FLAG
+                                             else Model, DatumType)
+        if not Valid:
+            Report(PCD_FORMAT, '', "Invalid PCD setting %s" % Setting)
+            return None
+        MaxSize = ''
+        if Model in _DEFAULT_MODELS_:
+            if Fields[1] and Fields[1] != DatumType:
+                Report(PCD_DATUM, '', "The datum type %s differs from the %s declared" % (Fields[1], DatumType))
+                return None
+            MaxSize = Fields[2]
+        elif Model in (DC.MODEL_PCD_DYNAMIC_VPD, DC.MODEL_PCD_DYNAMIC_EX_VPD):
+            MaxSize = Fields[1]
+        Value = Fields[Index]
+        if not Value:
+            return None
+
+        Message, Value = self._CheckDatum(DatumType, Value, Symbols)
+        if Message:
+            Report(PCD_DATUM, Value, Message)
+            return None
+        if MaxSize and DatumType == DT.TAB_VOID:
+            MaxSize = int(MaxSize, 16) if MaxSize.upper().startswith('0X') else int(MaxSize)
+            Size = self._GetSize(Value)
+            if Size is not None and Size > MaxSize:
+                Report(PCD_SIZE, Value, "The value of %d bytes is larger than the maximum size %d" % (Size, MaxSize))
+                return None
+        return Value
+
+    ## Check a value against a datum type, evaluating it if it's not a literal of the type
+    #
+    #   @retval: (error message, '' if valid, the value evaluated)
+    #
+    def _CheckDatum(self, DatumType, Value, Symbols):
+        Key = (DatumType, Value)
+        Result = self._DatumChecks.get(Key) or self._Evaluated.get(Key)
+        if Result is not None:
+            return Result
+        Valid, Message = CheckPcdDatum(DatumType, Value)
+        if Valid:
+            self._DatumChecks[Key] = Result = ('', Value)
+            return Result
+        try:
+            Evaluated = ValueExpressionEx(Value, DatumType, Symbols, self._Context)(True)
+        except WrnExpression as Warn:
+            Evaluated = Warn.result
+        except BadExpression as Excpt:
+            Evaluated = None
+            Result = (str(Excpt) or Message, Value)
+        if Evaluated is not None:
+            Evaluated = str(Evaluated)
+            Valid, Message = CheckPcdDatum(DatumType, Evaluated)
+            Result = ('' if Valid else Message, Evaluated)
+        self._Evaluated[Key] = Result
+        return Result
+
+    ## Get the size of a VOID* value in bytes, None if it can't be got without running tools
+    def _GetSize(self, Value):
+        if Value not in self._Sizes:
+            Size = None
+            if not Value.startswith('DEVICE_PATH('):
+                try:
+                    Size = ParseFieldValue(Value)[1]
+                except BadExpression:
+                    pass
+            self._Sizes[Value] = Size
+        return self._Sizes[Value]
+
+## Validate the PCD settings of DSC files against the declarations of DEC files
+#
+#   @param  DscParsers:     A post-processed DscParser, or a dict of them with
+#                           arch as key
+#   @param  Database:       The PackageDatabase having the DEC declarations
+#   @param  Context:        The ParseContext of the DSC parsers, None for the
+#                           default one
+#
+#   @retval: The list of PcdViolation
+#
+def ValidatePlatformPcds(DscParsers, Database, Context=None):
+    return PcdValidator(Database, Context).Validate(DscParsers)